@@ -0,0 +1,22 @@
+import time
+
+from analytics.rollups import rebuild
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Полный пересчет сводок аналитики по рецептам. Диапазоны id '
+            'рецептов считаются параллельно в нескольких процессах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = rebuild(options['processes'], options['chunk_size'])
+        for model, count in counts.items():
+            self.stdout.write(f'  {model._meta.verbose_name_plural}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводки пересчитаны за {time.perf_counter() - started:.1f} с.'
+        ))
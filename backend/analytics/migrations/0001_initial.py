@@ -0,0 +1,115 @@
+# Generated by Django 3.2 on 2026-10-19 11:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_rollups(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientForRecipe = apps.get_model('recipes', 'IngredientForRecipe')
+    IngredientUsage = apps.get_model('analytics', 'IngredientUsage')
+    TagUsage = apps.get_model('analytics', 'TagUsage')
+    AuthorMonth = apps.get_model('analytics', 'AuthorMonth')
+
+    IngredientUsage.objects.bulk_create([
+        IngredientUsage(ingredient_id=row['ingredient_id'],
+                        recipes_count=row['count'],
+                        total_amount=row['amount'])
+        for row in IngredientForRecipe.objects.order_by().values(
+            'ingredient_id'
+        ).annotate(count=Count('id'), amount=Sum('amount'))
+    ], batch_size=1000)
+    TagUsage.objects.bulk_create([
+        TagUsage(tag_id=row['tag_id'], recipes_count=row['count'],
+                 cooking_time_total=row['time'])
+        for row in Recipe.tags.through.objects.order_by().values(
+            'tag_id'
+        ).annotate(count=Count('id'), time=Sum('recipe__cooking_time'))
+    ], batch_size=1000)
+    months = {}
+    for row in Recipe.objects.order_by().annotate(
+        month=TruncMonth('pub_date')
+    ).values('author_id', 'month').annotate(count=Count('id')):
+        month = row['month']
+        if hasattr(month, 'date'):
+            month = month.date()
+        key = (row['author_id'], month.replace(day=1))
+        months[key] = months.get(key, 0) + row['count']
+    AuthorMonth.objects.bulk_create([
+        AuthorMonth(author_id=author, month=month, recipes_count=count)
+        for (author, month), count in months.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_recipe_list_indexes'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('recipes_count', models.IntegerField(default=0, verbose_name='Рецептов')),
+            ],
+            options={
+                'verbose_name': 'Рецепты автора за месяц',
+                'verbose_name_plural': 'Рецепты авторов по месяцам',
+                'ordering': ['-month', '-recipes_count', 'author'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='recipes.ingredient', verbose_name='Ингридиент')),
+                ('recipes_count', models.IntegerField(default=0, verbose_name='Рецептов')),
+                ('total_amount', models.BigIntegerField(default=0, verbose_name='Суммарное количество')),
+            ],
+            options={
+                'verbose_name': 'Использование ингридиента',
+                'verbose_name_plural': 'Использование ингридиентов',
+                'ordering': ['-recipes_count', 'ingredient'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='recipes.tag', verbose_name='Тэг')),
+                ('recipes_count', models.IntegerField(default=0, verbose_name='Рецептов')),
+                ('cooking_time_total', models.BigIntegerField(default=0, verbose_name='Суммарное время приготовления')),
+            ],
+            options={
+                'verbose_name': 'Использование тэга',
+                'verbose_name_plural': 'Использование тэгов',
+                'ordering': ['-recipes_count', 'tag'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ingredientusage',
+            index=models.Index(fields=['-recipes_count'], name='ingredient_usage_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='authormonth',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_months', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddIndex(
+            model_name='authormonth',
+            index=models.Index(fields=['-month', '-recipes_count'], name='author_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='authormonth',
+            constraint=models.UniqueConstraint(fields=('author', 'month'), name='unique_author_month'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
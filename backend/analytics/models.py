@@ -0,0 +1,92 @@
+from django.db import models
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+
+class IngredientUsage(models.Model):
+    """Сводка использования ингридиента: в скольких рецептах он есть и
+    суммарное количество. Поддерживается analytics.rollups.
+
+    Returns:
+        str: название ингридиента.
+    """
+    ingredient = models.OneToOneField(
+        Ingredient, primary_key=True, on_delete=models.CASCADE,
+        related_name='usage', verbose_name='Ингридиент'
+    )
+    recipes_count = models.IntegerField('Рецептов', default=0)
+    total_amount = models.BigIntegerField('Суммарное количество', default=0)
+
+    class Meta:
+        ordering = ['-recipes_count', 'ingredient']
+        indexes = [
+            models.Index(fields=['-recipes_count'],
+                         name='ingredient_usage_count_idx'),
+        ]
+        verbose_name = 'Использование ингридиента'
+        verbose_name_plural = 'Использование ингридиентов'
+
+    def __str__(self):
+        return str(self.ingredient)
+
+
+class TagUsage(models.Model):
+    """Сводка по тэгу: количество рецептов и суммарное время
+    приготовления для расчета среднего. Поддерживается analytics.rollups.
+
+    Returns:
+        str: название тэга.
+    """
+    tag = models.OneToOneField(
+        Tag, primary_key=True, on_delete=models.CASCADE,
+        related_name='usage', verbose_name='Тэг'
+    )
+    recipes_count = models.IntegerField('Рецептов', default=0)
+    cooking_time_total = models.BigIntegerField(
+        'Суммарное время приготовления', default=0
+    )
+
+    class Meta:
+        ordering = ['-recipes_count', 'tag']
+        verbose_name = 'Использование тэга'
+        verbose_name_plural = 'Использование тэгов'
+
+    def __str__(self):
+        return str(self.tag)
+
+    @property
+    def average_cooking_time(self):
+        if not self.recipes_count:
+            return None
+        return round(self.cooking_time_total / self.recipes_count, 1)
+
+
+class AuthorMonth(models.Model):
+    """Количество рецептов автора за месяц публикации.
+    Поддерживается analytics.rollups.
+
+    Returns:
+        str: автор и месяц.
+    """
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='recipe_months',
+        verbose_name='Автор'
+    )
+    month = models.DateField('Месяц')
+    recipes_count = models.IntegerField('Рецептов', default=0)
+
+    class Meta:
+        ordering = ['-month', '-recipes_count', 'author']
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'month'],
+                                    name='unique_author_month'),
+        ]
+        indexes = [
+            models.Index(fields=['-month', '-recipes_count'],
+                         name='author_month_idx'),
+        ]
+        verbose_name = 'Рецепты автора за месяц'
+        verbose_name_plural = 'Рецепты авторов по месяцам'
+
+    def __str__(self):
+        return f'{self.author} {self.month:%Y-%m}'
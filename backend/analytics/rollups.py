@@ -0,0 +1,207 @@
+"""Сводные таблицы аналитики: использование ингридиентов, тэгов и
+рецепты авторов по месяцам.
+
+Вклад набора рецептов в сводки считается агрегатными запросами только
+по этим рецептам (aggregate). При изменении рецептов их старый вклад
+вычитается до записи, новый прибавляется после нее (remove_recipes,
+add_recipes), в той же транзакции, одним UPDATE с CASE на каждую
+сводку. Полный пересчет (rebuild) считает вклад порций рецептов в
+нескольких процессах и заменяет сводки целиком.
+"""
+import datetime
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from analytics.models import AuthorMonth, IngredientUsage, TagUsage
+from django.db import connection, transaction
+from django.db.models import (BigIntegerField, Case, Count, F, Max, Min, Q,
+                              Sum, Value, When)
+from django.db.models.functions import TruncMonth
+from recipes.models import IngredientForRecipe, Recipe
+
+ROLLUPS = {
+    IngredientUsage: (('ingredient_id', ), ('recipes_count', 'total_amount')),
+    TagUsage: (('tag_id', ), ('recipes_count', 'cooking_time_total')),
+    AuthorMonth: (('author_id', 'month'), ('recipes_count', )),
+}
+
+
+def _month(value):
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def aggregate(recipes):
+    """Вклад рецептов в сводки.
+
+    Args:
+        recipes (QuerySet): рецепты.
+
+    Returns:
+        dict: модель сводки -> {ключ: значения} в порядке ROLLUPS.
+    """
+    ids = recipes.order_by().values('id')
+    ingredients = IngredientForRecipe.objects.filter(
+        recipe_id__in=ids
+    ).order_by().values('ingredient_id').annotate(
+        count=Count('id'), amount=Sum('amount')
+    )
+    tags = Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by().values('tag_id').annotate(
+        count=Count('id'), time=Sum('recipe__cooking_time')
+    )
+    months = defaultdict(int)
+    rows = recipes.order_by().annotate(
+        month=TruncMonth('pub_date')
+    ).values('author_id', 'month').annotate(count=Count('id'))
+    for row in rows:
+        months[(row['author_id'], _month(row['month']))] += row['count']
+    return {
+        IngredientUsage: {
+            (row['ingredient_id'], ): (row['count'], row['amount'])
+            for row in ingredients
+        },
+        TagUsage: {
+            (row['tag_id'], ): (row['count'], row['time']) for row in tags
+        },
+        AuthorMonth: {key: (count, ) for key, count in months.items()},
+    }
+
+
+def apply(contributions, sign):
+    """Прибавление или вычитание вклада рецептов.
+    Недостающие строки создаются перед прибавлением, строки без рецептов
+    удаляются после вычитания.
+
+    Args:
+        contributions (dict): результат aggregate.
+        sign (int): 1 - прибавить, -1 - вычесть.
+    """
+    for model, rows in contributions.items():
+        if not rows:
+            continue
+        key_fields, value_fields = ROLLUPS[model]
+        if sign > 0:
+            model.objects.bulk_create(
+                [model(**dict(zip(key_fields, key))) for key in rows],
+                ignore_conflicts=True,
+            )
+        condition = Q()
+        whens = defaultdict(list)
+        for key, values in rows.items():
+            match = Q(**dict(zip(key_fields, key)))
+            condition |= match
+            for field, value in zip(value_fields, values):
+                whens[field].append(When(match, then=Value(sign * value)))
+        model.objects.filter(condition).update(**{
+            field: F(field) + Case(*cases, default=Value(0),
+                                   output_field=BigIntegerField())
+            for field, cases in whens.items()
+        })
+        if sign < 0:
+            model.objects.filter(condition, recipes_count__lte=0).delete()
+
+
+def add_recipes(recipe_ids):
+    """Прибавление вклада рецептов после их создания или изменения.
+
+    Args:
+        recipe_ids (list): id рецептов.
+    """
+    apply(aggregate(Recipe.objects.filter(id__in=recipe_ids)), 1)
+
+
+def remove_recipes(recipe_ids):
+    """Вычитание вклада рецептов перед их изменением или удалением.
+
+    Args:
+        recipe_ids (list): id рецептов.
+    """
+    apply(aggregate(Recipe.objects.filter(id__in=recipe_ids)), -1)
+
+
+def aggregate_range(bounds):
+    """Вклад рецептов с id в полуинтервале для процесса пересчета.
+
+    Args:
+        bounds (tuple): начало и конец полуинтервала id.
+
+    Returns:
+        dict: результат aggregate.
+    """
+    start, stop = bounds
+    return aggregate(Recipe.objects.filter(id__gte=start, id__lt=stop))
+
+
+def merge(parts):
+    """Сумма вкладов порций рецептов.
+
+    Args:
+        parts (iterable): результаты aggregate.
+
+    Returns:
+        dict: модель сводки -> {ключ: значения}.
+    """
+    totals = {model: {} for model in ROLLUPS}
+    for part in parts:
+        for model, rows in part.items():
+            for key, values in rows.items():
+                current = totals[model].get(key)
+                totals[model][key] = values if current is None else tuple(
+                    old + new for old, new in zip(current, values)
+                )
+    return totals
+
+
+def rebuild(processes=1, chunk_size=5000):
+    """Полный пересчет сводок.
+    Сводки очищаются в начале транзакции, на PostgreSQL таблицы
+    дополнительно блокируются от записи: изменения рецептов ждут конца
+    пересчета и применяются уже к новым сводкам, поэтому не теряются и
+    не учитываются дважды.
+
+    Args:
+        processes (int, optional): число процессов. Defaults to 1.
+        chunk_size (int, optional): размер диапазона id рецептов на одну
+        задачу. Defaults to 5000.
+
+    Returns:
+        dict: модель сводки -> количество строк.
+    """
+    bounds = Recipe.objects.aggregate(low=Min('id'), high=Max('id'))
+    ranges = []
+    if bounds['low'] is not None:
+        ranges = [(start, start + chunk_size) for start in range(
+            bounds['low'], bounds['high'] + 1, chunk_size
+        )]
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(model._meta.db_table for model in ROLLUPS)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {tables} IN EXCLUSIVE MODE')
+        for model in ROLLUPS:
+            model.objects.all().delete()
+        if processes > 1 and len(ranges) > 1:
+            with ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            ) as pool:
+                totals = merge(pool.map(aggregate_range, ranges))
+        else:
+            totals = merge(map(aggregate_range, ranges))
+        for model, rows in totals.items():
+            key_fields, value_fields = ROLLUPS[model]
+            model.objects.bulk_create(
+                [
+                    model(**dict(zip(key_fields, key)),
+                          **dict(zip(value_fields, values)))
+                    for key, values in rows.items()
+                ],
+                batch_size=1000,
+            )
+    return {model: len(rows) for model, rows in totals.items()}
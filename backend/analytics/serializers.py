@@ -0,0 +1,45 @@
+from analytics.models import AuthorMonth, IngredientUsage, TagUsage
+from rest_framework import serializers
+
+
+class IngredientUsageSerializer(serializers.ModelSerializer):
+    """Сериализатор сводки использования ингридиента.
+    Наследуется от ModelSerializer.
+    """
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = IngredientUsage
+        fields = ('id', 'name', 'measurement_unit', 'recipes_count',
+                  'total_amount')
+
+
+class TagUsageSerializer(serializers.ModelSerializer):
+    """Сериализатор сводки по тэгу со средним временем приготовления.
+    Наследуется от ModelSerializer.
+    """
+    id = serializers.IntegerField(source='tag_id')
+    name = serializers.CharField(source='tag.name')
+    slug = serializers.CharField(source='tag.slug')
+    average_cooking_time = serializers.FloatField()
+
+    class Meta:
+        model = TagUsage
+        fields = ('id', 'name', 'slug', 'recipes_count',
+                  'average_cooking_time')
+
+
+class AuthorMonthSerializer(serializers.ModelSerializer):
+    """Сериализатор количества рецептов автора за месяц.
+    Наследуется от ModelSerializer.
+    """
+    month = serializers.DateField(format='%Y-%m')
+    username = serializers.CharField(source='author.username')
+
+    class Meta:
+        model = AuthorMonth
+        fields = ('author', 'username', 'month', 'recipes_count')
@@ -0,0 +1,19 @@
+from analytics.rollups import add_recipes, remove_recipes
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from recipes.models import Recipe
+from recipes.signals import recipes_changed, recipes_changing
+
+
+@receiver(recipes_changing, sender=Recipe)
+@receiver(pre_delete, sender=Recipe)
+def subtract_recipes(sender, recipe_ids=None, instance=None, **kwargs):
+    """Вычитание вклада рецептов из сводок до их изменения или удаления,
+    пока состав и тэги еще в базе.
+    """
+    remove_recipes([instance.pk] if recipe_ids is None else recipe_ids)
+
+
+@receiver(recipes_changed, sender=Recipe)
+def add_recipes_to_rollups(sender, recipe_ids, **kwargs):
+    add_recipes(recipe_ids)
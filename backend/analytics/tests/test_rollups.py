@@ -0,0 +1,188 @@
+from analytics.models import AuthorMonth, IngredientUsage, TagUsage
+from analytics.rollups import ROLLUPS, aggregate, apply, rebuild
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.deletion import delete_recipes
+from recipes.management.commands.loadtest import IMAGE
+from recipes.models import Ingredient, IngredientForRecipe, Recipe, Tag
+from recipes.ndjson import import_batch
+from rest_framework.test import APIClient
+from users.models import User
+
+
+def snapshot():
+    """Строки сводок: модель -> {ключ: значения}."""
+    rows = {}
+    for model, (key_fields, value_fields) in ROLLUPS.items():
+        rows[model] = {
+            row[:len(key_fields)]: row[len(key_fields):]
+            for row in model.objects.values_list(*key_fields, *value_fields)
+        }
+    return rows
+
+
+class RollupsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret', is_staff=True,
+            is_superuser=True,
+        )
+        cls.breakfast, cls.dinner, cls.lunch = (
+            Tag.objects.create(name=slug, color=color, slug=slug)
+            for slug, color in (('breakfast', '#E26C2D'),
+                                ('dinner', '#49B64E'),
+                                ('lunch', '#8775D2'))
+        )
+        cls.eggs, cls.milk, cls.salt = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('яйца', 'шт'), ('молоко', 'мл'),
+                               ('соль', 'г'))
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.author)
+
+    def assert_matches_rebuild(self):
+        """Сводки после поддержки изменений равны полному пересчету."""
+        maintained = snapshot()
+        rebuild()
+        self.assertEqual(maintained, snapshot())
+        return maintained
+
+    def write(self, method, path, tags, ingredients, cooking_time):
+        response = getattr(self.api, method)(path, {
+            'name': 'Омлет', 'text': 'Взбить и пожарить.', 'image': IMAGE,
+            'cooking_time': cooking_time,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [{'id': ingredient.id, 'amount': amount}
+                            for ingredient, amount in ingredients],
+        }, format='json')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return response.json()['id']
+
+    def test_api_create_update_delete(self):
+        first = self.write('post', '/api/recipes/',
+                           [self.breakfast, self.dinner],
+                           [(self.eggs, 2), (self.milk, 100)], 10)
+        second = self.write('post', '/api/recipes/', [self.breakfast],
+                            [(self.eggs, 3)], 20)
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (2, 5))
+        self.assertEqual(rows[TagUsage][(self.breakfast.id, )], (2, 30))
+
+        self.write('put', f'/api/recipes/{first}/',
+                   [self.breakfast, self.lunch],
+                   [(self.eggs, 4), (self.salt, 5)], 15)
+        rows = self.assert_matches_rebuild()
+        self.assertNotIn((self.dinner.id, ), rows[TagUsage])
+        self.assertNotIn((self.milk.id, ), rows[IngredientUsage])
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (2, 7))
+        self.assertEqual(rows[TagUsage][(self.breakfast.id, )], (2, 35))
+        self.assertEqual(rows[TagUsage][(self.lunch.id, )], (1, 15))
+
+        response = self.api.delete(f'/api/recipes/{second}/')
+        self.assertEqual(response.status_code, 204)
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (1, 4))
+        self.assertEqual(sum(count for count, in
+                             rows[AuthorMonth].values()), 1)
+
+        Recipe.objects.get(pk=first).delete()
+        self.assertEqual(self.assert_matches_rebuild(),
+                         {model: {} for model in ROLLUPS})
+
+    def test_import(self):
+        self.write('post', '/api/recipes/', [self.breakfast],
+                   [(self.eggs, 2)], 10)
+        record = {
+            'name': 'Блины', 'text': 'Смешать и пожарить.',
+            'cooking_time': 30, 'pub_date': '2022-08-01T10:00:00+00:00',
+            'image': 'pancakes.gif',
+            'author': {'email': 'new@example.com', 'username': 'new',
+                       'first_name': 'Имя', 'last_name': 'Фамилия'},
+            'tags': ['breakfast', 'brunch'],
+            'ingredients': [
+                {'name': 'яйца', 'measurement_unit': 'шт', 'amount': 3},
+                {'name': 'мука', 'measurement_unit': 'г', 'amount': 200},
+            ],
+        }
+        self.assertEqual(import_batch([record, record]), (2, []))
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (3, 8))
+        self.assertEqual(rows[TagUsage][(self.breakfast.id, )], (3, 70))
+        self.assertIn(
+            (User.objects.get(username='new').id,
+             Recipe.objects.filter(name='Блины').first().pub_date.date()
+             .replace(day=1)),
+            rows[AuthorMonth],
+        )
+
+        delete_recipes(Recipe.objects.filter(name='Блины')
+                       .values_list('id', flat=True))
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (1, 2))
+
+    def test_admin(self):
+        first = self.write('post', '/api/recipes/', [self.breakfast],
+                           [(self.eggs, 2)], 10)
+        second = self.write('post', '/api/recipes/', [self.dinner],
+                            [(self.milk, 100)], 20)
+        self.client.force_login(self.author)
+        row = IngredientForRecipe.objects.get(recipe_id=first)
+        prefix = 'recipe_for_ingridient'
+        path = f'/admin/recipes/recipe/{first}/change/'
+        response = self.client.post(path, {
+            'name': 'Омлет', 'text': 'Взбить и пожарить.',
+            'cooking_time': 12, 'author': self.author.id,
+            'tags': [self.lunch.id],
+            f'{prefix}-TOTAL_FORMS': 2, f'{prefix}-INITIAL_FORMS': 1,
+            f'{prefix}-MIN_NUM_FORMS': 1, f'{prefix}-MAX_NUM_FORMS': 1000,
+            f'{prefix}-0-id': row.id, f'{prefix}-0-recipe': first,
+            f'{prefix}-0-ingredient': self.eggs.id,
+            f'{prefix}-0-amount': 5,
+            f'{prefix}-1-recipe': first,
+            f'{prefix}-1-ingredient': self.salt.id,
+            f'{prefix}-1-amount': 1,
+        })
+        self.assertEqual(response.status_code, 302)
+        rows = self.assert_matches_rebuild()
+        self.assertNotIn((self.breakfast.id, ), rows[TagUsage])
+        self.assertEqual(rows[TagUsage][(self.lunch.id, )], (1, 12))
+        self.assertEqual(rows[IngredientUsage][(self.eggs.id, )], (1, 5))
+
+        row = IngredientForRecipe.objects.get(recipe_id=first,
+                                              ingredient=self.salt)
+        response = self.client.post(
+            f'/admin/recipes/ingredientforrecipe/{row.id}/change/',
+            {'recipe': second, 'ingredient': self.salt.id, 'amount': 3},
+        )
+        self.assertEqual(response.status_code, 302)
+        rows = self.assert_matches_rebuild()
+        self.assertEqual(rows[IngredientUsage][(self.salt.id, )], (1, 3))
+
+        response = self.client.post(
+            f'/admin/recipes/ingredientforrecipe/{row.id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        rows = self.assert_matches_rebuild()
+        self.assertNotIn((self.salt.id, ), rows[IngredientUsage])
+
+    def test_apply_is_reversible(self):
+        self.write('post', '/api/recipes/', [self.breakfast, self.dinner],
+                   [(self.eggs, 2), (self.milk, 100)], 10)
+        before = snapshot()
+        contributions = aggregate(Recipe.objects.all())
+        apply(contributions, 1)
+        rows = snapshot()
+        self.assertEqual(rows[IngredientUsage][(self.milk.id, )], (2, 200))
+        self.assertEqual(rows[TagUsage][(self.dinner.id, )], (2, 20))
+        apply(contributions, -1)
+        self.assertEqual(snapshot(), before)
+        apply(contributions, -1)
+        self.assertEqual(snapshot(), {model: {} for model in ROLLUPS})
@@ -0,0 +1,10 @@
+from analytics.views import AuthorMonthView, IngredientUsageView, TagUsageView
+from django.urls import path
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('ingredients/', IngredientUsageView.as_view(), name='ingredients'),
+    path('tags/', TagUsageView.as_view(), name='tags'),
+    path('authors/', AuthorMonthView.as_view(), name='authors'),
+]
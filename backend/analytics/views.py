@@ -0,0 +1,65 @@
+import datetime
+
+from analytics.models import AuthorMonth, IngredientUsage, TagUsage
+from analytics.serializers import (AuthorMonthSerializer,
+                                   IngredientUsageSerializer,
+                                   TagUsageSerializer)
+from recipes.paginator import LimitPageNumberPagination
+from rest_framework import generics
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAdminUser
+
+
+class IngredientUsageView(generics.ListAPIView):
+    """Самые используемые ингридиенты: в скольких рецептах встречаются и
+    суммарное количество. Только для сотрудников.
+    """
+    queryset = IngredientUsage.objects.select_related('ingredient')
+    serializer_class = IngredientUsageSerializer
+    permission_classes = (IsAdminUser, )
+    pagination_class = LimitPageNumberPagination
+
+
+class TagUsageView(generics.ListAPIView):
+    """Тэги с количеством рецептов и средним временем приготовления.
+    Только для сотрудников.
+    """
+    queryset = TagUsage.objects.select_related('tag')
+    serializer_class = TagUsageSerializer
+    permission_classes = (IsAdminUser, )
+    pagination_class = None
+
+
+class AuthorMonthView(generics.ListAPIView):
+    """Количество рецептов авторов по месяцам публикации.
+    Параметры: author - id автора, since - первый месяц в формате
+    ГГГГ-ММ. Только для сотрудников.
+    """
+    serializer_class = AuthorMonthSerializer
+    permission_classes = (IsAdminUser, )
+    pagination_class = LimitPageNumberPagination
+
+    def get_queryset(self):
+        """Сводка с фильтрами по автору и начальному месяцу.
+
+        Raises:
+            ParseError: неверный id автора или месяц.
+
+        Returns:
+            QuerySet: строки AuthorMonth.
+        """
+        author = self.request.query_params.get('author')
+        since = self.request.query_params.get('since')
+        filters = {}
+        if author:
+            if not author.isdigit():
+                raise ParseError('Неверный id автора.')
+            filters['author_id'] = author
+        if since:
+            try:
+                filters['month__gte'] = datetime.datetime.strptime(
+                    since, '%Y-%m'
+                ).date()
+            except ValueError:
+                raise ParseError('Месяц указывается в формате ГГГГ-ММ.')
+        return AuthorMonth.objects.select_related('author').filter(**filters)
@@ -0,0 +1,24 @@
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.asgi import get_asgi_application
+from foodgram.limits import BodyLimit, limit, send_too_large
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """Точка входа ASGI.
+    Каждый запрос выполняется в своем ThreadSensitiveContext, чтобы
+    синхронная работа с БД разных запросов не выстраивалась в очередь
+    в одном общем потоке. Django дочитывает тело запроса до
+    промежуточных слоев, поэтому его размер ограничивается здесь.
+    """
+    if scope['type'] == 'http':
+        receive = BodyLimit(receive, limit('MAX_BODY_BYTES'))
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
+    if getattr(receive, 'exceeded', False):
+        await send_too_large(send)
@@ -0,0 +1,16 @@
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared(backend):
+    """Бэкенд кэша общий для процессов (memcached, БД, файлы).
+
+    Args:
+        backend (str): путь к классу бэкенда из CACHES.
+
+    Returns:
+        bool: версии и записи видны всем процессам.
+    """
+    return backend not in PROCESS_LOCAL_BACKENDS
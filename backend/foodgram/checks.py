@@ -0,0 +1,38 @@
+"""Проверка кэша при запуске.
+
+Инвалидация кэшей проекта построена на версиях в кэше Django
+(recipes.cache): страницы анонимных запросов, индекс поиска по
+продуктам, счетчики тэгов, избранное, авторизация по токену, лимиты
+запросов. Версию, увеличенную в одном процессе, остальные видят только
+через общий бэкенд (memcached, БД, файлы). С кэшем в памяти процесса
+записи, сделанные воркером фоновых задач или другим воркером gunicorn,
+не сбрасывают чужие кэши до истечения их TTL.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from foodgram.caches import is_shared
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Предупреждение о кэше в памяти процесса и ошибка для общего
+    уровня кэша авторизации, указывающего на такой кэш.
+    """
+    messages = []
+    if not is_shared(settings.CACHES['default']['BACKEND']):
+        messages.append(Warning(
+            'Кэш default хранится в памяти процесса: инвалидация кэшей '
+            'не доходит до других процессов.',
+            hint='Для нескольких воркеров gunicorn и воркера фоновых '
+                 'задач задайте общий CACHE_BACKEND, например '
+                 'django.core.cache.backends.memcached.PyMemcacheCache.',
+            id='foodgram.W001',
+        ))
+    alias = settings.TOKEN_AUTH_CACHE.get('shared_cache')
+    if alias and (alias not in settings.CACHES
+                  or not is_shared(settings.CACHES[alias]['BACKEND'])):
+        messages.append(Error(
+            f'TOKEN_CACHE_SHARED={alias} не указывает на общий кэш.',
+            id='foodgram.E001',
+        ))
+    return messages
@@ -0,0 +1,27 @@
+from django.db.backends.postgresql import base
+from foodgram.db.pool import PooledDatabaseWrapperMixin
+from psycopg2 import extensions
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений.
+    При выдаче соединение проверяется запросом SELECT 1, при возврате
+    незавершенная транзакция откатывается.
+    """
+
+    def check_pooled_connection(self, connection):
+        if connection.closed:
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+
+    def reset_pooled_connection(self, connection):
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        return True
@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+from foodgram.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite с пулом соединений, для локальной проверки пула.
+    """
+
+    def check_pooled_connection(self, connection):
+        connection.execute('SELECT 1')
+        return True
+
+    def reset_pooled_connection(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        return True
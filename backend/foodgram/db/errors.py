@@ -0,0 +1,47 @@
+"""Счетчики ошибок БД, дошедших до обработчика запроса: нарушения
+ограничений, взаимоблокировки, ошибки сериализации транзакций и
+блокировка SQLite. Видны в /api/metrics/ как db.errors.<вид>.
+"""
+import sys
+
+from django.core.signals import got_request_exception
+from django.db import DatabaseError, IntegrityError, OperationalError
+from django.dispatch import receiver
+from foodgram import metrics
+
+DEADLOCK = '40P01'
+SERIALIZATION_FAILURE = '40001'
+
+
+def error_kind(error):
+    """Вид ошибки БД.
+
+    Args:
+        error (Exception): исключение запроса.
+
+    Returns:
+        str: integrity, deadlock, serialization, locked, operational,
+        database или None, если это не ошибка БД.
+    """
+    if isinstance(error, IntegrityError):
+        return 'integrity'
+    if isinstance(error, OperationalError):
+        code = getattr(error.__cause__, 'pgcode', None)
+        if code == DEADLOCK:
+            return 'deadlock'
+        if code == SERIALIZATION_FAILURE:
+            return 'serialization'
+        if 'database is locked' in str(error):
+            return 'locked'
+        return 'operational'
+    if isinstance(error, DatabaseError):
+        return 'database'
+    return None
+
+
+@receiver(got_request_exception)
+def count_database_error(sender, **kwargs):
+    kind = error_kind(sys.exc_info()[1])
+    if kind is not None:
+        metrics.incr('db.errors')
+        metrics.incr(f'db.errors.{kind}')
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import deque
+
+from django.db import DatabaseError
+from foodgram import metrics
+
+
+class PoolTimeout(DatabaseError):
+    """Свободное соединение не появилось за отведенное время."""
+
+
+class ConnectionPool:
+    """Пул соединений с БД.
+
+    Соединения создаются функцией connect. Сверх max_size допускается
+    max_overflow временных соединений, которые закрываются при возврате,
+    если их никто не ждет.
+    При выдаче соединение проверяется функцией check, а при возврате
+    приводится в исходное состояние функцией reset. Соединения старше
+    recycle секунд пересоздаются.
+    """
+
+    def __init__(self, name, connect, check=None, reset=None, min_size=1,
+                 max_size=10, max_overflow=0, timeout=30.0, recycle=None):
+        self.name = name
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._filled = False
+        self._cond = threading.Condition()
+        prefix = f'db.pool.{name}'
+        metrics.gauge(f'{prefix}.size', lambda: self._size)
+        metrics.gauge(f'{prefix}.in_use', lambda: self._in_use)
+        metrics.gauge(f'{prefix}.idle', lambda: len(self._idle))
+        metrics.gauge(f'{prefix}.overflow',
+                      lambda: max(0, self._size - self.max_size))
+
+    def _open(self):
+        connection = self._connect()
+        self._created[id(connection)] = time.monotonic()
+        metrics.incr(f'db.pool.{self.name}.created')
+        return connection
+
+    def _discard(self, connection):
+        self._created.pop(id(connection), None)
+        metrics.incr(f'db.pool.{self.name}.closed')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _expired(self, connection):
+        if self.recycle is None:
+            return False
+        created = self._created.get(id(connection), 0)
+        return time.monotonic() - created > self.recycle
+
+    def _healthy(self, connection):
+        if self._expired(connection):
+            return False
+        if self._check is None:
+            return True
+        try:
+            return self._check(connection)
+        except Exception:
+            return False
+
+    def fill(self):
+        """Предварительное открытие min_size соединений.
+        Место в пуле занимается под каждое соединение отдельно: при ошибке
+        открытия освобождается только оно, а следующий вызов fill
+        дооткрывает недостающие соединения.
+        """
+        while True:
+            with self._cond:
+                if self._filled:
+                    return
+                if self._size >= self.min_size:
+                    self._filled = True
+                    return
+                self._size += 1
+            try:
+                connection = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(connection)
+                self._cond.notify()
+
+    def getconn(self):
+        """Выдача соединения из пула.
+
+        Raises:
+            PoolTimeout: все соединения заняты дольше timeout секунд.
+
+        Returns:
+            connection: рабочее соединение с БД.
+        """
+        self.fill()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self.max_size + self.max_overflow:
+                    connection = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr(f'db.pool.{self.name}.timeouts')
+                    raise PoolTimeout(
+                        f'Пул соединений {self.name} исчерпан.'
+                    )
+                self._waiting += 1
+                self._cond.wait(remaining)
+                self._waiting -= 1
+            self._in_use += 1
+        metrics.observe(f'db.pool.{self.name}.wait',
+                        time.monotonic() - started)
+        if connection is not None and not self._healthy(connection):
+            metrics.incr(f'db.pool.{self.name}.unhealthy')
+            self._discard(connection)
+            connection = None
+        if connection is None:
+            try:
+                connection = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return connection
+
+    def putconn(self, connection, close=False):
+        """Возврат соединения в пул.
+
+        Args:
+            connection: соединение, выданное getconn.
+            close (bool, optional): закрыть соединение вместо возврата.
+            Defaults to False.
+        """
+        if not close and self._reset is not None:
+            try:
+                close = not self._reset(connection)
+            except Exception:
+                close = True
+        with self._cond:
+            self._in_use -= 1
+            overflow = self._size > self.max_size and not self._waiting
+            if close or overflow:
+                self._size -= 1
+            else:
+                self._idle.append(connection)
+                connection = None
+            self._cond.notify()
+        if connection is not None:
+            self._discard(connection)
+
+    def closeall(self):
+        """Закрытие всех свободных соединений."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._filled = False
+        for connection in idle:
+            self._discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, connect, check=None, reset=None):
+    """Пул соединений для алиаса базы данных, создается при первом вызове.
+
+    Args:
+        alias (str): алиас базы данных из DATABASES.
+        settings_dict (dict): настройки базы данных, ключ POOL.
+        connect (callable): создание нового соединения.
+        check (callable, optional): проверка соединения при выдаче.
+        reset (callable, optional): сброс соединения при возврате.
+
+    Returns:
+        ConnectionPool: пул соединений.
+    """
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                alias, connect, check=check, reset=reset,
+                **settings_dict.get('POOL', {})
+            )
+        return _pools[alias]
+
+
+class PooledDatabaseWrapperMixin:
+    """Примесь для DatabaseWrapper: соединения берутся из пула и
+    возвращаются в него вместо закрытия.
+    """
+
+    def check_pooled_connection(self, connection):
+        return True
+
+    def reset_pooled_connection(self, connection):
+        return True
+
+    def get_pool(self, conn_params):
+        return get_pool(
+            self.alias,
+            self.settings_dict,
+            lambda: super(PooledDatabaseWrapperMixin,
+                          self).get_new_connection(conn_params),
+            check=self.check_pooled_connection,
+            reset=self.reset_pooled_connection,
+        )
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).getconn()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            _pools[self.alias].putconn(self.connection)
@@ -0,0 +1,172 @@
+"""Чтение с реплик БД с возвратом на основную базу после записи.
+
+Маршрут задается на время запроса в ReplicaRoutingMiddleware. Вне
+запросов (команды, воркер задач) и во всех небезопасных запросах чтение
+идет с основной базы. Безопасный запрос читает с реплики, пока не
+выполнит запись; клиент, недавно писавший в базу, читает с основной
+базы в течение DATABASE_REPLICA_PIN секунд, чтобы видеть свои изменения
+несмотря на отставание реплик. Чтение внутри transaction.atomic()
+основной базы тоже идет с нее. Недоступная реплика пропускается на
+DATABASE_REPLICA_RETRY секунд, без доступных реплик чтение идет с
+основной базы.
+"""
+import contextlib
+import contextvars
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from foodgram import metrics
+from foodgram.caches import is_shared
+
+PIN_COOKIE = 'foodgram_primary'
+PIN_KEY = 'foodgram:pin:{}'
+PIN_SALT = 'foodgram.db.routers.pin'
+
+_unavailable = {}
+
+
+def replica_available(alias):
+    """Реплика принимает соединения.
+    После ошибки соединения реплика не проверяется
+    DATABASE_REPLICA_RETRY секунд.
+
+    Args:
+        alias (str): алиас реплики.
+
+    Returns:
+        bool: с реплики можно читать.
+    """
+    retry_at = _unavailable.get(alias)
+    if retry_at is not None and retry_at > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable[alias] = (time.monotonic()
+                               + settings.DATABASE_REPLICA_RETRY)
+        metrics.incr(f'db.replica.{alias}.unavailable')
+        return False
+    _unavailable.pop(alias, None)
+    return True
+
+
+class RoutingState:
+    """Маршрут текущего запроса: можно ли читать с реплики и была ли
+    запись.
+    """
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing', default=None)
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Чтение с основной базы внутри блока для текущего запроса.
+    Нужно там, где результат чтения переживает запрос (кэш ответов):
+    реплика может еще не получить только что зафиксированную запись.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    use_replica = state.use_replica
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = use_replica and not state.wrote
+
+
+class ReplicaRouter:
+    """Роутер Django: запись и миграции - основная база, чтение - случайная
+    реплика из DATABASE_REPLICAS, если маршрут запроса это разрешает.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or not state.use_replica or not replicas:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        for alias in random.sample(replicas, len(replicas)):
+            if replica_available(alias):
+                return alias
+        metrics.incr('db.replica.fallback')
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.use_replica = False
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _pin_key(request):
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if not header:
+        return None
+    return PIN_KEY.format(hashlib.sha256(header.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    """Выбор маршрута БД на время запроса.
+    Закрепление за основной базой хранится в подписанной cookie со
+    временем выдачи. Для клиентов с токеном без cookie оно дублируется в
+    кэше по заголовку Authorization, только если кэш общий для
+    процессов: иначе следующий запрос в другой воркер его не увидит.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.shared_pins = is_shared(settings.CACHES['default']['BACKEND'])
+
+    def is_pinned(self, request):
+        if request.get_signed_cookie(
+            PIN_COOKIE, default=None, salt=PIN_SALT,
+            max_age=settings.DATABASE_REPLICA_PIN,
+        ):
+            return True
+        key = _pin_key(request) if self.shared_pins else None
+        return key is not None and cache.get(key) is not None
+
+    def pin(self, request, response):
+        window = settings.DATABASE_REPLICA_PIN
+        response.set_signed_cookie(PIN_COOKIE, '1', salt=PIN_SALT,
+                                   max_age=window, httponly=True,
+                                   samesite='Lax')
+        key = _pin_key(request) if self.shared_pins else None
+        if key is not None:
+            cache.set(key, 1, window)
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        pinned = safe and self.is_pinned(request)
+        if pinned:
+            metrics.incr('db.replica.pinned_requests')
+        state = RoutingState(use_replica=safe and not pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            self.pin(request, response)
+        return response
@@ -0,0 +1,173 @@
+"""Ограничения ресурсов на запрос: размер тела, размер изображения,
+число ингридиентов, размер страницы и время выполнения SQL.
+Значения задаются в settings.RESOURCE_LIMITS, каждый отказ считается в
+метриках limits.*.
+
+Время SQL (DB_STATEMENT_TIMEOUT) ограничивается только в запросах к
+API: соединения команд, миграций и воркера фоновых задач работают без
+ограничения.
+"""
+import io
+import json
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.handlers.wsgi import LimitedStream
+from django.db import DatabaseError, OperationalError, connections
+from django.http import JsonResponse
+from foodgram import metrics
+
+QUERY_CANCELED = '57014'
+TOO_LARGE = 'errors: Слишком большой запрос.'
+
+
+def limit(name):
+    """Значение ограничения из settings.RESOURCE_LIMITS."""
+    return settings.RESOURCE_LIMITS[name]
+
+
+def reject(name):
+    """Учет отказа по ограничению в метриках."""
+    metrics.incr('limits.rejected')
+    metrics.incr(f'limits.rejected.{name}')
+
+
+class StatementTimeout:
+    """Обертка выполнения SQL: перед первым запросом на соединении
+    PostgreSQL задает statement_timeout, release возвращает значение по
+    умолчанию.
+    """
+
+    def __init__(self, milliseconds):
+        self.milliseconds = milliseconds
+        self.applied = []
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        if (connection.vendor == 'postgresql'
+                and connection not in self.applied):
+            self.applied.append(connection)
+            context['cursor'].cursor.execute(
+                f'SET statement_timeout = {int(self.milliseconds)}'
+            )
+        return execute(sql, params, many, context)
+
+    def release(self):
+        """Сброс statement_timeout до возврата соединения в пул.
+        Соединение, на котором сброс не удался, закрывается.
+        """
+        for connection in self.applied:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET statement_timeout')
+            except DatabaseError:
+                connection.close()
+        self.applied = []
+
+
+def read_chunked(request, max_bytes):
+    """Чтение тела без Content-Length (Transfer-Encoding: chunked) под
+    WSGI не дальше max_bytes. Прочитанное тело подставляется в запрос.
+
+    Args:
+        request (HttpRequest): запрос.
+        max_bytes (int): наибольший размер тела.
+
+    Returns:
+        bool: тело поместилось в max_bytes.
+    """
+    body = request.META['wsgi.input'].read(max_bytes + 1)
+    if len(body) > max_bytes:
+        return False
+    request.META['CONTENT_LENGTH'] = str(len(body))
+    request._stream = LimitedStream(io.BytesIO(body), len(body))
+    return True
+
+
+class ResourceLimitMiddleware:
+    """Отказ в запросах с телом больше MAX_BODY_BYTES до разбора тела,
+    ограничение времени SQL запроса DB_STATEMENT_TIMEOUT и ответ 503
+    вместо 500 на запросы, прерванные statement_timeout PostgreSQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        max_bytes = limit('MAX_BODY_BYTES')
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        chunked = (
+            'chunked' in request.META.get('HTTP_TRANSFER_ENCODING', '')
+            and not request.META.get('CONTENT_LENGTH')
+            and 'wsgi.input' in request.META
+        )
+        if length > max_bytes or (
+            chunked and not read_chunked(request, max_bytes)
+        ):
+            reject('body')
+            return JsonResponse(TOO_LARGE, safe=False, status=413)
+        if not settings.DB_STATEMENT_TIMEOUT:
+            return self.get_response(request)
+        timeout = StatementTimeout(settings.DB_STATEMENT_TIMEOUT)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timeout))
+                return self.get_response(request)
+        finally:
+            timeout.release()
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, OperationalError):
+            return None
+        if getattr(exception.__cause__, 'pgcode', None) != QUERY_CANCELED:
+            return None
+        reject('statement_timeout')
+        return JsonResponse(
+            'errors: Запрос выполнялся слишком долго.', safe=False,
+            status=503,
+        )
+
+
+class BodyLimit:
+    """Обертка receive ASGI: тело длиннее MAX_BODY_BYTES, в том числе без
+    Content-Length, не дочитывается. Django получает http.disconnect и
+    не обрабатывает запрос, ответ 413 отправляет send_too_large.
+    """
+
+    def __init__(self, receive, max_bytes):
+        self.receive = receive
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.exceeded = False
+
+    async def __call__(self):
+        if self.exceeded:
+            return {'type': 'http.disconnect'}
+        message = await self.receive()
+        if message['type'] == 'http.request':
+            self.received += len(message.get('body', b''))
+            if self.received > self.max_bytes:
+                self.exceeded = True
+                reject('body')
+                return {'type': 'http.disconnect'}
+        return message
+
+
+async def send_too_large(send):
+    """Ответ 413 в обход Django для тела, отвергнутого BodyLimit.
+
+    Args:
+        send (callable): send ASGI.
+    """
+    body = json.dumps(TOO_LARGE, ensure_ascii=False).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 413,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
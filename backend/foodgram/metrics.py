@@ -0,0 +1,70 @@
+"""Простые метрики процесса: счетчики, замеры времени и датчики.
+Значения живут в памяти воркера и отдаются администратору через
+/api/metrics/.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+_gauges = {}
+
+
+def incr(name, value=1):
+    """Увеличение счетчика.
+
+    Args:
+        name (str): имя счетчика.
+        value (int, optional): приращение. Defaults to 1.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    """Замер величины (обычно времени в секундах).
+
+    Args:
+        name (str): имя замера.
+        value (float): значение.
+    """
+    with _lock:
+        count, total, peak = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + value, max(peak, value))
+
+
+def gauge(name, func):
+    """Регистрация датчика, значение которого вычисляется при чтении.
+
+    Args:
+        name (str): имя датчика.
+        func (callable): функция без аргументов, возвращающая число.
+    """
+    with _lock:
+        _gauges[name] = func
+
+
+def snapshot():
+    """Снимок всех метрик процесса.
+
+    Returns:
+        dict: counters, timings (count, total, max, avg) и gauges.
+    """
+    with _lock:
+        counters = dict(_counters)
+        timings = dict(_timings)
+        gauges = dict(_gauges)
+    return {
+        'counters': counters,
+        'timings': {
+            name: {
+                'count': count,
+                'total': total,
+                'max': peak,
+                'avg': total / count if count else 0.0,
+            }
+            for name, (count, total, peak) in timings.items()
+        },
+        'gauges': {name: func() for name, func in gauges.items()},
+    }
@@ -0,0 +1,261 @@
+"""Профилирование отдельного запроса по требованию сотрудника.
+
+Запрос профилируется, если в нем есть заголовок X-Profile или параметр
+?_profile= и пользователь - сотрудник (is_staff) по сессии или токену.
+Значение memory дополнительно включает tracemalloc. Без флага
+промежуточный слой только проверяет заголовок и параметр, а при
+PROFILING['ENABLED'] = False исключается из цепочки целиком.
+
+Результат сохраняется в PROFILING['DIR']: <id>.prof - статистика
+cProfile для pstats или snakeviz, <id>.json - сводка с запросами SQL и
+их временем, самыми долгими функциями, временем методов
+сериализаторов проекта (get_is_favorited, get_is_subscribed и т.п.) и,
+если запрошено, местами выделения памяти. Идентификатор и основные
+цифры возвращаются в заголовках X-Profile-*, сводку отдает
+/api/profiles/<id>/.
+Для потоковых ответов профиль заканчивается до отдачи тела.
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from foodgram import metrics
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+MEMORY = 'memory'
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+MAX_QUERIES = 500
+
+
+def profile_path(profile_id, extension):
+    """Путь к файлу профиля.
+
+    Args:
+        profile_id (str): идентификатор профиля.
+        extension (str): 'json' или 'prof'.
+
+    Returns:
+        str: путь в PROFILING['DIR'].
+    """
+    return os.path.join(settings.PROFILING['DIR'],
+                        f'{profile_id}.{extension}')
+
+
+def _function_name(key):
+    filename, line, name = key
+    return f'{filename}:{line}({name})'
+
+
+def _entry(key, stat):
+    calls, total, cumulative = stat[1], stat[2], stat[3]
+    return {
+        'function': _function_name(key),
+        'calls': calls,
+        'total_ms': round(total * 1000, 3),
+        'cumulative_ms': round(cumulative * 1000, 3),
+    }
+
+
+def _is_serializer_method(key):
+    filename, _, name = key
+    return (filename.startswith(str(settings.BASE_DIR))
+            and os.path.basename(filename) == 'serializers.py'
+            and (name.startswith('get_') or name == 'to_representation'))
+
+
+class SQLTimer:
+    """Обертка выполнения SQL: текст, база и время каждого запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+    def summary(self):
+        return {
+            'count': len(self.queries),
+            'total_ms': round(sum(query['ms'] for query in self.queries), 3),
+            'queries': self.queries[:MAX_QUERIES],
+        }
+
+
+class ProfilingMiddleware:
+    """Профилирование запроса сотрудника под cProfile с временем SQL и,
+    по запросу, tracemalloc.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING['HEADER'].upper().replace(
+            '-', '_')
+        self.param = settings.PROFILING['QUERY_PARAM']
+
+    def __call__(self, request):
+        mode = request.META.get(self.header) or request.GET.get(self.param)
+        if not mode or not self.is_staff(request):
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def is_staff(self, request):
+        """Сотрудник по сессии или по токену DRF.
+
+        Args:
+            request (HttpRequest): запрос.
+
+        Returns:
+            bool: пользователь - сотрудник.
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        drf_request = Request(request, authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            return drf_request.user.is_staff
+        except APIException:
+            return False
+
+    def profile(self, request, mode):
+        """Выполнение запроса под профилировщиком и сохранение профиля.
+
+        Args:
+            request (HttpRequest): запрос.
+            mode (str): значение флага, memory включает tracemalloc.
+
+        Returns:
+            HttpResponse: ответ с заголовками X-Profile-*.
+        """
+        profile_id = str(uuid.uuid4())
+        timer = SQLTimer()
+        trace_memory = mode == MEMORY and not tracemalloc.is_tracing()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                wall = time.perf_counter() - started
+                cpu = time.process_time() - cpu_started
+                memory = self.memory_summary() if trace_memory else None
+                if trace_memory:
+                    tracemalloc.stop()
+        summary = {
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'created': timezone.now().isoformat(),
+            'wall_ms': round(wall * 1000, 3),
+            'cpu_ms': round(cpu * 1000, 3),
+            'sql': timer.summary(),
+            **self.stats_summary(profiler),
+        }
+        if memory is not None:
+            summary['memory'] = memory
+        self.store(profile_id, profiler, summary)
+        metrics.incr('profiling.requests')
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Wall-Ms'] = summary['wall_ms']
+        response['X-Profile-Sql-Ms'] = summary['sql']['total_ms']
+        response['X-Profile-Queries'] = summary['sql']['count']
+        return response
+
+    def stats_summary(self, profiler):
+        """Самые долгие функции и время методов сериализаторов.
+
+        Args:
+            profiler (Profile): остановленный профилировщик.
+
+        Returns:
+            dict: списки top и serializer_methods.
+        """
+        stats = pstats.Stats(profiler).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3],
+                        reverse=True)
+        return {
+            'top': [_entry(key, stat)
+                    for key, stat in ranked[:TOP_FUNCTIONS]],
+            'serializer_methods': [
+                _entry(key, stat) for key, stat in ranked
+                if _is_serializer_method(key)
+            ],
+        }
+
+    def memory_summary(self):
+        """Пик памяти и основные места выделения за время запроса.
+
+        Returns:
+            dict: peak_kb и список top.
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics('lineno')
+        return {
+            'peak_kb': round(peak / 1024, 1),
+            'top': [
+                {
+                    'where': str(stat.traceback),
+                    'size_kb': round(stat.size / 1024, 1),
+                    'count': stat.count,
+                }
+                for stat in statistics[:TOP_ALLOCATIONS]
+            ],
+        }
+
+    def store(self, profile_id, profiler, summary):
+        """Сохранение профиля и удаление старых сверх PROFILING['KEEP'].
+
+        Args:
+            profile_id (str): идентификатор профиля.
+            profiler (Profile): остановленный профилировщик.
+            summary (dict): сводка профиля.
+        """
+        directory = settings.PROFILING['DIR']
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(profile_path(profile_id, 'prof'))
+        with open(profile_path(profile_id, 'json'), 'w',
+                  encoding='utf-8') as file:
+            json.dump(summary, file, ensure_ascii=False, default=str)
+        stored = sorted(
+            (entry for entry in os.scandir(directory)
+             if entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime, reverse=True,
+        )
+        for entry in stored[settings.PROFILING['KEEP']:]:
+            name = entry.name[:-len('.json')]
+            for extension in ('json', 'prof'):
+                try:
+                    os.remove(profile_path(name, extension))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,28 @@
+"""Запуск тестов с отдельной базой на месте реплики.
+
+Алиас replica добавляется до создания тестовых баз, поэтому раннер
+создает для него отдельную тестовую базу: в памяти для SQLite,
+test_<имя>_replica для PostgreSQL. Реплика не зеркалит основную базу:
+строки, записанные в одну, не видны в другой, и по ответу видно, с
+какой базы шло чтение (foodgram.tests.test_routers).
+"""
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+REPLICA = 'replica'
+
+
+class ReplicaTestRunner(DiscoverRunner):
+    """Раннер тестов проекта с тестовой базой для реплики."""
+
+    def setup_databases(self, **kwargs):
+        default = connections.databases['default']
+        connections.databases.setdefault(REPLICA, dict(
+            default,
+            TEST=dict(
+                default['TEST'], MIRROR=None,
+                NAME=(None if default['ENGINE'].endswith('sqlite3')
+                      else f"test_{default['NAME']}_{REPLICA}"),
+            ),
+        ))
+        return super().setup_databases(**kwargs)
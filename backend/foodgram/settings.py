@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -29,15 +30,20 @@ INSTALLED_APPS = [
     'djoser',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
+    'analytics.apps.AnalyticsConfig',
     'django_filters',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.limits.ResourceLimitMiddleware',
+    'foodgram.db.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,6 +67,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+SERVER_GATEWAY = os.getenv('SERVER_GATEWAY', default='wsgi')
+ASYNC_READ_VIEWS = SERVER_GATEWAY == 'asgi'
 
 
 DATABASES = {
@@ -71,6 +81,40 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='127.0.0.1'),
         'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+        'POOL': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', default=5)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', default=30)),
+            'recycle': float(os.getenv('DB_POOL_RECYCLE', default=3600)),
+        },
+    }
+}
+
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', default=0))
+
+DATABASE_REPLICAS = []
+for number, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', default='').split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if 'sqlite3' in DATABASES[alias]['ENGINE']:
+        DATABASES[alias]['NAME'] = replica
+    else:
+        DATABASES[alias]['HOST'], _, port = replica.partition(':')
+        DATABASES[alias]['PORT'] = port or DATABASES['default']['PORT']
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN = int(os.getenv('DB_REPLICA_PIN', default=5))
+DATABASE_REPLICA_RETRY = int(os.getenv('DB_REPLICA_RETRY', default=30))
+
+TEST_RUNNER = 'foodgram.runner.ReplicaTestRunner'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
     }
 }
 
@@ -103,6 +147,10 @@ USE_TZ = True
 STATIC_URL = '/backend_static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static')
 
+CATALOGUE_URL = f'{STATIC_URL}catalogue/'
+CATALOGUE_ROOT = os.path.join(STATIC_ROOT, 'catalogue')
+CATALOGUE_PUBLISH_DELAY = float(os.getenv('CATALOGUE_PUBLISH_DELAY', default=5))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -116,9 +164,57 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+}
+
+# CacheBucketStore считает лимиты в кэше default: с LocMemCache по умолчанию
+# лимиты действуют на каждый процесс отдельно, общий лимит дает memcached.
+WRITE_THROTTLE = {
+    'STORE': os.getenv('THROTTLE_STORE', default='recipes.throttling.CacheBucketStore'),
+    'RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', default='30/min'),
+        'ip': os.getenv('THROTTLE_IP_RATE', default='60/min'),
+    },
+}
+
+TOKEN_AUTH_CACHE = {
+    'max_size': int(os.getenv('TOKEN_CACHE_MAX_SIZE', default=10000)),
+    'ttl': int(os.getenv('TOKEN_CACHE_TTL', default=300)),
+    'shared_cache': os.getenv('TOKEN_CACHE_SHARED', default=None),
+}
+
+FACETS_CACHE_TTL = int(os.getenv('FACETS_CACHE_TTL', default=600))
+
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', default=300))
+
+RESOURCE_LIMITS = {
+    'MAX_PAGE_SIZE': int(os.getenv('MAX_PAGE_SIZE', default=100)),
+    'MAX_BODY_BYTES': int(os.getenv('MAX_BODY_BYTES', default=10 * 1024 * 1024)),
+    'MAX_IMAGE_BYTES': int(os.getenv('MAX_IMAGE_BYTES', default=5 * 1024 * 1024)),
+    'MAX_INGREDIENTS': int(os.getenv('MAX_INGREDIENTS', default=50)),
+}
+
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', default='1') == '1',
+    'HEADER': 'X-Profile',
+    'QUERY_PARAM': '_profile',
+    'DIR': os.getenv('PROFILING_DIR', default=os.path.join(tempfile.gettempdir(), 'foodgram-profiles')),
+    'KEEP': int(os.getenv('PROFILING_KEEP', default=50)),
+}
+
+JOB_QUEUE = {
+    'MAX_ATTEMPTS': int(os.getenv('JOB_MAX_ATTEMPTS', default=5)),
+    'BACKOFF_BASE': float(os.getenv('JOB_BACKOFF_BASE', default=10)),
+    'BACKOFF_MAX': float(os.getenv('JOB_BACKOFF_MAX', default=3600)),
+    'STALE_TIMEOUT': float(os.getenv('JOB_STALE_TIMEOUT', default=600)),
+    'KEEP_DONE': float(os.getenv('JOB_KEEP_DONE', default=7 * 24 * 3600)),
 }
 
 DJOSER = {
@@ -127,7 +223,7 @@ DJOSER = {
     },
     'HIDE_USERS': False,
     'SERIALIZERS': {
-        'user': 'users.serializers.CustomUserSerializer',
-        'current_user': 'users.serializers.CustomUserSerializer',
+        'user': 'users.serializers.UserProfileSerializer',
+        'current_user': 'users.serializers.UserProfileSerializer',
     },
 }
@@ -0,0 +1,153 @@
+import io
+
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from foodgram import asgi
+from foodgram.limits import ResourceLimitMiddleware, StatementTimeout
+
+LIMITS = {'MAX_PAGE_SIZE': 100, 'MAX_BODY_BYTES': 100,
+          'MAX_IMAGE_BYTES': 100, 'MAX_INGREDIENTS': 50}
+
+
+def echo(request):
+    return HttpResponse(request.body)
+
+
+class FakeCursor:
+    def __init__(self, log, fail=False):
+        self.log = log
+        self.fail = fail
+        self.cursor = self
+
+    def execute(self, sql, params=None):
+        if self.fail:
+            raise DatabaseError('соединение потеряно')
+        self.log.append(sql)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, vendor='postgresql', fail_reset=False):
+        self.vendor = vendor
+        self.fail_reset = fail_reset
+        self.log = []
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.log, fail=self.fail_reset)
+
+    def close(self):
+        self.closed = True
+
+
+@override_settings(RESOURCE_LIMITS=LIMITS)
+class BodyLimitTest(SimpleTestCase):
+
+    def chunked_request(self, body):
+        request = RequestFactory().post('/api/recipes/', content_type='')
+        del request.META['CONTENT_LENGTH']
+        request.META['HTTP_TRANSFER_ENCODING'] = 'chunked'
+        request.META['wsgi.input'] = io.BytesIO(body)
+        return request
+
+    def test_content_length_over_limit(self):
+        request = RequestFactory().post('/api/recipes/', b'x' * 101,
+                                        content_type='text/plain')
+        response = ResourceLimitMiddleware(echo)(request)
+        self.assertEqual(response.status_code, 413)
+
+    def test_chunked_body_over_limit(self):
+        request = self.chunked_request(b'x' * 101)
+        response = ResourceLimitMiddleware(echo)(request)
+        self.assertEqual(response.status_code, 413)
+
+    def test_chunked_body_within_limit_is_readable(self):
+        request = self.chunked_request(b'x' * 100)
+        response = ResourceLimitMiddleware(echo)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'x' * 100)
+
+    def run_asgi(self, chunks):
+        messages = [{'type': 'http.request', 'body': chunk,
+                     'more_body': True} for chunk in chunks]
+        messages.append({'type': 'http.request', 'body': b''})
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {
+                'type': 'http.disconnect'
+            }
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/api/recipes/',
+            'root_path': '', 'query_string': b'', 'scheme': 'http',
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 1),
+            'headers': [(b'host', b'localhost'),
+                        (b'content-type', b'application/json')],
+        }
+        async_to_sync(asgi.application)(scope, receive, send)
+        return sent[0]['status'], len(messages)
+
+    def test_asgi_stops_reading_over_limit(self):
+        status, unread = self.run_asgi([b'x' * 60] * 10)
+        self.assertEqual(status, 413)
+        self.assertGreater(unread, 0)
+
+    def test_asgi_within_limit_reaches_django(self):
+        status, _ = self.run_asgi([b'{}'])
+        self.assertEqual(status, 401)
+
+
+class StatementTimeoutTest(SimpleTestCase):
+
+    def execute(self, timeout, target):
+        context = {'connection': target, 'cursor': target.cursor()}
+        return timeout(lambda *args: 'result', 'SELECT 1', None, False,
+                       context)
+
+    def test_set_once_per_connection_and_reset(self):
+        timeout = StatementTimeout(1500)
+        target = FakeConnection()
+        self.assertEqual(self.execute(timeout, target), 'result')
+        self.execute(timeout, target)
+        self.assertEqual(target.log, ['SET statement_timeout = 1500'])
+        timeout.release()
+        self.assertEqual(target.log[-1], 'RESET statement_timeout')
+
+    def test_other_vendors_untouched(self):
+        timeout = StatementTimeout(1500)
+        target = FakeConnection(vendor='sqlite')
+        self.execute(timeout, target)
+        timeout.release()
+        self.assertEqual(target.log, [])
+
+    def test_failed_reset_closes_connection(self):
+        timeout = StatementTimeout(1500)
+        target = FakeConnection()
+        self.execute(timeout, target)
+        target.fail_reset = True
+        timeout.release()
+        self.assertTrue(target.closed)
+
+    @override_settings(DB_STATEMENT_TIMEOUT=1500)
+    def test_wrapper_only_during_request(self):
+        wrappers = []
+
+        def view(request):
+            wrappers.append(list(connection.execute_wrappers))
+            return HttpResponse()
+
+        ResourceLimitMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(len(wrappers[0]), 1)
+        self.assertIsInstance(wrappers[0][0], StatementTimeout)
+        self.assertEqual(connection.execute_wrappers, [])
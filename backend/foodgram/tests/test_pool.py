@@ -0,0 +1,82 @@
+from django.test import SimpleTestCase
+from foodgram.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnect:
+    """Фабрика соединений, которая падает, пока задано failures."""
+
+    def __init__(self, failures=()):
+        self.failures = set(failures)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls in self.failures:
+            raise ConnectionError('БД недоступна')
+        return FakeConnection(self.calls)
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def make_pool(self, connect, **options):
+        options = {'min_size': 3, 'max_size': 3, 'timeout': 0.05,
+                   **options}
+        return ConnectionPool(f'test-{id(connect)}', connect, **options)
+
+    def test_fill_opens_min_size(self):
+        pool = self.make_pool(FakeConnect())
+        pool.fill()
+        self.assertEqual(pool._size, 3)
+        self.assertEqual(len(pool._idle), 3)
+
+    def test_fill_failure_keeps_capacity(self):
+        connect = FakeConnect(failures={2})
+        pool = self.make_pool(connect)
+        with self.assertRaises(ConnectionError):
+            pool.fill()
+        self.assertEqual(pool._size, 1)
+        self.assertFalse(pool._filled)
+        pool.fill()
+        self.assertEqual(pool._size, 3)
+        self.assertEqual(len(pool._idle), 3)
+
+    def test_getconn_after_outage(self):
+        connect = FakeConnect(failures={1, 2, 3})
+        pool = self.make_pool(connect)
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                pool.getconn()
+        self.assertEqual(pool._size, 0)
+        connections = [pool.getconn() for _ in range(3)]
+        self.assertEqual(pool._in_use, 3)
+        self.assertEqual(pool._size, 3)
+        for connection in connections:
+            pool.putconn(connection)
+        self.assertEqual(len(pool._idle), 3)
+
+    def test_timeout_when_exhausted(self):
+        pool = self.make_pool(FakeConnect(), min_size=1, max_size=1)
+        connection = pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+
+    def test_overflow_closed_on_return(self):
+        pool = self.make_pool(FakeConnect(), min_size=1, max_size=1,
+                              max_overflow=1)
+        first, extra = pool.getconn(), pool.getconn()
+        pool.putconn(extra)
+        self.assertTrue(extra.closed)
+        pool.putconn(first)
+        self.assertEqual(pool._size, 1)
+        self.assertEqual(list(pool._idle), [first])
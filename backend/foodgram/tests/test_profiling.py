@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class ProfilingMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', username='staff', first_name='Staff',
+            last_name='Staff', password='secret', is_staff=True,
+        )
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        profiling = override_settings(PROFILING={
+            'ENABLED': True, 'HEADER': 'X-Profile', 'QUERY_PARAM': '_profile',
+            'DIR': self.directory, 'KEEP': 50,
+        })
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+
+    def get(self, **extra):
+        return self.client.get('/api/tags/', HTTP_X_PROFILE='1', **extra)
+
+    def token(self, user):
+        return f'Token {Token.objects.create(user=user).key}'
+
+    def assert_profiled(self, response):
+        profile_id = response['X-Profile-Id']
+        for extension in ('json', 'prof'):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.directory, f'{profile_id}.{extension}')
+            ))
+
+    def test_staff_is_profiled(self):
+        self.assert_profiled(
+            self.get(HTTP_AUTHORIZATION=self.token(self.staff))
+        )
+        self.client.force_login(self.staff)
+        self.assert_profiled(self.get())
+
+    def test_others_are_not_profiled(self):
+        for extra in (
+            {},
+            {'HTTP_AUTHORIZATION': 'Token invalid'},
+            {'HTTP_AUTHORIZATION': self.token(self.user)},
+        ):
+            with self.subTest(extra=extra):
+                response = self.get(**extra)
+                self.assertFalse(response.has_header('X-Profile-Id'))
+        self.client.force_login(self.user)
+        self.assertFalse(self.get().has_header('X-Profile-Id'))
+        self.assertEqual(os.listdir(self.directory), [])
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.apps import apps
+from django.db import OperationalError, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from foodgram.db import routers
+from foodgram.runner import REPLICA
+from recipes.models import Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_PIN=5)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Без транзакции вокруг теста: чтение внутри atomic() идет с
+    основной базы.
+    """
+    databases = {'default', REPLICA}
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        # Миграции на реплике запрещены роутером.
+        with connections[REPLICA].schema_editor() as editor:
+            for model in apps.get_models():
+                if model._meta.managed and not model._meta.proxy:
+                    editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connections[REPLICA].schema_editor() as editor:
+            for model in apps.get_models():
+                if model._meta.managed and not model._meta.proxy:
+                    editor.delete_model(model)
+
+    def setUp(self):
+        Tag.objects.create(name='Основная', slug='primary')
+        Tag.objects.using(REPLICA).create(name='Реплика', slug='replica')
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+        self.token = Token.objects.create(user=self.user)
+        routers._unavailable.clear()
+
+    def tearDown(self):
+        # flush очищает только базы, куда роутер разрешает миграции.
+        Tag.objects.using(REPLICA).all().delete()
+
+    def tag_slugs(self, client=None):
+        response = (client or self.client).get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        return [tag['slug'] for tag in response.json()]
+
+    def test_safe_reads_use_replica(self):
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_outside_requests_use_default(self):
+        self.assertEqual(list(Tag.objects.values_list('slug', flat=True)),
+                         ['primary'])
+
+    def test_writes_and_atomic_reads_use_default(self):
+        state = routers.RoutingState(use_replica=True)
+        token = routers._state.set(state)
+        try:
+            self.assertEqual(
+                list(Tag.objects.values_list('slug', flat=True)),
+                ['replica'],
+            )
+            with transaction.atomic():
+                self.assertEqual(
+                    list(Tag.objects.values_list('slug', flat=True)),
+                    ['primary'],
+                )
+            self.assertTrue(state.use_replica)
+            Tag.objects.create(name='Новая', slug='new')
+            self.assertFalse(state.use_replica)
+            self.assertEqual(
+                list(Tag.objects.values_list('slug', flat=True)),
+                ['new', 'primary'],
+            )
+        finally:
+            routers._state.reset(token)
+        self.assertFalse(Tag.objects.using(REPLICA).filter(
+            slug='new'
+        ).exists())
+
+    def test_read_your_writes_after_post(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.client.credentials()
+        self.assertEqual(self.tag_slugs(), ['primary'])
+        self.assertEqual(self.tag_slugs(APIClient()), ['replica'])
+
+    def test_forged_pin_cookie_is_ignored(self):
+        self.client.cookies[routers.PIN_COOKIE] = '1'
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_unavailable_replica_falls_back(self):
+        failing = mock.patch.object(
+            connections[REPLICA], 'ensure_connection',
+            side_effect=OperationalError('реплика недоступна'),
+        )
+        with failing as ensure_connection:
+            self.assertEqual(self.tag_slugs(), ['primary'])
+            self.assertEqual(self.tag_slugs(), ['primary'])
+        self.assertEqual(ensure_connection.call_count, 1)
+        self.assertEqual(self.tag_slugs(), ['primary'])
+        routers._unavailable.clear()
+        self.assertEqual(self.tag_slugs(), ['replica'])
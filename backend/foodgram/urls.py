@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
+from foodgram.views import metrics_view, profile_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics_view, name='metrics'),
+    path('api/profiles/<uuid:profile_id>/', profile_view, name='profile'),
+    path('api/analytics/', include('analytics.urls')),
     path('api/', include('recipes.urls')),
     path('api/', include('users.urls')),
 ]
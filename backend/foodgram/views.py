@@ -0,0 +1,50 @@
+import json
+
+from django.http import FileResponse, Http404
+from foodgram import metrics
+from foodgram.profiling import profile_path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Метрики текущего воркера для администратора.
+
+    Args:
+        request (Request): данные запроса.
+
+    Returns:
+        Response: счетчики, замеры времени и датчики процесса.
+    """
+    return Response(metrics.snapshot())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_view(request, profile_id):
+    """Сводка профиля запроса, с ?download=prof - файл cProfile.
+
+    Args:
+        request (Request): данные запроса.
+        profile_id (UUID): идентификатор из заголовка X-Profile-Id.
+
+    Raises:
+        Http404: профиль не найден или уже удален.
+
+    Returns:
+        Response: сводка профиля или файл статистики.
+    """
+    try:
+        if request.query_params.get('download') == 'prof':
+            return FileResponse(
+                open(profile_path(profile_id, 'prof'), 'rb'),
+                as_attachment=True, filename=f'{profile_id}.prof',
+            )
+        with open(profile_path(profile_id, 'json'),
+                  encoding='utf-8') as file:
+            return Response(json.load(file))
+    except FileNotFoundError:
+        raise Http404
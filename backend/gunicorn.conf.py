@@ -0,0 +1,23 @@
+import os
+
+if os.getenv('SERVER_GATEWAY', default='wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def on_starting(server):
+    """Несколько воркеров с кэшем в памяти процесса не видят инвалидацию
+    друг друга (foodgram.checks), такой запуск не допускается.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+    from foodgram.caches import is_shared
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and not is_shared(backend):
+        raise SystemExit(
+            f'{backend} хранится в памяти процесса, для '
+            f'{server.cfg.workers} воркеров нужен общий CACHE_BACKEND.'
+        )
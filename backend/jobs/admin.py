@@ -0,0 +1,19 @@
+from django.contrib import admin
+from recipes.admin import EstimatedCountPaginator
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Фоновые задачи: просмотр статуса и ошибок."""
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'finished_at')
+    list_filter = ('status',)
+    search_fields = ('=name',)
+    readonly_fields = ('attempts', 'locked_at', 'locked_by', 'last_error',
+                       'created', 'finished_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+
+    def ready(self):
+        from foodgram import metrics
+        from jobs.models import Job
+
+        autodiscover_modules('tasks')
+        metrics.gauge(
+            'jobs.queued',
+            lambda: Job.objects.filter(status=Job.QUEUED).count(),
+        )
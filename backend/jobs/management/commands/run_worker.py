@@ -0,0 +1,44 @@
+import signal
+
+from django.core.management import BaseCommand
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач из таблицы jobs_job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Число потоков или процессов.')
+        parser.add_argument('--processes', action='store_true',
+                            help='Пул процессов вместо потоков.')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--report-interval', type=float, default=60.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда не останется готовых задач.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            processes=options['processes'],
+            poll_interval=options['poll_interval'],
+            report=self.report,
+            report_interval=options['report_interval'],
+        )
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Воркер {worker.worker_id} запущен.')
+        worker.run(once=options['once'])
+
+    def report(self, snapshot):
+        counters = {name: value
+                    for name, value in snapshot['counters'].items()
+                    if name.startswith('jobs.') and name.count('.') == 1}
+        lag = snapshot['timings'].get('jobs.lag')
+        line = ', '.join(f'{name}={value}'
+                         for name, value in sorted(counters.items()))
+        if lag:
+            line += f', lag_avg={lag["avg"]:.2f}s, lag_max={lag["max"]:.2f}s'
+        self.stdout.write(line or 'Задач не было.')
@@ -0,0 +1,55 @@
+"""Регистрация фоновых задач и постановка в очередь.
+
+Задача - функция модуля tasks любого приложения, помеченная декоратором
+task. Аргументы передаются именованными и должны сериализоваться в JSON.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from foodgram import metrics
+from jobs.models import Job
+
+registry = {}
+
+
+def task(name=None, max_attempts=None):
+    """Декоратор регистрации фоновой задачи.
+
+    Args:
+        name (str, optional): имя задачи. Defaults to None - модуль и
+        имя функции.
+        max_attempts (int, optional): число попыток. Defaults to None -
+        значение из настроек JOB_QUEUE.
+
+    Returns:
+        callable: декоратор, возвращающий функцию без изменений.
+    """
+    def decorator(func):
+        func.job_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        registry[func.job_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, delay=0, **payload):
+    """Постановка задачи в очередь.
+
+    Args:
+        func (callable): зарегистрированная задача.
+        delay (float, optional): задержка запуска в секундах.
+        Defaults to 0.
+        **payload: аргументы задачи.
+
+    Returns:
+        Job: созданная задача.
+    """
+    metrics.incr(f'jobs.enqueued.{func.job_name}')
+    return Job.objects.create(
+        name=func.job_name,
+        payload=payload,
+        max_attempts=(func.max_attempts
+                      or settings.JOB_QUEUE['MAX_ATTEMPTS']),
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+    )
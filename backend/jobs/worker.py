@@ -0,0 +1,251 @@
+"""Выборка и выполнение фоновых задач.
+
+На PostgreSQL задачи забираются через SELECT ... FOR UPDATE SKIP LOCKED,
+поэтому несколько воркеров не ждут друг друга на одних строках. На
+SQLite, где SKIP LOCKED нет, каждая задача забирается условным UPDATE по
+статусу: задачу получает тот воркер, чей UPDATE изменил строку.
+"""
+import datetime
+import multiprocessing
+import os
+import random
+import socket
+import time
+import traceback
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from foodgram import metrics
+from jobs.models import Job
+from jobs.queue import registry
+
+
+def backoff(attempts):
+    """Пауза перед повтором: экспонента от числа попыток со случайным
+    разбросом, чтобы повторы упавших вместе задач не совпадали.
+
+    Args:
+        attempts (int): сколько попыток уже сделано.
+
+    Returns:
+        float: пауза в секундах.
+    """
+    options = settings.JOB_QUEUE
+    delay = min(options['BACKOFF_MAX'],
+                options['BACKOFF_BASE'] * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def claim(worker_id, limit):
+    """Захват готовых к запуску задач.
+
+    Args:
+        worker_id (str): имя воркера.
+        limit (int): сколько задач взять.
+
+    Returns:
+        list: id захваченных задач.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'id').values_list('id', flat=True)
+    claimed = {
+        'status': Job.RUNNING,
+        'locked_at': now,
+        'locked_by': worker_id,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+        return ids
+    return [
+        job_id for job_id in ready[:limit]
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(**claimed)
+    ]
+
+
+def requeue_stale():
+    """Возврат в очередь задач, воркер которых пропал.
+    Задачи без оставшихся попыток помечаются ошибкой.
+
+    Returns:
+        int: количество возвращенных задач.
+    """
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - datetime.timedelta(
+            seconds=settings.JOB_QUEUE['STALE_TIMEOUT']
+        ),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(),
+        last_error='Воркер не завершил задачу.',
+    )
+    return stale.update(status=Job.QUEUED, locked_at=None, locked_by='')
+
+
+def prune_finished():
+    """Удаление выполненных задач старше JOB_QUEUE['KEEP_DONE'] секунд.
+    За один вызов удаляется не больше 1000 строк.
+
+    Returns:
+        int: количество удаленных задач.
+    """
+    old = Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - datetime.timedelta(
+            seconds=settings.JOB_QUEUE['KEEP_DONE']
+        ),
+    ).values_list('id', flat=True)[:1000]
+    deleted, _ = Job.objects.filter(id__in=list(old)).delete()
+    return deleted
+
+
+def _finish(job, error):
+    now = timezone.now()
+    released = {'locked_at': None, 'locked_by': ''}
+    if error is None:
+        Job.objects.filter(id=job.id).update(
+            status=Job.DONE, finished_at=now, last_error='', **released
+        )
+        return 'done'
+    if job.attempts < job.max_attempts:
+        Job.objects.filter(id=job.id).update(
+            status=Job.QUEUED, last_error=error,
+            run_at=now + datetime.timedelta(seconds=backoff(job.attempts)),
+            **released
+        )
+        return 'retried'
+    Job.objects.filter(id=job.id).update(
+        status=Job.FAILED, finished_at=now, last_error=error, **released
+    )
+    return 'failed'
+
+
+def execute(job_id):
+    """Выполнение захваченной задачи.
+    Ошибка задачи не выходит наружу: задача возвращается в очередь с
+    паузой или помечается ошибкой после последней попытки.
+
+    Args:
+        job_id (int): id задачи.
+
+    Returns:
+        tuple: имя задачи, итог (done, retried, failed), время выполнения
+        и задержка запуска относительно run_at в секундах.
+    """
+    try:
+        job = Job.objects.get(id=job_id)
+        started = time.monotonic()
+        error = None
+        try:
+            registry[job.name](**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+        outcome = _finish(job, error)
+        return (job.name, outcome, time.monotonic() - started,
+                (job.locked_at - job.run_at).total_seconds())
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """Цикл воркера: захватывает задачи по числу свободных исполнителей
+    пула и собирает метрики их выполнения.
+
+    Args:
+        concurrency (int): число потоков или процессов.
+        processes (bool): пул процессов вместо потоков.
+        poll_interval (float): пауза опроса пустой очереди в секундах.
+        report (callable, optional): вызывается с метриками очереди раз
+        в report_interval секунд.
+        report_interval (float): период отчета и проверки зависших задач.
+    """
+
+    def __init__(self, concurrency=4, processes=False, poll_interval=1.0,
+                 report=None, report_interval=60.0):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.report = report
+        self.report_interval = report_interval
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def make_pool(self):
+        if self.processes:
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(self.concurrency,
+                                  thread_name_prefix='job')
+
+    def record(self, future):
+        try:
+            name, outcome, elapsed, lag = future.result()
+        except Exception:
+            metrics.incr('jobs.worker_errors')
+            return
+        metrics.incr(f'jobs.{outcome}')
+        metrics.incr(f'jobs.{outcome}.{name}')
+        metrics.observe(f'jobs.duration.{name}', elapsed)
+        metrics.observe('jobs.lag', lag)
+
+    def maintain(self):
+        requeued = requeue_stale()
+        if requeued:
+            metrics.incr('jobs.requeued', requeued)
+        pruned = prune_finished()
+        if pruned:
+            metrics.incr('jobs.pruned', pruned)
+        if self.report is not None:
+            self.report(metrics.snapshot())
+
+    def run(self, once=False):
+        """Основной цикл.
+
+        Args:
+            once (bool, optional): выйти, когда очередь опустеет.
+            Defaults to False.
+        """
+        pending = set()
+        maintained = 0.0
+        with self.make_pool() as pool:
+            while not self.stopping:
+                if time.monotonic() - maintained >= self.report_interval:
+                    self.maintain()
+                    maintained = time.monotonic()
+                free = self.concurrency - len(pending)
+                ids = claim(self.worker_id, free) if free else []
+                metrics.incr('jobs.claimed', len(ids))
+                pending.update(pool.submit(execute, job_id)
+                               for job_id in ids)
+                if not pending and once:
+                    break
+                if not pending:
+                    time.sleep(self.poll_interval)
+                    continue
+                busy = len(pending) >= self.concurrency or not ids
+                done, pending = wait(
+                    pending, return_when=FIRST_COMPLETED,
+                    timeout=self.poll_interval if busy else 0,
+                )
+                for future in done:
+                    self.record(future)
+            for future in pending:
+                self.record(future)
+        if self.report is not None:
+            self.report(metrics.snapshot())
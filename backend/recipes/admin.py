@@ -1,12 +1,200 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count
+from django.utils.functional import cached_property
+from jobs.queue import enqueue
 
 from .models import (Favourite, Follow, Ingredient, IngredientForRecipe,
                      Recipe, ShoppingCart, Tag)
+from .signals import recipes_changed, recipes_changing
+from .tasks import bulk_delete_recipes
 
-admin.site.register(IngredientForRecipe)
-admin.site.register(Favourite)
-admin.site.register(Follow)
-admin.site.register(ShoppingCart)
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой количества строк для больших таблиц.
+    Наследуется от Paginator.
+    Для списка без фильтров в PostgreSQL количество берется из
+    статистики pg_class вместо COUNT(*) по всей таблице. Небольшие
+    таблицы и отфильтрованные списки считаются точно.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if (connection.vendor != 'postgresql'
+                or queryset.query.where):
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < self.estimate_threshold:
+            return super().count
+        return int(row[0])
+
+
+class BulkDeleteAdminMixin:
+    """Удаление объектов фоновой задачей bulk_delete_task (recipes.tasks)
+    вместо сборщика Django. Страница удаления выполняется в одной
+    транзакции, поэтому удаление порциями ставится в очередь, задача
+    создается вместе с фиксацией этой транзакции. Страница
+    подтверждения для суперпользователя не собирает все связанные
+    строки, а перечисляет только удаляемые объекты.
+    """
+    bulk_delete_task = None
+
+    def before_bulk_delete(self, ids):
+        """Действия в транзакции админки до постановки удаления в
+        очередь.
+        """
+
+    def bulk_delete(self, request, ids):
+        self.before_bulk_delete(ids)
+        enqueue(self.bulk_delete_task, ids=ids)
+        self.message_user(
+            request, 'Удаление поставлено в очередь фоновых задач.',
+            messages.INFO,
+        )
+
+    def delete_model(self, request, obj):
+        self.bulk_delete(request, [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.bulk_delete(request,
+                         list(queryset.values_list('pk', flat=True)))
+
+    def get_deleted_objects(self, objs, request):
+        if not request.user.is_superuser:
+            return super().get_deleted_objects(objs, request)
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """Фильтр списка с выбором значения через автодополнение.
+    Наследуется от SimpleListFilter.
+    В отличие от обычного фильтра не выводит все значения связанной
+    таблицы, а подгружает их поиском связанной модели.
+    """
+    template = 'admin/recipes/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        field = model._meta.get_field(self.field_name)
+        self.parameter_name = self.field_name
+        self.title = field.verbose_name
+        super().__init__(request, params, model, model_admin)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(
+                field, model_admin.admin_site,
+                attrs={'style': 'width: 100%'},
+            ),
+        )
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'display': 'Все',
+        }
+
+    def rendered_widget(self):
+        return self.form_field.widget.render(
+            self.parameter_name, self.value(),
+            attrs={'id': f'id_filter_{self.parameter_name}'},
+        )
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class AuthorFilter(AutocompleteFilter):
+    field_name = 'author'
+
+
+class IngredientFilter(AutocompleteFilter):
+    field_name = 'ingredients'
+
+
+class FavouriteAdmin(admin.ModelAdmin):
+    """Избранное: связи выбираются по id, без списков всех объектов."""
+    raw_id_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class FollowAdmin(admin.ModelAdmin):
+    """Подписки: связи выбираются по id, без списков всех объектов."""
+    raw_id_fields = ('user', 'following')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ShoppingCartAdmin(admin.ModelAdmin):
+    """Список покупок: связи выбираются по id, без списков всех объектов.
+    """
+    raw_id_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IngredientForRecipeAdmin(admin.ModelAdmin):
+    """Ингридиенты рецептов: связи выбираются по id.
+    Запись отдельных строк состава окружается сигналами
+    recipes_changing/recipes_changed, как запись рецепта целиком.
+    """
+    raw_id_fields = ('ingredient', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.add(form.initial['recipe'])
+            recipes_changing.send(sender=Recipe, recipe_ids=recipe_ids)
+        super().save_model(request, obj, form, change)
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(
+            request, IngredientForRecipe.objects.filter(pk=obj.pk)
+        )
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        recipes_changing.send(sender=Recipe, recipe_ids=recipe_ids)
+        super().delete_queryset(request, queryset)
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+
+admin.site.register(IngredientForRecipe, IngredientForRecipeAdmin)
+admin.site.register(Favourite, FavouriteAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(ShoppingCart, ShoppingCartAdmin)
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -21,11 +209,13 @@ admin.site.register(Tag, TagAdmin)
 
 class IngredientAdmin(admin.ModelAdmin):
     """Уточнение параметров отражения Ингридиентов
-    , строка поиска, поле фильтра.
+    , строка поиска по началу названия, фильтр по единице измерения.
     """
     list_display = ('name', 'measurement_unit',)
-    search_fields = ('name',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
+    list_filter = ('measurement_unit',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Ingredient, IngredientAdmin)
@@ -34,38 +224,71 @@ admin.site.register(Ingredient, IngredientAdmin)
 class IngredientForRecipeInline(admin.TabularInline):
     """Класс для подключения связанной таблицы
     Ингридиенты для рецептов к зоне Админа.
+    Ингридиент выбирается через автодополнение.
     """
     model = IngredientForRecipe
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BulkDeleteAdminMixin, admin.ModelAdmin):
     """Настройка модели отражения рецепта.
     Настроена: иерархия отражения, поля отражения,
-    поля поиска, поля фильтра, настройка поля выбора Тэга,
+    поля поиска, поля фильтра, настройка поля выбора Тэга и автора,
     связанная таблица подключена через вспомогательный класс.
+    Автор подгружается одним запросом со списком, количество добавлений
+    в избранное считается аннотацией.
     """
     date_hierarchy = 'pub_date'
     list_display = ('name', 'author', 'count_in_favorite')
-    search_fields = ('username', 'email')
-    list_filter = ('name', 'author', 'tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username', '=author__email')
+    list_filter = (AuthorFilter, IngredientFilter, 'tags',)
     empty_value_display = '-пусто-'
-    autocomplete_fields = ['tags']
+    autocomplete_fields = ['tags', 'author']
     inlines = (IngredientForRecipeInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    bulk_delete_task = staticmethod(bulk_delete_recipes)
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(
+            Recipe._meta.get_field('author'), self.admin_site
+        ).media
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            recipes_changing.send(sender=Recipe, recipe_ids=[obj.pk])
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        """Сохранение тэгов и состава рецепта.
+        Сигналы recipes_changing/recipes_changed окружают всю запись
+        рецепта: состав и тэги сохраняются после самого рецепта.
+        """
+        super().save_related(request, form, formsets, change)
+        recipes_changed.send(sender=Recipe, recipe_ids=[form.instance.pk])
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorite_count=Count('in_favorite', distinct=True)
+        )
 
+    @admin.display(description='В избранном',
+                   ordering='favorite_count')
     def count_in_favorite(self, obj):
         """Пользовательское поле в Админ зоне Рецепта.
         Количество добавлений рецепта в избранное.
 
         Args:
-            obj (Recipe): объект рецепта.
+            obj (Recipe): объект рецепта с аннотацией favorite_count.
 
         Returns:
-            int: посчитанное количество у каждого объекта булевого поля
-            в избранном.
+            int: количество добавлений рецепта в избранное.
         """
-        return obj.in_favorite.count()
+        return obj.favorite_count
 
 
 admin.site.register(Recipe, RecipeAdmin)
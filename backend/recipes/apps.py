@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        import foodgram.checks  # noqa: F401
+        import foodgram.db.errors  # noqa: F401
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,84 @@
+from asgiref.sync import sync_to_async
+from recipes.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                           download_shopping_cart)
+
+
+async def _rendered(response):
+    """Рендеринг ответа DRF в thread-sensitive исполнителе."""
+    if hasattr(response, 'render') and not response.is_rendered:
+        await sync_to_async(response.render, thread_sensitive=True)()
+    return response
+
+
+def async_view(view):
+    """Асинхронная обертка синхронного представления DRF.
+
+    Представление целиком, с авторизацией, правами и ограничением частоты,
+    выполняется в thread-sensitive исполнителе, а отправка ответа
+    медленному клиенту не занимает поток.
+
+    Args:
+        view (function): синхронное представление.
+
+    Returns:
+        function: корутина-представление.
+    """
+    sync_view = sync_to_async(view, thread_sensitive=True)
+
+    async def wrapper(request, *args, **kwargs):
+        return await _rendered(await sync_view(request, *args, **kwargs))
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def async_read_view(viewset, read_actions, write_actions=None):
+    """Асинхронное представление для чтения поверх вьюсета DRF.
+
+    Запросы GET/HEAD обрабатываются корутиной: работа с БД, проверка прав и
+    рендеринг ответа выполняются в thread-sensitive исполнителе, а чтение
+    запроса и отправка ответа медленному клиенту не занимают поток.
+    Остальные методы передаются синхронному вьюсету без изменений.
+
+    Args:
+        viewset (ViewSet): вьюсет, действия которого используются.
+        read_actions (dict): соответствие метод -> действие для чтения.
+        write_actions (dict, optional): методы записи. Defaults to None.
+
+    Returns:
+        function: корутина-представление.
+    """
+    read_view = sync_to_async(viewset.as_view(read_actions),
+                              thread_sensitive=True)
+    write_view = None
+    if write_actions:
+        write_view = sync_to_async(
+            viewset.as_view(write_actions), thread_sensitive=True
+        )
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or write_view is None:
+            response = await read_view(request, *args, **kwargs)
+        else:
+            response = await write_view(request, *args, **kwargs)
+        return await _rendered(response)
+
+    view.csrf_exempt = True
+    return view
+
+
+tag_list = async_read_view(TagViewSet, {'get': 'list'})
+tag_detail = async_read_view(TagViewSet, {'get': 'retrieve'})
+ingredient_list = async_read_view(IngredientViewSet, {'get': 'list'})
+ingredient_detail = async_read_view(IngredientViewSet, {'get': 'retrieve'})
+recipe_list = async_read_view(RecipeViewSet,
+                              {'get': 'list'},
+                              {'post': 'create'})
+recipe_detail = async_read_view(RecipeViewSet,
+                                {'get': 'retrieve'},
+                                {'put': 'update',
+                                 'patch': 'partial_update',
+                                 'delete': 'destroy'})
+
+
+async_download_shopping_cart = async_view(download_shopping_cart)
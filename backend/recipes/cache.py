@@ -0,0 +1,43 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'foodgram:version:{}'
+
+
+def _initial_version():
+    # Версия, вытесненная из кэша, создается заново от текущего времени,
+    # а не от константы: ключи прежних версий не оживают.
+    return time.time_ns() // 1000
+
+
+def get_version(namespace):
+    """Текущая версия пространства имен кэша.
+
+    Args:
+        namespace (str): имя пространства, например 'recipes'.
+
+    Returns:
+        int: номер версии, при отсутствии в кэше создается заново.
+    """
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    initial = _initial_version()
+    cache.add(key, initial, timeout=None)
+    return cache.get(key, initial)
+
+
+def bump_version(namespace):
+    """Увеличение версии пространства имен.
+    Все ключи, построенные на старой версии, перестают использоваться.
+
+    Args:
+        namespace (str): имя пространства.
+    """
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
@@ -0,0 +1,149 @@
+"""Статические снимки справочников ингридиентов и тэгов.
+
+Снимок - ответ /api/ingredients/ или /api/tags/ без параметров,
+отрисованный тем же сериализатором и рендерером, что и представление.
+Для каждого справочника в CATALOGUE_ROOT пишутся:
+
+* <name>.json, <name>.json.gz и <name>.json.br - текущая версия, их
+  отдает nginx вместо обращения к приложению;
+* <name>.<version>.json с вариантами сжатия - неизменяемая версия по
+  хэшу содержимого, ссылки на нее есть в manifest.json.
+
+Файлы пишутся во временные и переименовываются, поэтому nginx никогда
+не отдает частично записанный снимок. Публикации разных справочников
+меняют общий manifest.json под блокировкой файла. Вариант brotli
+пишется, если установлен пакет brotli.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from recipes.models import Ingredient, Tag
+from recipes.renderers import ORJSONRenderer
+from recipes.serializers import IngredientSerializer, TagSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATALOGUES = {
+    'ingredients': (Ingredient, IngredientSerializer),
+    'tags': (Tag, TagSerializer),
+}
+MANIFEST = 'manifest.json'
+KEEP_VERSIONS = 3
+VERSIONED_NAME = re.compile(
+    r'^(?P<name>\w+)\.(?P<version>[0-9a-f]{16})\.json'
+)
+
+
+def render_catalogue(name):
+    """Тело ответа справочника без параметров запроса.
+
+    Args:
+        name (str): имя справочника из CATALOGUES.
+
+    Returns:
+        bytes: JSON в том же виде, что отдает API.
+    """
+    model, serializer_class = CATALOGUES[name]
+    data = serializer_class(model.objects.all(), many=True).data
+    return ORJSONRenderer().render(data)
+
+
+def encodings(body):
+    """Варианты тела снимка по расширению файла.
+
+    Args:
+        body (bytes): JSON снимка.
+
+    Returns:
+        dict: расширение -> содержимое файла.
+    """
+    variants = {
+        '': body,
+        '.gz': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        variants['.br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def _write(path, content):
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix='.tmp-'
+    )
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(content)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, path)
+
+
+def _read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _prune(root, name, versions):
+    for entry in os.scandir(root):
+        match = VERSIONED_NAME.match(entry.name)
+        if (match and match['name'] == name
+                and match['version'] not in versions):
+            os.remove(entry.path)
+
+
+def _publish(root, name, body):
+    version = hashlib.sha256(body).hexdigest()[:16]
+    manifest = _read_manifest(root)
+    entry = manifest.get(name, {})
+    current = os.path.join(root, f'{name}.json')
+    if entry.get('version') == version and os.path.exists(current):
+        return version, False
+    for suffix, content in encodings(body).items():
+        _write(os.path.join(root, f'{name}.{version}.json{suffix}'),
+               content)
+        _write(f'{current}{suffix}', content)
+    if brotli is None and os.path.exists(f'{current}.br'):
+        os.remove(f'{current}.br')
+    history = [version] + [
+        old for old in entry.get('history', []) if old != version
+    ][:KEEP_VERSIONS - 1]
+    manifest[name] = {
+        'version': version,
+        'url': f'{settings.CATALOGUE_URL}{name}.{version}.json',
+        'size': len(body),
+        'history': history,
+    }
+    _write(os.path.join(root, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _prune(root, name, history)
+    return version, True
+
+
+def publish(name, root=None):
+    """Публикация снимка справочника.
+    Если содержимое не изменилось, файлы не переписываются.
+
+    Args:
+        name (str): имя справочника из CATALOGUES.
+        root (str, optional): каталог снимков. Defaults to None -
+        settings.CATALOGUE_ROOT.
+
+    Returns:
+        tuple: версия снимка и признак, что файлы были записаны.
+    """
+    root = root or settings.CATALOGUE_ROOT
+    os.makedirs(root, exist_ok=True)
+    body = render_catalogue(name)
+    with open(os.path.join(root, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return _publish(root, name, body)
@@ -0,0 +1,176 @@
+"""Массовое удаление рецептов и пользователей.
+
+delete() через сборщик Django загружает в память каждую связанную
+строку (состав, тэги, избранное, покупки, подписки) и отправляет по ней
+сигналы. Здесь строки удаляются запросами DELETE ... WHERE порциями по
+id рецептов в порядке зависимостей, каждая порция в своей транзакции.
+Производное исправляется по множествам: счетчики пользователей -
+recount, сводки и документы - сигналами recipes_changing и
+recipes_changed, кэши - сбросом версий после фиксации транзакции.
+Файлы изображений удаляет фоновая задача.
+
+Порции ограничены по времени только вне внешней транзакции, поэтому
+админка не удаляет сама, а ставит в очередь задачи bulk_delete_recipes
+и bulk_delete_users из recipes.tasks.
+"""
+from django.db import transaction
+from django.db.models import Q
+from jobs.queue import enqueue
+from recipes.cache import bump_version
+from recipes.facets import (FACETS_NAMESPACE, FAVOURITES_NAMESPACE,
+                            user_namespace)
+from recipes.models import (Favourite, Follow, IngredientForRecipe, Recipe,
+                            RecipeDocument, ShoppingCart)
+from recipes.pantry import PANTRY_NAMESPACE
+from recipes.signals import recipes_changed, recipes_changing
+from recipes.tasks import delete_unused_images
+from users.counters import recount
+from users.models import User
+
+CHUNK_SIZE = 500
+
+
+def _raw_delete(queryset):
+    """DELETE по условию запроса без загрузки строк и без сигналов."""
+    return queryset._raw_delete(queryset.db)
+
+
+def _bump_versions(namespaces):
+    """Сброс версий кэшей после фиксации внешней транзакции: до нее
+    конкурентное чтение закэширует старые данные под новой версией.
+    """
+    namespaces = list(namespaces)
+
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+
+    transaction.on_commit(bump)
+
+
+def _affected_users(*querysets):
+    users = set()
+    for queryset in querysets:
+        users.update(queryset.values_list('user_id', flat=True).distinct())
+    return users
+
+
+def _delete_recipe_chunk(recipe_ids):
+    with transaction.atomic():
+        recipe_ids = list(Recipe.objects.select_for_update().filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        if not recipe_ids:
+            return 0
+        recipes_changing.send(sender=Recipe, recipe_ids=recipe_ids)
+        recipes = Recipe.objects.filter(id__in=recipe_ids)
+        authors = set(recipes.values_list('author_id', flat=True))
+        images = sorted(set(recipes.exclude(image='').values_list(
+            'image', flat=True
+        )))
+        favourites = Favourite.objects.filter(recipe_id__in=recipe_ids)
+        carts = ShoppingCart.objects.filter(recipe_id__in=recipe_ids)
+        users = _affected_users(favourites, carts)
+        for queryset in (
+            favourites, carts,
+            IngredientForRecipe.objects.filter(recipe_id__in=recipe_ids),
+            Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids),
+            RecipeDocument.objects.filter(recipe_id__in=recipe_ids),
+        ):
+            _raw_delete(queryset)
+        _raw_delete(recipes)
+        recount(authors)
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+        if images:
+            enqueue(delete_unused_images, names=images)
+        _bump_versions([
+            *[user_namespace(user_id) for user_id in users],
+            FAVOURITES_NAMESPACE, FACETS_NAMESPACE, PANTRY_NAMESPACE,
+        ])
+    return len(recipe_ids)
+
+
+def delete_recipes(recipe_ids, chunk_size=CHUNK_SIZE):
+    """Удаление рецептов порциями.
+
+    Args:
+        recipe_ids (iterable): id рецептов.
+        chunk_size (int, optional): рецептов в транзакции. Defaults to
+        CHUNK_SIZE.
+
+    Returns:
+        int: количество удаленных рецептов.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    return sum(
+        _delete_recipe_chunk(recipe_ids[start:start + chunk_size])
+        for start in range(0, len(recipe_ids), chunk_size)
+    )
+
+
+def _delete_rows(queryset, chunk_size, after=None):
+    """Удаление строк запроса порциями по первичному ключу.
+
+    Args:
+        queryset (QuerySet): удаляемые строки.
+        chunk_size (int): строк в транзакции.
+        after (callable, optional): вызывается в транзакции порции с
+        запросом удаленных строк до удаления.
+    """
+    model = queryset.model
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('pk').values_list(
+                'pk', flat=True)[:chunk_size])
+            if not ids:
+                return
+            chunk = model.objects.filter(pk__in=ids)
+            finish = after(chunk) if after is not None else None
+            _raw_delete(chunk)
+            if finish is not None:
+                finish()
+
+
+def _follow_counterparts(follows):
+    users = set(follows.values_list('user_id', 'following_id').distinct())
+    return lambda: recount({pk for pair in users for pk in pair})
+
+
+def delete_users(user_ids, chunk_size=CHUNK_SIZE):
+    """Удаление пользователей с рецептами, подписками, избранным и
+    списками покупок.
+    Пользователь сначала деактивируется, чтобы не создавать новые
+    данные во время удаления. Рецепты удаляются delete_recipes, подписки,
+    избранное и покупки - порциями со сбросом счетчиков и кэшей. Сам
+    пользователь удаляется обычным delete(), оставшиеся связи (токен,
+    журнал админки) небольшие.
+
+    Args:
+        user_ids (iterable): id пользователей.
+        chunk_size (int, optional): строк в транзакции. Defaults to
+        CHUNK_SIZE.
+
+    Returns:
+        int: количество удаленных рецептов.
+    """
+    deleted = 0
+    for user in User.objects.filter(pk__in=list(user_ids)):
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        recipes = Recipe.objects.filter(author_id=user.pk)
+        while True:
+            ids = list(recipes.order_by('pk').values_list(
+                'pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            deleted += delete_recipes(ids, chunk_size)
+        follows = Follow.objects.filter(
+            Q(user_id=user.pk) | Q(following_id=user.pk)
+        )
+        _delete_rows(follows, chunk_size, after=_follow_counterparts)
+        for model in (Favourite, ShoppingCart):
+            _delete_rows(model.objects.filter(user_id=user.pk), chunk_size)
+        with transaction.atomic():
+            user.delete()
+            _bump_versions([user_namespace(user.pk), FAVOURITES_NAMESPACE])
+    return deleted
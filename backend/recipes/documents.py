@@ -0,0 +1,73 @@
+"""Документы рецептов для чтения (RecipeDocument).
+
+Документ пересобирается в транзакции записи, после которой он
+устарел: рецепт и его состав (сигнал recipes_changed), переименование
+или удаление тэга или ингридиента, изменение автора. Удаление рецепта
+удаляет документ каскадом. Документы существующих рецептов строит
+команда rebuild_recipe_documents, до этого рецепты без документа
+собираются при чтении по-старому.
+"""
+from django.db import transaction
+from recipes.models import Recipe, RecipeDocument
+from recipes.representations import build_documents
+
+CHUNK_SIZE = 500
+
+
+def refresh_documents(recipe_ids):
+    """Пересборка документов рецептов в текущей транзакции.
+    Строки рецептов блокируются по возрастанию id, как при удалении
+    (recipes.deletion): пересборки одного рецепта из правки рецепта и
+    из переименования тэга или ингридиента выполняются по очереди, а
+    не удаляют и вставляют документ одновременно.
+
+    Args:
+        recipe_ids (iterable): id рецептов, несуществующие пропускаются.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    with transaction.atomic():
+        for start in range(0, len(recipe_ids), CHUNK_SIZE):
+            chunk = list(Recipe.objects.select_for_update().filter(
+                id__in=recipe_ids[start:start + CHUNK_SIZE]
+            ).order_by('id').values_list('id', flat=True))
+            documents = build_documents(chunk)
+            RecipeDocument.objects.filter(recipe_id__in=chunk).delete()
+            RecipeDocument.objects.bulk_create([
+                RecipeDocument(recipe_id=recipe_id, document=document)
+                for recipe_id, document in documents.items()
+            ])
+
+
+def refresh_related(**filters):
+    """Пересборка документов рецептов, выбранных фильтром.
+
+    Args:
+        **filters: условия для Recipe.objects.filter, например tags=tag.
+    """
+    refresh_documents(Recipe.objects.filter(**filters).order_by().values_list(
+        'id', flat=True
+    ).distinct())
+
+
+def rebuild(chunk_size=CHUNK_SIZE):
+    """Пересборка документов всех рецептов порциями по id, каждая в
+    своей транзакции.
+
+    Args:
+        chunk_size (int, optional): рецептов в порции. Defaults to
+        CHUNK_SIZE.
+
+    Returns:
+        int: количество рецептов.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        chunk = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            'id'
+        ).values_list('id', flat=True)[:chunk_size])
+        if not chunk:
+            return total
+        refresh_documents(chunk)
+        total += len(chunk)
+        last_id = chunk[-1]
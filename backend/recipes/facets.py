@@ -0,0 +1,129 @@
+"""Счетчики рецептов по тэгам (фасеты) для текущего фильтра списка.
+
+Счетчик тэга - сколько рецептов вернет список, если при остальных
+параметрах фильтра выбрать только этот тэг. Поэтому параметр tags в
+расчете не участвует, его убирает представление. Все счетчики
+считаются одним GROUP BY по промежуточной таблице рецепт-тэг и
+кэшируются по сигнатуре фильтра.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from recipes.cache import get_version
+from recipes.models import Recipe
+
+FACETS_NAMESPACE = 'facets'
+FACETS_KEY = 'foodgram:facets:{}'
+FACET_NAMES = ('tags', )
+USER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+FAVOURITES_NAMESPACE = 'facets.favourites'
+
+
+def user_namespace(user_id):
+    """Пространство имен кэша фасетов с личными фильтрами пользователя.
+
+    Args:
+        user_id (int): id пользователя.
+
+    Returns:
+        str: имя пространства.
+    """
+    return f'{FACETS_NAMESPACE}.user.{user_id}'
+
+
+def _plain(value):
+    if hasattr(value, 'pk'):
+        return value.pk
+    if isinstance(value, (list, tuple)) or hasattr(value, 'model'):
+        return sorted(_plain(item) for item in value)
+    return value
+
+
+def filter_signature(filterset):
+    """Сигнатура фильтра: нормализованные значения параметров.
+    Пустые значения и выключенные флаги не меняют выборку и в сигнатуру
+    не входят.
+
+    Args:
+        filterset (FilterSet): проверенный фильтр запроса.
+
+    Returns:
+        dict: имя параметра -> значение.
+    """
+    signature = {}
+    for name, value in filterset.form.cleaned_data.items():
+        value = _plain(value)
+        if value not in (None, '', [], False):
+            signature[name] = value
+    return signature
+
+
+def _namespaces(signature):
+    namespaces = [FACETS_NAMESPACE]
+    if 'user' in signature:
+        namespaces.append(user_namespace(signature['user']))
+    if 'in_favorite' in signature:
+        namespaces.append(FAVOURITES_NAMESPACE)
+    return namespaces
+
+
+def tag_counts(queryset):
+    """Счетчики рецептов по тэгам одним запросом.
+
+    Args:
+        queryset (QuerySet): отфильтрованные рецепты.
+
+    Returns:
+        list: словари id, name, slug и count тэгов, у которых есть
+        рецепты, по имени тэга.
+    """
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=queryset.order_by().values('id')
+    ).values('tag_id', 'tag__name', 'tag__slug').annotate(
+        count=Count('recipe_id', distinct=True)
+    ).order_by('tag__name')
+    return [
+        {
+            'id': row['tag_id'],
+            'name': row['tag__name'],
+            'slug': row['tag__slug'],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def recipe_facets(filterset, user, names):
+    """Фасеты списка рецептов с кэшем по сигнатуре фильтра.
+    Ключ включает версии пространств кэша: общего (записи рецептов и
+    тэгов) и, для личных фильтров, пространства пользователя, поэтому
+    устаревшие записи просто перестают читаться.
+
+    Args:
+        filterset (FilterSet): проверенный фильтр запроса без параметра
+        tags.
+        user (User): пользователь запроса.
+        names (list): запрошенные фасеты.
+
+    Returns:
+        dict: имя фасета -> счетчики.
+    """
+    signature = filter_signature(filterset)
+    if any(name in signature for name in USER_FILTERS):
+        signature['user'] = user.pk
+    versions = [get_version(namespace)
+                for namespace in _namespaces(signature)]
+    digest = hashlib.sha256(json.dumps(
+        [sorted(names), signature, versions], sort_keys=True, default=str
+    ).encode()).hexdigest()
+    key = FACETS_KEY.format(digest)
+    facets = cache.get(key)
+    if facets is None:
+        facets = {}
+        if 'tags' in names:
+            facets['tags'] = tag_counts(filterset.qs)
+        cache.set(key, facets, settings.FACETS_CACHE_TTL)
+    return facets
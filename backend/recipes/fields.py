@@ -1,34 +1,117 @@
 import base64
-import imghdr
+import binascii
 import uuid
 
 import six
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from foodgram.limits import limit, reject
 from rest_framework import serializers
 
+BASE64_CHUNK = 64 * 1024
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    """Временный файл декодированного изображения.
+    Хранилище перемещает временный файл при сохранении, поэтому объект
+    закрывается через close(), который учитывает отсутствие файла.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+def image_extension(header):
+    """Расширение файла по первым байтам изображения.
+
+    Args:
+        header (bytes): начало файла, не меньше 12 байт.
+
+    Returns:
+        str: расширение или None, если формат не распознан.
+    """
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    return None
+
 
 class Base64ImageField(serializers.ImageField):
-    """Конвертация изображения из кодировки base64.
+    """Изображение из строки base64 или из файла multipart запроса.
+    Строка base64 декодируется порциями во временный файл, без второй
+    копии данных в памяти. Файл multipart Django уже пишет на диск
+    порциями. Формат определяется по первым байтам, размер проверяется
+    до декодирования, затем Pillow проверяет файл с диска.
     """
+    default_error_messages = {
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, six.string_types):
-            if 'data:' in data and ';base64,' in data:
-                header, data = data.split(';base64,')
+            data = self.decode_base64(data)
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            self.check_upload(data)
+        return super(Base64ImageField, self).to_internal_value(data)
 
-            try:
-                decoded_file = base64.b64decode(data)
-            except TypeError:
-                self.fail('invalid_image')
+    def fail_too_large(self):
+        reject('image')
+        self.fail('too_large', max_bytes=limit('MAX_IMAGE_BYTES'))
 
-            file_name = str(uuid.uuid4())[:12]
-            file_extension = self.get_file_extension(file_name, decoded_file)
-            complete_file_name = '%s.%s' % (file_name, file_extension, )
-            data = ContentFile(decoded_file, name=complete_file_name)
+    def decode_base64(self, data):
+        """Декодирование строки base64 во временный файл порциями.
 
-        return super(Base64ImageField, self).to_internal_value(data)
+        Args:
+            data (str): строка base64, возможно с заголовком data:.
+
+        Returns:
+            DecodedImageFile: декодированный файл.
+        """
+        start = data.find(';base64,')
+        if start == -1 or 'data:' not in data[:start]:
+            start = 0
+        else:
+            start += len(';base64,')
+        if any(space in data for space in ' \r\n'):
+            data = ''.join(data[start:].split())
+            start = 0
+        if (len(data) - start) // 4 * 3 > limit('MAX_IMAGE_BYTES'):
+            self.fail_too_large()
+        upload = DecodedImageFile('image', None, 0, None)
+        try:
+            for offset in range(start, len(data), BASE64_CHUNK):
+                upload.write(
+                    base64.b64decode(data[offset:offset + BASE64_CHUNK])
+                )
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_image')
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+    def check_upload(self, upload):
+        """Проверка размера и формата файла по первым байтам, файлу
+        задается случайное имя с расширением по формату.
 
-    def get_file_extension(self, file_name, decoded_file):
-        extension = imghdr.what(file_name, decoded_file)
-        extension = 'jpg' if extension == 'jpeg' else extension
-        return extension
+        Args:
+            upload (UploadedFile): загруженный файл.
+        """
+        if upload.size > limit('MAX_IMAGE_BYTES'):
+            self.fail_too_large()
+        upload.seek(0)
+        extension = image_extension(upload.read(16))
+        upload.seek(0)
+        if extension is None:
+            self.fail('invalid_image')
+        upload.name = '%s.%s' % (str(uuid.uuid4())[:12], extension, )
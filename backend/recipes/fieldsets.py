@@ -0,0 +1,102 @@
+"""Выборочные поля ответа: параметры ?fields= и ?expand=.
+
+Без параметра fields ответ полный, как раньше. С ним отдаются только
+перечисленные поля, а связи (автор, тэги, ингридиенты, рецепты автора)
+отдаются компактно - id вместо вложенных объектов. Связи из expand
+раскрываются полностью и попадают в ответ без перечисления в fields.
+Набор полей управляет и запросом к БД: не запрошенные столбцы
+откладываются через .only(), не запрошенные связи не подгружаются.
+"""
+from rest_framework.exceptions import ParseError
+
+
+def _split(values):
+    return [name for value in values for name in value.split(',') if name]
+
+
+class FieldSet:
+    """Набор полей ответа.
+
+    Args:
+        fields (iterable, optional): поля ответа. Defaults to None - все
+        поля.
+        expand (iterable, optional): связи, раскрываемые вложенными
+        объектами.
+    """
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = None if fields is None else set(fields)
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request, serializer_class):
+        """Набор полей из параметров запроса.
+
+        Args:
+            request (Request): данные запроса.
+            serializer_class (serializer): сериализатор ответа с
+            SparseFieldsMixin.
+
+        Raises:
+            ParseError: неизвестное поле или связь.
+
+        Returns:
+            FieldSet: набор полей.
+        """
+        fields = _split(request.query_params.getlist('fields'))
+        expand = _split(request.query_params.getlist('expand'))
+        allowed = serializer_class.Meta.fields
+        unknown = [name for name in fields if name not in allowed]
+        unknown += [name for name in expand
+                    if name not in serializer_class.compact_fields]
+        if unknown:
+            raise ParseError(f'Неизвестные поля: {", ".join(unknown)}.')
+        return cls(fields or None, expand)
+
+    def __contains__(self, name):
+        return (self.fields is None or name in self.fields
+                or name in self.expand)
+
+    def is_expanded(self, name):
+        """Отдается ли связь вложенными объектами."""
+        return self.fields is None or name in self.expand
+
+
+class SparseFieldsMixin:
+    """Примесь сериализатора: поля ответа по FieldSet из контекста.
+    compact_fields - связи и функции, создающие компактное поле для
+    связи, которую не раскрыли.
+    """
+    compact_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+        for name in list(fields):
+            if name not in fieldset:
+                del fields[name]
+            elif (name in self.compact_fields
+                    and not fieldset.is_expanded(name)):
+                fields[name] = self.compact_fields[name]()
+        return fields
+
+
+class FieldSetViewMixin:
+    """Примесь представления: FieldSet из запроса передается
+    сериализатору через контекст.
+    """
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = FieldSet.from_request(
+                self.request, self.get_serializer_class()
+            )
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['fieldset'] = self.get_fieldset()
+        return context
@@ -17,7 +17,8 @@ class IngredientSearchFilter(SearchFilter):
 class RecipeFilter(FilterSet):
     """Пользовательский класс наследуемый от FilterSet.
     """
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.AllValuesMultipleFilter(field_name='tags__slug',
+                                           method='filter_tags')
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
@@ -27,22 +28,42 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author', 'in_favorite', 'is_in_shopping_cart')
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с любым из тэгов.
+        Подзапрос по промежуточной таблице не размножает строки рецептов,
+        поэтому DISTINCT не нужен и список идет по индексу даты.
+
+        Returns:
+            queryset: возвращает исходное значение или рецепты с тэгами.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag__slug__in=value
+        ).values('recipe_id'))
+
     def filter_is_favorited(self, queryset, name, value):
         """Список избранных
 
         Returns:
-            queryset: возвращает исходное значение или список избранных.
+            queryset: возвращает исходное значение или список избранных,
+            для анонимного пользователя - пустой список без запроса к БД.
         """
-        if value:
-            return queryset.filter(in_favorite__user=self.request.user)
-        return queryset
+        if not value:
+            return queryset
+        if not self.request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(in_favorite__user=self.request.user)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Список покупок
 
         Returns:
-            queryset: возвращает исходное значение или список покупок.
+            queryset: возвращает исходное значение или список покупок,
+            для анонимного пользователя - пустой список без запроса к БД.
         """
-        if value:
-            return queryset.filter(shopping_cart__user=self.request.user)
-        return queryset
+        if not value:
+            return queryset
+        if not self.request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(shopping_cart__user=self.request.user)
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.fieldsets import FieldSet
+from recipes.models import Recipe
+from recipes.renderers import ORJSONRenderer
+from recipes.representations import (document_representations, recipe_queryset,
+                                     recipe_representations)
+from recipes.serializers import RecipeSerializer
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Проверка совпадения быстрых представлений рецептов с '
+            'RecipeSerializer и замер процессорного времени на страницу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--email', help='Пользователь запроса.')
+        parser.add_argument('--fields', default='',
+                            help='Параметр fields запроса.')
+        parser.add_argument('--expand', default='',
+                            help='Параметр expand запроса.')
+
+    def make_request(self, options):
+        params = {name: options[name] for name in ('fields', 'expand')
+                  if options[name]}
+        request = APIRequestFactory().get('/api/recipes/', params,
+                                          HTTP_HOST='localhost')
+        if options['email']:
+            force_authenticate(request,
+                               User.objects.get(email=options['email']))
+        request = Request(request)
+        try:
+            self.fieldset = FieldSet.from_request(request, RecipeSerializer)
+        except ParseError as error:
+            raise CommandError(error.detail)
+        return request
+
+    def serializer_page(self, ids, request):
+        recipes = recipe_queryset(Recipe.objects.all(),
+                                  self.fieldset).in_bulk(ids)
+        return RecipeSerializer(
+            [recipes[pk] for pk in ids], many=True,
+            context={'request': request, 'fieldset': self.fieldset},
+        ).data
+
+    def fast_page(self, ids, request):
+        return recipe_representations(ids, request, self.fieldset)
+
+    def document_page(self, ids, request):
+        documents = dict(Recipe.objects.filter(id__in=ids).values_list(
+            'id', 'document__document'
+        ))
+        return document_representations(
+            [(pk, documents[pk]) for pk in ids], request, self.fieldset
+        )
+
+    def measure(self, build, render, pages, request):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.process_time()
+            output = [render(build(ids, request)) for ids in pages]
+            elapsed = time.process_time() - started
+        return output, elapsed / len(pages), len(queries) / len(pages)
+
+    def handle(self, *args, **options):
+        request = self.make_request(options)
+        ids = list(Recipe.objects.values_list('id', flat=True)[
+            :options['pages'] * options['limit']])
+        pages = [ids[start:start + options['limit']]
+                 for start in range(0, len(ids), options['limit'])]
+        if not pages:
+            raise CommandError('Нет рецептов для проверки.')
+        json_render = JSONRenderer().render
+        expected, old_cpu, old_queries = self.measure(
+            self.serializer_page, json_render, pages, request)
+        actual, new_cpu, new_queries = self.measure(
+            self.fast_page, ORJSONRenderer().render, pages, request)
+        documents, document_cpu, document_queries = self.measure(
+            self.document_page, ORJSONRenderer().render, pages, request)
+        plain = [json_render(self.fast_page(page, request))
+                 for page in pages]
+        if expected != actual or expected != plain or expected != documents:
+            raise CommandError('Представления не совпадают с '
+                               'RecipeSerializer.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Вывод совпадает побайтно на {len(pages)} страницах.'))
+        self.stdout.write(
+            f'RecipeSerializer + JSONRenderer: {old_cpu * 1000:.2f} мс CPU, '
+            f'{old_queries:.1f} запросов на страницу')
+        self.stdout.write(
+            f'recipe_representations + ORJSONRenderer: '
+            f'{new_cpu * 1000:.2f} мс CPU, {new_queries:.1f} запросов '
+            f'на страницу')
+        self.stdout.write(
+            f'document_representations + ORJSONRenderer: '
+            f'{document_cpu * 1000:.2f} мс CPU, {document_queries:.1f} '
+            f'запросов на страницу')
+        self.stdout.write(
+            f'Размер страницы: {sum(map(len, actual)) / len(pages):.0f} байт')
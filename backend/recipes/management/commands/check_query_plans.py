@@ -0,0 +1,58 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.plans import collect, golden_path, load_golden, save_golden, seed
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов горячих запросов на тестовой базе: полные '
+            'просмотры и временные сортировки там, где ожидается индекс, '
+            'и расхождения с одобренными планами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--approve', action='store_true',
+                            help='Записать текущие планы как одобренные.')
+        parser.add_argument('--recipes', type=int, default=500,
+                            help='Количество рецептов в тестовой базе.')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with transaction.atomic():
+                plans, problems = collect(seed(options['recipes']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        golden = load_golden()
+        if not golden and not options['approve']:
+            raise CommandError(
+                f'Нет одобренных планов {golden_path()}, запустите команду '
+                f'с --approve на {connection.vendor}.'
+            )
+        changed = sorted(name for name in plans
+                         if golden.get(name) != plans[name])
+        for name in changed:
+            self.stdout.write(f'{name}: план изменился')
+            for line in golden.get(name, ['(нет одобренного плана)']):
+                self.stdout.write(f'  - {line}')
+            for line in plans[name]:
+                self.stdout.write(f'  + {line}')
+        for name, problem in problems:
+            self.stderr.write(f'{name}: {problem}')
+        if problems:
+            raise CommandError(
+                f'Нарушений в планах: {len(problems)}, одобрение невозможно.'
+            )
+        if options['approve']:
+            save_golden(plans)
+            self.stdout.write(self.style.SUCCESS(
+                f'Планы записаны в {golden_path()}.'))
+            return
+        if changed or set(golden) - set(plans):
+            raise CommandError(
+                'Планы отличаются от одобренных, проверьте изменения и '
+                'запустите команду с --approve.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Планы {len(plans)} запросов совпадают с одобренными.'))
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand, CommandError
+from recipes.deletion import CHUNK_SIZE, delete_users
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Удаление пользователей с рецептами, подписками, избранным и '
+            'списками покупок порциями в отдельных транзакциях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='+')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        users = dict(User.objects.filter(
+            email__in=options['emails']
+        ).values_list('email', 'pk'))
+        missing = sorted(set(options['emails']) - set(users))
+        if missing:
+            raise CommandError(
+                f'Пользователи не найдены: {", ".join(missing)}.'
+            )
+        recipes = delete_users(users.values(), options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено пользователей: {len(users)}, рецептов: {recipes}.'
+        ))
@@ -3,18 +3,19 @@ import csv
 from django.conf import settings
 from django.core.management import BaseCommand
 from django.db.utils import IntegrityError
+from recipes.catalogue import publish
 from recipes.models import Ingredient, Tag
 
 TABLES = {
-    Ingredient: 'ingredients.csv',
-    Tag: 'tags.csv',
+    Ingredient: ('ingredients.csv', 'ingredients'),
+    Tag: ('tags.csv', 'tags'),
 }
 
 
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         try:
-            for model, csv_f in TABLES.items():
+            for model, (csv_f, catalogue) in TABLES.items():
                 with open(
                     f'{settings.BASE_DIR}/data/{csv_f}',
                     'r',
@@ -22,6 +23,7 @@ class Command(BaseCommand):
                 ) as csv_file:
                     reader = csv.DictReader(csv_file)
                     model.objects.bulk_create(model(**data) for data in reader)
+                publish(catalogue)
                 print(f'  Importing data from file {csv_f}... OK')
             print()
             print(
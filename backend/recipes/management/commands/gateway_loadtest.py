@@ -0,0 +1,140 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+GATEWAYS = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Сервер не поднялся на порту {port}.')
+
+
+async def fetch(port, path, pause=0.0):
+    """Запрос GET. Заголовки отправляются по байту с паузой pause.
+
+    Returns:
+        float: время ответа в секундах или None при ошибке.
+    """
+    request = (f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+               'Connection: close\r\n\r\n').encode()
+    started = time.monotonic()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        if pause:
+            for byte in request:
+                writer.write(bytes([byte]))
+                await writer.drain()
+                await asyncio.sleep(pause)
+        else:
+            writer.write(request)
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+    except OSError:
+        return None
+    if b' 200 ' not in status_line:
+        return None
+    return time.monotonic() - started
+
+
+async def run_clients(port, path, connections, slow, duration):
+    """Медленные клиенты стартуют равномерно в течение duration, параллельно
+    каждые 100 мс отправляется быстрый пробный запрос.
+
+    Returns:
+        dict: результаты медленных и пробных запросов.
+    """
+    request_size = len(path) + 50
+
+    async def slow_client(delay):
+        await asyncio.sleep(delay)
+        return await fetch(port, path, pause=slow / request_size)
+
+    slow_clients = asyncio.gather(*(
+        slow_client(duration * number / connections)
+        for number in range(connections)
+    ))
+    probes = []
+    started = time.monotonic()
+    while time.monotonic() - started < duration:
+        probes.append(asyncio.ensure_future(fetch(port, path)))
+        await asyncio.sleep(0.1)
+    return {
+        'slow': await slow_clients,
+        'probes': await asyncio.gather(*probes),
+        'elapsed': time.monotonic() - started,
+    }
+
+
+def percentile(values, share):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = ('Сравнение WSGI и ASGI режимов на медленных клиентах: '
+            'для каждого режима поднимается gunicorn с одним воркером '
+            '(настройки режима в gunicorn.conf.py).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tags/')
+        parser.add_argument('--connections', type=int, default=50)
+        parser.add_argument('--slow', type=float, default=2.0,
+                            help='Секунд на отправку одного запроса.')
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--gateways', nargs='+', default=list(GATEWAYS),
+                            choices=GATEWAYS)
+
+    def handle(self, *args, **options):
+        for gateway in options['gateways']:
+            port = free_port()
+            env = dict(os.environ, SERVER_GATEWAY=gateway)
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn',
+                 '--workers', '1',
+                 '--bind', f'127.0.0.1:{port}',
+                 '--timeout', str(int(options['slow'] + 30))],
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(port, timeout=30)
+                result = asyncio.run(run_clients(
+                    port, options['path'], options['connections'],
+                    options['slow'], options['duration'],
+                ))
+            finally:
+                server.terminate()
+                server.wait()
+            slow = [value for value in result['slow'] if value is not None]
+            probes = [value for value in result['probes'] if value is not None]
+            self.stdout.write(
+                f'{gateway}: медленных {len(slow)}/{len(result["slow"])}, '
+                f'пробных {len(probes)}/{len(result["probes"])}, '
+                f'пробные p50 {percentile(probes, 0.5) * 1000:.0f} мс, '
+                f'p95 {percentile(probes, 0.95) * 1000:.0f} мс, '
+                f'всего {result["elapsed"]:.1f} c'
+            )
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+from recipes.media import CHUNK_SIZE, MIN_AGE, collect
+
+
+class Command(BaseCommand):
+    help = ('Удаление файлов из MEDIA_ROOT, на которые не ссылается ни '
+            'один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько файлов будет удалено.',
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=MIN_AGE,
+            help='Минимальный возраст файла в секундах.',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        stats = collect(
+            min_age=options['min_age'], dry_run=options['dry_run'],
+            workers=options['workers'], chunk_size=options['chunk_size'],
+        )
+        summary = (
+            f'Файлов: {stats["scanned"]}, моложе порога: {stats["young"]}, '
+            f'без ссылок: {stats["orphaned"]} ({stats["bytes"]} байт)'
+        )
+        if options['dry_run']:
+            self.stdout.write(f'{summary}, ничего не удалено.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary}, удалено: {stats["deleted"]}.'
+        ))
@@ -0,0 +1,53 @@
+import json
+import sys
+
+from django.core.management import BaseCommand
+from recipes.ndjson import import_batch
+
+
+class Command(BaseCommand):
+    help = ('Загрузка рецептов из NDJSON (формат выгрузки '
+            '/api/recipes/export/) транзакционными порциями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON или - для stdin.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self.load(sys.stdin, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                self.load(source, options['batch_size'])
+
+    def load(self, source, batch_size):
+        self.total = 0
+        self.rejected = 0
+        batch = []
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                batch.append((number, json.loads(line)))
+            except ValueError as error:
+                self.reject(number, f'Неверный JSON: {error}.')
+            if len(batch) >= batch_size:
+                self.load_batch(batch)
+                batch = []
+                self.stdout.write(f'  Загружено рецептов: {self.total}')
+        if batch:
+            self.load_batch(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена, рецептов: {self.total}, '
+            f'отклонено записей: {self.rejected}.'
+        ))
+
+    def load_batch(self, batch):
+        loaded, rejected = import_batch([record for _, record in batch])
+        self.total += loaded
+        for index, error in rejected:
+            self.reject(batch[index][0], error)
+
+    def reject(self, number, error):
+        self.rejected += 1
+        self.stderr.write(f'  Строка {number}: {error}')
@@ -0,0 +1,503 @@
+"""Нагрузочный и длительный тест API сценариями пользователей.
+
+Виртуальные пользователи - потоки, каждый со своим токеном и постоянным
+соединением, до конца теста выполняют сценарии, выбранные случайно по
+весам --mix:
+
+* browse - страница списка и просмотр рецепта;
+* filter - список с фильтрами по тэгу, автору и избранному;
+* favourite - двойное добавление в избранное и удаление;
+* cart - двойное переключение общего рецепта в списке покупок;
+* download - список покупок из двух рецептов и его скачивание;
+* subscribe - двойная подписка на популярного автора и отписка;
+* edit - два одновременных изменения своего рецепта.
+
+Двойные запросы отправляются одновременно с двух соединений, поэтому
+гонки проверки и записи проявляются как ответы 500. Ошибки БД на сервере
+(integrity, deadlock, locked и т.п.) берутся из счетчиков db.errors.*
+/api/metrics/ до и после теста. Метрики живут в памяти воркера, поэтому
+точны при одном воркере gunicorn.
+
+Без --url команда поднимает gunicorn на свободном порту с той же базой,
+ограничения частоты записи для него снимаются.
+
+Тест пишет в настроенную базу: пользователи loadtest-N с токенами и
+рецептами (с изображениями), их избранное, покупки и подписки на
+настоящих авторов. Поэтому запуск требует --write-data, а после теста
+все пользователи @loadtest.invalid удаляются recipes.deletion.delete_users
+вместе с этими данными и файлами изображений.
+"""
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+from foodgram.caches import is_shared
+from recipes.deletion import delete_users
+from recipes.management.commands.gateway_loadtest import (free_port,
+                                                          percentile,
+                                                          wait_for_port)
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tasks import delete_unused_images
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+DEFAULT_MIX = ('browse=5,filter=3,favourite=2,cart=2,download=1,'
+               'subscribe=1,edit=1')
+EMAIL_DOMAIN = '@loadtest.invalid'
+USER_EMAIL = 'loadtest-{}' + EMAIL_DOMAIN
+STAFF_EMAIL = 'loadtest-staff' + EMAIL_DOMAIN
+IMAGE = ('data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAAB'
+         'AAEAAAIBRAA7')
+UNLIMITED_RATE = '1000000/min'
+SAMPLE_SIZE = 500
+
+
+def parse_mix(value):
+    """Веса сценариев из строки вида browse=5,cart=1.
+
+    Raises:
+        CommandError: неизвестный сценарий или неверный вес.
+
+    Returns:
+        dict: сценарий -> вес.
+    """
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in JOURNEYS:
+            raise CommandError(f'Неизвестный сценарий: {name}.')
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'Неверный вес сценария {name}.')
+    if not any(mix.values()):
+        raise CommandError('Не выбрано ни одного сценария.')
+    return mix
+
+
+class Stats:
+    """Результаты запросов всех виртуальных пользователей."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.journeys = Counter()
+
+    def add(self, step, status, seconds):
+        with self.lock:
+            self.samples[step].append(seconds)
+            self.statuses[step][status] += 1
+
+    def finish(self, journey):
+        with self.lock:
+            self.journeys[journey] += 1
+
+    def totals(self):
+        with self.lock:
+            statuses = Counter()
+            for counter in self.statuses.values():
+                statuses.update(counter)
+        return statuses
+
+
+class Client:
+    """HTTP клиент виртуального пользователя с токеном и постоянным
+    соединением. Статус 0 - ошибка соединения.
+    """
+
+    def __init__(self, host, port, token, stats):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.stats = stats
+        self.connection = self.connect()
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, step, method, path, body=None, connection=None):
+        """Запрос с записью статуса и времени ответа.
+
+        Returns:
+            tuple: статус и разобранный JSON ответа или None.
+        """
+        connection = connection or self.connection
+        headers = {'Authorization': f'Token {self.token}'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            content, status = b'', 0
+        self.stats.add(step, status, time.perf_counter() - started)
+        is_json = content[:1] in (b'{', b'[')
+        return status, json.loads(content) if is_json else None
+
+    def twice(self, step, method, path, body=None):
+        """Два одинаковых запроса одновременно с разных соединений."""
+        barrier = threading.Barrier(2)
+
+        def send():
+            connection = self.connect()
+            try:
+                barrier.wait()
+                self.request(step, method, path, body, connection)
+            finally:
+                connection.close()
+
+        second = threading.Thread(target=send)
+        second.start()
+        send()
+        second.join()
+
+
+class Context:
+    """Данные для сценариев: образцы рецептов, тэгов, ингридиентов и
+    популярные авторы.
+    """
+
+    def __init__(self):
+        self.recipes = list(Recipe.objects.order_by('?').values_list(
+            'id', flat=True)[:SAMPLE_SIZE])
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = list(Ingredient.objects.order_by('?').values_list(
+            'id', flat=True)[:SAMPLE_SIZE])
+        self.authors = list(User.objects.annotate(
+            total=Count('recipe')
+        ).filter(total__gt=0).order_by('-total').values_list(
+            'id', flat=True)[:10])
+        if not (self.recipes and self.tags and self.ingredients):
+            raise CommandError('Нужны рецепты, тэги и ингридиенты в базе.')
+        self.hot_recipe = self.recipes[0]
+
+    def recipe_body(self, image=False):
+        tags = random.sample(list(self.tags.values()),
+                             min(2, len(self.tags)))
+        ingredients = random.sample(self.ingredients,
+                                    min(3, len(self.ingredients)))
+        body = {
+            'name': 'Нагрузочный рецепт',
+            'text': 'Рецепт пользователя нагрузочного теста.',
+            'cooking_time': random.randint(1, 120),
+            'tags': tags,
+            'ingredients': [{'id': pk, 'amount': random.randint(1, 500)}
+                            for pk in ingredients],
+        }
+        if image:
+            body['image'] = IMAGE
+        return body
+
+
+def browse(client, context, own_recipe):
+    page = random.randint(1, 5)
+    client.request('browse.list', 'GET', f'/api/recipes/?page={page}')
+    recipe = random.choice(context.recipes)
+    client.request('browse.retrieve', 'GET', f'/api/recipes/{recipe}/')
+
+
+def filter_recipes(client, context, own_recipe):
+    params = {'tags': random.choice(list(context.tags))}
+    if context.authors and random.random() < 0.5:
+        params['author'] = random.choice(context.authors)
+    if random.random() < 0.3:
+        params['is_favorited'] = 1
+    client.request('filter.list', 'GET', f'/api/recipes/?{urlencode(params)}')
+
+
+def favourite(client, context, own_recipe):
+    path = f'/api/recipes/{random.choice(context.recipes)}/favorite/'
+    client.twice('favourite.add', 'POST', path)
+    client.request('favourite.remove', 'DELETE', path)
+
+
+def cart(client, context, own_recipe):
+    path = f'/api/recipes/{context.hot_recipe}/shopping_cart/'
+    client.twice('cart.add', 'POST', path)
+    client.twice('cart.remove', 'DELETE', path)
+
+
+def download(client, context, own_recipe):
+    recipes = random.sample(context.recipes, min(2, len(context.recipes)))
+    for recipe in recipes:
+        client.request('download.add', 'POST',
+                       f'/api/recipes/{recipe}/shopping_cart/')
+    client.request('download.file', 'GET',
+                   '/api/recipes/download_shopping_cart/')
+    for recipe in recipes:
+        client.request('download.remove', 'DELETE',
+                       f'/api/recipes/{recipe}/shopping_cart/')
+
+
+def subscribe(client, context, own_recipe):
+    if not context.authors:
+        return
+    path = f'/api/users/{random.choice(context.authors)}/subscribe/'
+    client.twice('subscribe.add', 'POST', path)
+    client.request('subscribe.remove', 'DELETE', path)
+
+
+def edit(client, context, own_recipe):
+    client.twice('edit.patch', 'PATCH', f'/api/recipes/{own_recipe}/',
+                 context.recipe_body())
+
+
+JOURNEYS = {
+    'browse': browse,
+    'filter': filter_recipes,
+    'favourite': favourite,
+    'cart': cart,
+    'download': download,
+    'subscribe': subscribe,
+    'edit': edit,
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест API сценариями пользователей: запросы в '
+            'секунду, перцентили времени ответа, доля ошибок и ошибки БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Адрес запущенного сервера. По '
+                            'умолчанию gunicorn поднимается локально.')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Виртуальных пользователей (потоков).')
+        parser.add_argument('--duration', type=float, default=60.0)
+        parser.add_argument('--ramp-up', type=float, default=5.0)
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Воркеров локального gunicorn.')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков воркера локального gunicorn.')
+        parser.add_argument('--report-interval', type=float, default=10.0)
+        parser.add_argument('--staff-email', help='Сотрудник для чтения '
+                            '/api/metrics/ с сервера --url.')
+        parser.add_argument('--max-error-rate', type=float,
+                            help='Доля ошибок, выше которой команда '
+                            'завершается ошибкой.')
+        parser.add_argument('--write-data', action='store_true',
+                            help='Разрешить запись данных теста в '
+                            'настроенную базу, после теста они удаляются.')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if not options['write_data']:
+            raise CommandError(
+                'Тест создает пользователей, рецепты и изображения и '
+                'отмечает избранное, покупки и подписки в базе '
+                f'{settings.DATABASES["default"]["NAME"]}. Запустите с '
+                '--write-data, данные теста удаляются после него.'
+            )
+        server = None
+        staff = None
+        if options['url']:
+            url = urlsplit(options['url'])
+            host, port = url.hostname, url.port or 80
+            if options['staff_email']:
+                staff = User.objects.get(email=options['staff_email'])
+        else:
+            host, port = '127.0.0.1', free_port()
+            server = self.start_server(port, options)
+            staff, _ = User.objects.get_or_create(
+                email=STAFF_EMAIL,
+                defaults={'username': 'loadtest-staff', 'is_staff': True},
+            )
+        try:
+            self.run(host, port, mix, staff, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            self.cleanup()
+
+    def start_server(self, port, options):
+        if options['workers'] > 1 and not is_shared(
+            settings.CACHES['default']['BACKEND']
+        ):
+            raise CommandError('Для нескольких воркеров gunicorn нужен '
+                               'общий CACHE_BACKEND.')
+        env = dict(
+            os.environ,
+            THROTTLE_USER_RATE=UNLIMITED_RATE,
+            THROTTLE_IP_RATE=UNLIMITED_RATE,
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn',
+             '--workers', str(options['workers']),
+             '--threads', str(options['threads']),
+             '--bind', f'127.0.0.1:{port}'],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(port, timeout=30)
+        except CommandError:
+            server.terminate()
+            raise
+        return server
+
+    def cleanup(self):
+        """Удаление пользователей теста с рецептами, избранным, покупками,
+        подписками и файлами изображений.
+        """
+        users = list(User.objects.filter(
+            email__endswith=EMAIL_DOMAIN
+        ).values_list('pk', flat=True))
+        images = list(Recipe.objects.filter(author_id__in=users).exclude(
+            image=''
+        ).values_list('image', flat=True))
+        recipes = delete_users(users)
+        delete_unused_images(images)
+        self.stdout.write(f'Удалено пользователей теста: {len(users)}, '
+                          f'рецептов: {recipes}.')
+
+    def prepare_users(self, count):
+        """Пользователи теста с токенами.
+
+        Returns:
+            list: пары (пользователь, ключ токена).
+        """
+        users = []
+        for number in range(count):
+            user, _ = User.objects.get_or_create(
+                email=USER_EMAIL.format(number),
+                defaults={'username': f'loadtest-{number}'},
+            )
+            users.append((user, Token.objects.get_or_create(user=user)[0].key))
+        return users
+
+    def own_recipe(self, client, user, context):
+        recipe = Recipe.objects.filter(author=user).values_list(
+            'id', flat=True).first()
+        if recipe is not None:
+            return recipe
+        status, data = client.request('setup.recipe', 'POST', '/api/recipes/',
+                                      context.recipe_body(image=True))
+        if status != 201:
+            raise CommandError(f'Не удалось создать рецепт: {status}.')
+        return data['id']
+
+    def read_metrics(self, host, port, staff):
+        if staff is None:
+            return None
+        token = Token.objects.get_or_create(user=staff)[0].key
+        client = Client(host, port, token, Stats())
+        status, data = client.request('metrics', 'GET', '/api/metrics/')
+        if status != 200:
+            return None
+        return {name: value for name, value in data['counters'].items()
+                if name.startswith('db.errors')}
+
+    def run(self, host, port, mix, staff, options):
+        context = Context()
+        stats = Stats()
+        clients = []
+        users = self.prepare_users(options['users'])
+        for user, token in users:
+            client = Client(host, port, token, Stats())
+            clients.append((client, self.own_recipe(client, user, context)))
+            client.stats = stats
+        context.authors = [author for author in context.authors
+                           if author not in {user.id for user, _ in users}]
+        before = self.read_metrics(host, port, staff)
+        names, weights = zip(*mix.items())
+        started = time.monotonic()
+        deadline = started + options['duration']
+
+        def virtual_user(number):
+            client, own_recipe = clients[number]
+            time.sleep(options['ramp_up'] * number / len(clients))
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                JOURNEYS[name](client, context, own_recipe)
+                stats.finish(name)
+
+        with ThreadPoolExecutor(len(clients)) as pool:
+            futures = [pool.submit(virtual_user, number)
+                       for number in range(len(clients))]
+            while time.monotonic() < deadline:
+                time.sleep(min(options['report_interval'],
+                               max(deadline - time.monotonic(), 0)))
+                self.progress(stats, time.monotonic() - started)
+            for future in futures:
+                future.result()
+        after = self.read_metrics(host, port, staff)
+        self.report(stats, time.monotonic() - started, before, after,
+                    options)
+
+    def progress(self, stats, elapsed):
+        statuses = stats.totals()
+        total = sum(statuses.values())
+        self.stdout.write(
+            f'  {elapsed:.0f} c: {total} запросов, '
+            f'{total / elapsed:.1f} в секунду, ошибок {errors(statuses)}'
+        )
+
+    def report(self, stats, elapsed, before, after, options):
+        self.stdout.write(
+            f'{"шаг":<18}{"запросов":>9}{"в с":>8}{"p50":>8}{"p95":>8}'
+            f'{"p99":>8}{"4xx":>6}{"5xx":>6}'
+        )
+        for step in sorted(stats.samples):
+            samples = stats.samples[step]
+            statuses = stats.statuses[step]
+            client_errors = sum(count for status, count in statuses.items()
+                                if 400 <= status < 500)
+            self.stdout.write(
+                f'{step:<18}{len(samples):>9}{len(samples) / elapsed:>8.1f}'
+                + ''.join(f'{percentile(samples, share) * 1000:>8.0f}'
+                          for share in (0.5, 0.95, 0.99))
+                + f'{client_errors:>6}{errors(statuses):>6}'
+            )
+        statuses = stats.totals()
+        total = sum(statuses.values())
+        rate = errors(statuses) / total if total else 0.0
+        self.stdout.write(
+            f'Всего {total} запросов за {elapsed:.1f} c, '
+            f'{total / elapsed:.1f} в секунду, доля ошибок {rate:.2%}.'
+        )
+        self.stdout.write('Сценарии: ' + ', '.join(
+            f'{name} {count}' for name, count in stats.journeys.most_common()
+        ))
+        self.report_database(before, after, options)
+        limit = options['max_error_rate']
+        if limit is not None and rate > limit:
+            raise CommandError(f'Доля ошибок {rate:.2%} выше {limit:.2%}.')
+
+    def report_database(self, before, after, options):
+        if before is None or after is None:
+            self.stdout.write('Ошибки БД не известны: нет доступа к '
+                              '/api/metrics/.')
+            return
+        changes = {name: after[name] - before.get(name, 0)
+                   for name in after if after[name] != before.get(name, 0)}
+        note = (' (метрики одного воркера)'
+                if not options['url'] and options['workers'] > 1 else '')
+        self.stdout.write(f'Ошибки БД{note}: ' + (', '.join(
+            f'{name} {count}' for name, count in sorted(changes.items())
+        ) or 'нет'))
+
+
+def errors(statuses):
+    """Количество ошибок: ответы 5xx и ошибки соединения."""
+    return sum(count for status, count in statuses.items()
+               if status >= 500 or status == 0)
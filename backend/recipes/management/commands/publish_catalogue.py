@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand, CommandError
+from recipes.catalogue import CATALOGUES, brotli, publish
+
+
+class Command(BaseCommand):
+    help = ('Публикация статических снимков справочников ингридиентов и '
+            'тэгов с вариантами gzip и brotli для отдачи через nginx.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='Справочники, по умолчанию все.')
+        parser.add_argument('--root', help='Каталог снимков, по умолчанию '
+                                           'CATALOGUE_ROOT.')
+
+    def handle(self, *args, **options):
+        unknown = sorted(set(options['names']) - set(CATALOGUES))
+        if unknown:
+            raise CommandError(f'Неизвестные справочники: '
+                               f'{", ".join(unknown)}.')
+        if brotli is None:
+            self.stderr.write('Пакет brotli не установлен, вариант .br '
+                              'не публикуется.')
+        for name in options['names'] or CATALOGUES:
+            version, written = publish(name, options['root'])
+            state = 'опубликован' if written else 'без изменений'
+            self.stdout.write(f'  {name}: версия {version}, {state}')
+        self.stdout.write(self.style.SUCCESS('Снимки справочников готовы.'))
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+from recipes.documents import CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Пересборка документов рецептов для чтения списка и '
+            'просмотра рецепта.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Документы пересобраны, рецептов: {total}.'
+        ))
@@ -0,0 +1,133 @@
+"""Сборка мусора в каталоге медиа: файлы, на которые не ссылается ни
+один рецепт.
+
+Обычно старое изображение удаляет задача delete_unused_image после
+изменения или удаления рецепта, но файлы, оставшиеся до ее появления
+или от упавших задач, копятся. Каталог MEDIA_ROOT обходится потоком
+через os.scandir, имена проверяются по Recipe.image порциями одним
+запросом на порцию, поэтому ни полный список файлов, ни все имена
+изображений в памяти не держатся. Файлы моложе порога возраста
+пропускаются: изображение нового рецепта записывается до фиксации его
+транзакции.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from recipes.models import Recipe
+
+CHUNK_SIZE = 1000
+MIN_AGE = 24 * 60 * 60
+
+
+def iter_files(root, older_than=None, stats=None):
+    """Обход дерева файлов без построения полного списка.
+
+    Args:
+        root (str): корневой каталог.
+        older_than (float, optional): отметка времени, файлы, измененные
+        позже, пропускаются. Defaults to None.
+        stats (dict, optional): счетчики scanned и young.
+        Defaults to None.
+
+    Yields:
+        tuple: имя относительно корня с разделителем '/' и размер.
+    """
+    stats = {} if stats is None else stats
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stats['scanned'] = stats.get('scanned', 0) + 1
+                info = entry.stat(follow_symlinks=False)
+                if older_than is not None and info.st_mtime > older_than:
+                    stats['young'] = stats.get('young', 0) + 1
+                    continue
+                name = os.path.relpath(entry.path, root)
+                yield name.replace(os.sep, '/'), info.st_size
+
+
+def chunked(iterable, size):
+    """Порции итератора по size элементов.
+
+    Args:
+        iterable (iterable): исходный поток.
+        size (int): размер порции.
+
+    Yields:
+        list: очередная порция.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def unreferenced(files):
+    """Файлы порции, на которые не ссылается ни один рецепт.
+
+    Args:
+        files (list): пары (имя, размер).
+
+    Returns:
+        list: пары (имя, размер) без ссылок.
+    """
+    referenced = set(Recipe.objects.filter(
+        image__in=[name for name, _ in files]
+    ).values_list('image', flat=True))
+    return [(name, size) for name, size in files if name not in referenced]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def collect(min_age=MIN_AGE, dry_run=False, workers=4,
+            chunk_size=CHUNK_SIZE, root=None):
+    """Удаление файлов медиа без ссылок из рецептов.
+
+    Args:
+        min_age (float, optional): минимальный возраст файла в секундах.
+        Defaults to MIN_AGE.
+        dry_run (bool, optional): только посчитать, ничего не удалять.
+        Defaults to False.
+        workers (int, optional): число потоков удаления. Defaults to 4.
+        chunk_size (int, optional): размер порции проверки ссылок.
+        Defaults to CHUNK_SIZE.
+        root (str, optional): каталог. Defaults to settings.MEDIA_ROOT.
+
+    Returns:
+        dict: счетчики scanned, young, orphaned, deleted и bytes.
+    """
+    root = settings.MEDIA_ROOT if root is None else root
+    stats = {'scanned': 0, 'young': 0, 'orphaned': 0, 'deleted': 0,
+             'bytes': 0}
+    files = iter_files(root, time.time() - min_age, stats)
+    with ThreadPoolExecutor(max(workers, 1)) as pool:
+        for chunk in chunked(files, chunk_size):
+            orphans = unreferenced(chunk)
+            stats['orphaned'] += len(orphans)
+            stats['bytes'] += sum(size for _, size in orphans)
+            if dry_run or not orphans:
+                continue
+            paths = [os.path.join(root, *name.split('/'))
+                     for name, _ in orphans]
+            stats['deleted'] += sum(pool.map(_remove, paths))
+    return stats
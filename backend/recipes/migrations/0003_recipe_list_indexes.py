@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+INGREDIENT_PREFIX_INDEX = 'recipes_ingredient_name_upper_like'
+
+
+def create_ingredient_prefix_index(apps, schema_editor):
+    # Поиск ^name идет через UPPER(name) LIKE UPPER('...%'), на PostgreSQL
+    # такой запрос использует только индекс по выражению с pattern_ops.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INGREDIENT_PREFIX_INDEX} '
+            'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_ingredient_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {INGREDIENT_PREFIX_INDEX}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(create_ingredient_prefix_index,
+                             drop_ingredient_prefix_index),
+    ]
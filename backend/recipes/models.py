@@ -79,6 +79,11 @@ class Recipe(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -114,6 +119,23 @@ class IngredientForRecipe(models.Model):
         verbose_name_plural = 'Количество ингридиентов'
 
 
+class RecipeDocument(models.Model):
+    """Готовый документ рецепта для чтения: поля RecipeSerializer с
+    автором, тэгами и ингридиентами, без флагов пользователя и с именем
+    файла изображения вместо ссылки. Поддерживается recipes.documents.
+    """
+    recipe = models.OneToOneField(
+        Recipe, primary_key=True, on_delete=models.CASCADE,
+        related_name='document', verbose_name='Рецепт'
+    )
+    document = models.JSONField('Документ')
+    updated = models.DateTimeField('Обновлен', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+
 class Favourite(models.Model):
     user = models.ForeignKey(
         User,
@@ -0,0 +1,239 @@
+"""Выгрузка и загрузка рецептов в формате NDJSON: одна строка - один
+рецепт с автором, тэгами, ингридиентами и именем файла изображения.
+"""
+import json
+import tempfile
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from recipes.cache import bump_version
+from recipes.facets import FACETS_NAMESPACE
+from recipes.models import Ingredient, IngredientForRecipe, Recipe, Tag
+from recipes.pantry import PANTRY_NAMESPACE
+from recipes.signals import recipes_changed
+from recipes.tasks import schedule_publish
+from users.counters import recount
+from users.models import User
+
+
+def recipe_to_record(recipe):
+    """Рецепт в виде словаря для NDJSON.
+
+    Args:
+        recipe (Recipe): рецепт с подгруженными автором, тэгами и
+        ингридиентами.
+
+    Returns:
+        dict: запись рецепта.
+    """
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': recipe.image.name,
+        'author': {
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_for_ingridient.all()
+        ],
+    }
+
+
+def export_lines(queryset, chunk_size=500):
+    """Построчная выгрузка рецептов.
+    Рецепты читаются порциями по возрастанию id, связанные таблицы
+    подгружаются отдельно для каждой порции, поэтому память не растет с
+    размером таблицы.
+
+    Args:
+        queryset (QuerySet): выгружаемые рецепты.
+        chunk_size (int, optional): размер порции. Defaults to 500.
+
+    Yields:
+        str: строка NDJSON.
+    """
+    queryset = queryset.order_by('id').select_related('author')
+    queryset = queryset.prefetch_related(
+        'tags', 'recipe_for_ingridient__ingredient'
+    )
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps(recipe_to_record(recipe),
+                             ensure_ascii=False) + '\n'
+        last_id = chunk[-1].id
+
+
+def export_file(queryset, chunk_size=500):
+    """Выгрузка рецептов во временный файл.
+    Под ASGI Django перебирает потоковый ответ в цикле событий, где
+    запросы к БД запрещены, поэтому выгрузка собирается заранее в потоке
+    представления.
+
+    Args:
+        queryset (QuerySet): выгружаемые рецепты.
+        chunk_size (int, optional): размер порции. Defaults to 500.
+
+    Returns:
+        file: временный файл, открытый на чтение с начала.
+    """
+    file = tempfile.TemporaryFile()
+    for line in export_lines(queryset, chunk_size):
+        file.write(line.encode())
+    file.seek(0)
+    return file
+
+
+def _resolve(queryset, key, wanted, build):
+    """Поиск объектов справочника с созданием недостающих.
+
+    Args:
+        queryset (QuerySet): объекты, среди которых идет поиск.
+        key (callable): ключ объекта.
+        wanted (iterable): нужные ключи.
+        build (callable): новый объект по ключу.
+
+    Returns:
+        dict: ключ -> объект.
+    """
+    found = {key(obj): obj for obj in queryset}
+    missing = [build(value) for value in wanted if value not in found]
+    if not missing:
+        return found
+    queryset.model.objects.bulk_create(missing, ignore_conflicts=True)
+    return {key(obj): obj for obj in queryset.all()}
+
+
+def _author_errors(authors, users):
+    """Причины, по которым авторы не найдены и не созданы.
+    Вставка с ignore_conflicts молча пропускает автора, если его логин
+    уже занят пользователем с другой почтой.
+
+    Args:
+        authors (dict): почта -> данные автора из записей.
+        users (dict): почта -> найденный пользователь.
+
+    Returns:
+        dict: почта -> текст ошибки.
+    """
+    missing = {email: author['username']
+               for email, author in authors.items() if email not in users}
+    taken = set(User.objects.filter(
+        username__in=missing.values()
+    ).values_list('username', flat=True))
+    return {
+        email: (f'Логин {username} занят другим пользователем.'
+                if username in taken
+                else f'Автор {email} не создан.')
+        for email, username in missing.items()
+    }
+
+
+def import_batch(records):
+    """Загрузка порции записей в одной транзакции.
+    Массовая вставка не вызывает сигналы, поэтому счетчики авторов
+    пересчитываются в той же транзакции, а версии кэшей сбрасываются
+    явно. Записи, автора которых нельзя ни найти, ни создать, не
+    загружаются и возвращаются с причиной.
+
+    Args:
+        records (list): словари рецептов в формате recipe_to_record.
+
+    Returns:
+        tuple: количество загруженных рецептов и список отклоненных
+        записей (номер в records, текст ошибки).
+    """
+    authors = {record['author']['email']: record['author']
+               for record in records}
+    tags = {slug for record in records for slug in record['tags']}
+    ingredients = {
+        (item['name'], item['measurement_unit'])
+        for record in records for item in record['ingredients']
+    }
+    with transaction.atomic():
+        users = _resolve(
+            User.objects.filter(email__in=authors),
+            lambda user: user.email,
+            authors,
+            lambda email: User(password='!', **authors[email]),
+        )
+        errors = _author_errors(authors, users)
+        rejected = [
+            (number, errors[record['author']['email']])
+            for number, record in enumerate(records)
+            if record['author']['email'] in errors
+        ]
+        records = [record for record in records
+                   if record['author']['email'] not in errors]
+        tags = _resolve(
+            Tag.objects.filter(slug__in=tags),
+            lambda tag: tag.slug,
+            tags,
+            lambda slug: Tag(name=slug, slug=slug),
+        )
+        ingredients = _resolve(
+            Ingredient.objects.filter(
+                name__in=[name for name, _ in ingredients]
+            ),
+            lambda item: (item.name, item.measurement_unit),
+            ingredients,
+            lambda key: Ingredient(name=key[0], measurement_unit=key[1]),
+        )
+        recipes = [
+            Recipe(
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=record['image'],
+                author=users[record['author']['email']],
+            )
+            for record in records
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        for recipe, record in zip(recipes, records):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        IngredientForRecipe.objects.bulk_create([
+            IngredientForRecipe(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (item['name'], item['measurement_unit'])
+                ],
+                amount=item['amount'],
+            )
+            for recipe, record in zip(recipes, records)
+            for item in record['ingredients']
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag=tags[slug])
+            for recipe, record in zip(recipes, records)
+            for slug in record['tags']
+        ])
+        recount(user.pk for user in users.values())
+        recipes_changed.send(sender=Recipe,
+                             recipe_ids=[recipe.pk for recipe in recipes])
+        schedule_publish('tags')
+        schedule_publish('ingredients')
+    bump_version(PANTRY_NAMESPACE)
+    bump_version(FACETS_NAMESPACE)
+    return len(recipes), rejected
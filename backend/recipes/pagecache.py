@@ -0,0 +1,103 @@
+"""Кэш готовых ответов для анонимных запросов.
+
+Запрос без заголовка Authorization не зависит от пользователя, поэтому
+его ответ целиком (тело, статус и заголовки) кэшируется по хосту, пути и
+параметрам запроса. Ключ строится на версии PAGES_NAMESPACE, которую
+сбрасывают записи рецептов, тэгов, ингридиентов и профилей авторов
+(recipes.signals), старые ответы просто перестают читаться. Попадания и
+промахи видны в /api/metrics/ как pagecache.hit и pagecache.miss.
+Запросы браузерного API (Accept: text/html) не кэшируются.
+
+Версия сбрасывается после фиксации записи, а реплики могут отставать,
+поэтому промах читает с основной базы (primary_reads): иначе устаревший
+ответ попал бы в кэш под новой версией на PAGE_CACHE_TTL.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from foodgram import metrics
+from foodgram.db.routers import primary_reads
+from recipes.cache import get_version
+
+PAGES_NAMESPACE = 'pages'
+PAGE_KEY = 'foodgram:page:{}:{}'
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow')
+
+
+def is_anonymous(request):
+    """Запрос без учетных данных: токена и сессии.
+
+    Args:
+        request (HttpRequest): запрос.
+
+    Returns:
+        bool: ответ не зависит от пользователя.
+    """
+    return ('HTTP_AUTHORIZATION' not in request.META
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def page_key(request):
+    """Ключ ответа: версия, хост со схемой, путь и параметры запроса в
+    порядке имен.
+
+    Args:
+        request (HttpRequest): запрос.
+
+    Returns:
+        str: ключ кэша.
+    """
+    params = sorted(
+        (name, value) for name in request.GET
+        for value in request.GET.getlist(name)
+    )
+    source = '|'.join([
+        request.scheme, request.get_host(), request.path, repr(params),
+    ])
+    digest = hashlib.sha1(source.encode()).hexdigest()
+    return PAGE_KEY.format(get_version(PAGES_NAMESPACE), digest)
+
+
+class AnonymousPageCacheMixin:
+    """Примесь вьюсета: ответы действий page_cache_actions анонимным
+    пользователям отдаются из кэша, минуя аутентификацию, права,
+    фильтры и сериализацию.
+    """
+    page_cache_actions = ('list', 'retrieve')
+
+    def is_page_cacheable(self, request):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        return (settings.PAGE_CACHE_TTL > 0
+                and request.method == 'GET'
+                and action in self.page_cache_actions
+                and is_anonymous(request)
+                and 'text/html' not in request.META.get('HTTP_ACCEPT', ''))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        key = page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.incr('pagecache.hit')
+            content, status, headers = cached
+            response = HttpResponse(content, status=status)
+            for name, value in headers:
+                response[name] = value
+            response['X-Page-Cache'] = 'HIT'
+            return response
+        metrics.incr('pagecache.miss')
+        with primary_reads():
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response.render()
+        cache.set(key, (
+            response.content, response.status_code,
+            [(name, response[name]) for name in CACHED_HEADERS
+             if response.has_header(name)],
+        ), settings.PAGE_CACHE_TTL)
+        response['X-Page-Cache'] = 'MISS'
+        return response
@@ -1,9 +1,22 @@
+from foodgram.limits import limit, reject
 from rest_framework.pagination import PageNumberPagination
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     """Согласно ТЗ внесены правки в родительский класс пагинатора.
     Определены параметры для вывода требуемого количества страниц.
+    Значение limit больше MAX_PAGE_SIZE уменьшается до него.
     """
     page_size = 6
     page_size_query_param = 'limit'
+
+    @property
+    def max_page_size(self):
+        return limit('MAX_PAGE_SIZE')
+
+    def get_page_size(self, request):
+        page_size = super().get_page_size(request)
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested and requested.isdigit() and int(requested) > page_size:
+            reject('page_size')
+        return page_size
@@ -0,0 +1,105 @@
+import threading
+from itertools import chain
+
+import numpy as np
+from recipes.cache import get_version
+from recipes.models import IngredientForRecipe
+
+PANTRY_NAMESPACE = 'pantry'
+
+
+class PantryIndex:
+    """Инвертированный индекс ингридиент -> рецепты.
+
+    Индекс хранится в памяти процесса в виде компактных массивов NumPy:
+    ingredient_ids (отсортированные id ингридиентов), offsets (границы
+    списков рецептов для каждого ингридиента), postings (позиции рецептов),
+    recipe_ids и recipe_sizes (количество ингридиентов в рецепте).
+    Индекс перестраивается, когда меняется версия пространства 'pantry'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.ingredient_ids = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.int32)
+        self.recipe_ids = np.empty(0, dtype=np.int64)
+        self.recipe_sizes = np.empty(0, dtype=np.int32)
+
+    def build(self):
+        """Построение индекса по таблице IngredientForRecipe.
+        Строки читаются потоком и сразу укладываются в массив пар.
+        """
+        rows = IngredientForRecipe.objects.order_by().values_list(
+            'ingredient_id', 'recipe_id'
+        )
+        pairs = np.fromiter(
+            chain.from_iterable(rows.iterator(chunk_size=10000)),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        recipe_ids, positions = np.unique(pairs[:, 1], return_inverse=True)
+        ingredient_ids, starts = np.unique(pairs[:, 0], return_index=True)
+        self.ingredient_ids = ingredient_ids
+        self.offsets = np.append(starts, len(pairs)).astype(np.int64)
+        self.postings = positions.astype(np.int32)
+        self.recipe_ids = recipe_ids
+        self.recipe_sizes = np.bincount(
+            self.postings, minlength=len(recipe_ids)
+        ).astype(np.int32)
+
+    def refresh(self):
+        """Перестроение индекса, если он устарел."""
+        version = get_version(PANTRY_NAMESPACE)
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version != version:
+                self.build()
+                self._version = version
+
+    def rank(self, ingredients, allowed=None):
+        """Ранжирование рецептов по доле имеющихся ингридиентов.
+
+        Args:
+            ingredients (list): id ингридиентов, которые есть у пользователя.
+            allowed (list, optional): id рецептов, прошедших фильтры.
+            Defaults to None.
+
+        Returns:
+            list: кортежи (id рецепта, доля покрытия, число совпадений),
+            отсортированные по убыванию покрытия и числа совпадений.
+        """
+        self.refresh()
+        wanted = np.unique(np.asarray(ingredients, dtype=np.int64))
+        found = np.searchsorted(self.ingredient_ids, wanted)
+        found = found[found < len(self.ingredient_ids)]
+        found = found[np.isin(self.ingredient_ids[found], wanted)]
+        if not len(found):
+            return []
+        postings = np.concatenate(
+            [self.postings[self.offsets[i]:self.offsets[i + 1]]
+             for i in found]
+        )
+        matched = np.bincount(postings, minlength=len(self.recipe_ids))
+        candidates = np.flatnonzero(matched)
+        if allowed is not None:
+            candidates = candidates[
+                np.isin(self.recipe_ids[candidates],
+                        np.asarray(allowed, dtype=np.int64))
+            ]
+        matched = matched[candidates]
+        coverage = matched / self.recipe_sizes[candidates]
+        order = np.lexsort((-self.recipe_ids[candidates], -matched, -coverage))
+        return [
+            (int(recipe_id), float(share), int(count))
+            for recipe_id, share, count in zip(
+                self.recipe_ids[candidates][order],
+                coverage[order],
+                matched[order],
+            )
+        ]
+
+
+pantry_index = PantryIndex()
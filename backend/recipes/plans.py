@@ -0,0 +1,331 @@
+"""Проверка планов выполнения горячих запросов.
+
+Для каждого запроса из hot_queries() берется SQL с параметрами и
+выполняется EXPLAIN: EXPLAIN QUERY PLAN на SQLite и EXPLAIN (FORMAT JSON)
+на PostgreSQL. План приводится к списку строк, одинаковых между
+запусками, и проверяется правилами: полный просмотр таблицы и сортировка
+во временном B-дереве допускаются только там, где они явно разрешены.
+Одобренные планы хранятся в query_plans/<vendor>.json, изменение плана
+тоже считается ошибкой до повторного одобрения (команда
+check_query_plans --approve).
+
+На PostgreSQL на время проверки выключаются enable_seqscan и
+enable_sort: на маленьком наборе данных планировщик иначе выбирает
+последовательный просмотр и при наличии индекса, а так Seq Scan в плане
+означает, что подходящего индекса нет.
+"""
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from itertools import combinations
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.http import QueryDict
+from recipes.filters import RecipeFilter
+from recipes.models import (Favourite, Follow, Ingredient, IngredientForRecipe,
+                            Recipe, ShoppingCart, Tag)
+from recipes.views import shopping_list_ingredients
+from users.models import User
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'query_plans')
+# Узлы-обертки PostgreSQL, которые не меняют способ доступа к таблицам и
+# появляются в плане в зависимости от оценки числа строк.
+POSTGRESQL_SKIPPED_NODES = {'Materialize', 'Memoize'}
+TAGS = ('breakfast', 'lunch', 'diner')
+INGREDIENT_NAMES = ('картофель', 'капуста', 'морковь', 'лук', 'соль',
+                    'сахар', 'мука', 'молоко')
+RECIPE_FILTERS = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+SORTED_FILTERS = {'tags', 'is_favorited', 'is_in_shopping_cart'}
+
+
+@dataclass
+class HotQuery:
+    """Горячий запрос и допущения для его плана.
+
+    Attributes:
+        name (str): имя запроса в файле одобренных планов.
+        queryset (QuerySet): проверяемый запрос.
+        allow_scan (tuple): таблицы, которые можно просматривать целиком.
+        allow_sort (bool): допускается сортировка или группировка во
+        временной структуре. Разрешается для выборок, ограниченных
+        данными одного пользователя, и для фильтра по тэгам, где выбор
+        между индексом даты и сортировкой зависит от селективности тэга.
+        vendors (dict): допущения allow_scan для отдельных СУБД.
+    """
+    name: str
+    queryset: object
+    allow_scan: tuple = ()
+    allow_sort: bool = False
+    vendors: dict = field(default_factory=dict)
+
+    def allowed_scans(self, vendor):
+        return set(self.allow_scan) | set(self.vendors.get(vendor, ()))
+
+
+def _recipe_list(user, names):
+    data = {
+        'tags': 'breakfast',
+        'author': str(user.pk),
+        'is_favorited': '1',
+        'is_in_shopping_cart': '1',
+    }
+    filterset = RecipeFilter(
+        QueryDict(urlencode({name: data[name] for name in names})),
+        queryset=Recipe.objects.all(),
+        request=SimpleNamespace(user=user),
+    )
+    if not filterset.is_valid():
+        raise ValueError(f'Фильтр {names}: {filterset.errors}')
+    return filterset.qs.values_list('id', 'document__document')[:6]
+
+
+def hot_queries(user):
+    """Горячие запросы API для пользователя из тестовых данных.
+
+    Args:
+        user (User): пользователь с избранным, списком покупок и
+        подписками.
+
+    Returns:
+        list: объекты HotQuery.
+    """
+    queries = []
+    for size in range(len(RECIPE_FILTERS) + 1):
+        for names in combinations(RECIPE_FILTERS, size):
+            queries.append(HotQuery(
+                name='recipe_list[{}]'.format(','.join(names)),
+                queryset=_recipe_list(user, names),
+                allow_sort=bool(SORTED_FILTERS & set(names)),
+            ))
+    authors = list(User.objects.filter(
+        following__user=user
+    ).values_list('id', flat=True)[:6])
+    queries += [
+        HotQuery(
+            name='subscriptions',
+            queryset=User.objects.filter(
+                following__user=user
+            ).order_by('id').only('id', 'email', 'username')[:6],
+            allow_sort=True,
+        ),
+        HotQuery(
+            name='subscriptions_recipes',
+            queryset=Recipe.objects.filter(
+                author_id__in=authors
+            ).only('id', 'author', 'name', 'image', 'cooking_time'),
+            allow_sort=True,
+        ),
+        HotQuery(
+            name='shopping_cart_sum',
+            queryset=shopping_list_ingredients(user),
+            allow_sort=True,
+        ),
+        # На SQLite LIKE с ESCAPE, который строит istartswith, индекс не
+        # использует, на PostgreSQL есть индекс по UPPER(name).
+        HotQuery(
+            name='ingredient_search',
+            queryset=Ingredient.objects.filter(name__istartswith='кар'),
+            vendors={'sqlite': ('recipes_ingredient', )},
+        ),
+    ]
+    return queries
+
+
+def _sqlite_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [
+            row[3].replace(' TABLE ', ' ', 1) for row in cursor.fetchall()
+        ]
+
+
+def _postgresql_nodes(node):
+    kind = node['Node Type']
+    if kind == 'Seq Scan':
+        yield f'SCAN {node["Relation Name"]}'
+    elif kind in ('Sort', 'Incremental Sort'):
+        yield 'USE TEMP B-TREE FOR ORDER BY'
+    elif kind not in POSTGRESQL_SKIPPED_NODES:
+        yield ' '.join([kind] + [
+            node[key] for key in ('Relation Name', 'Index Name')
+            if key in node
+        ])
+    for child in node.get('Plans', ()):
+        yield from _postgresql_nodes(child)
+
+
+def _postgresql_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_postgresql_nodes(plan[0]['Plan']))
+
+
+def explain(queryset):
+    """План запроса в виде списка строк.
+
+    Args:
+        queryset (QuerySet): запрос.
+
+    Raises:
+        NotImplementedError: СУБД не поддерживается.
+
+    Returns:
+        list: строки плана.
+    """
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == 'sqlite':
+        return _sqlite_plan(sql, params)
+    if connection.vendor == 'postgresql':
+        return _postgresql_plan(sql, params)
+    raise NotImplementedError(
+        f'EXPLAIN для {connection.vendor} не поддерживается.'
+    )
+
+
+def violations(query, plan):
+    """Нарушения правил плана.
+
+    Args:
+        query (HotQuery): запрос с допущениями.
+        plan (list): строки плана.
+
+    Returns:
+        list: описания нарушений.
+    """
+    allowed = query.allowed_scans(connection.vendor)
+    problems = []
+    for line in plan:
+        words = line.split()
+        if (words[:1] == ['SCAN'] and len(words) == 2
+                and words[1] not in allowed):
+            problems.append(f'полный просмотр {words[1]}')
+        if line.startswith('USE TEMP B-TREE') and not query.allow_sort:
+            problems.append(line.lower())
+    return problems
+
+
+def golden_path(vendor=None):
+    """Путь к файлу одобренных планов СУБД.
+
+    Args:
+        vendor (str, optional): СУБД. Defaults to None - текущая.
+
+    Returns:
+        str: путь к JSON файлу.
+    """
+    return os.path.join(GOLDEN_DIR, f'{vendor or connection.vendor}.json')
+
+
+def load_golden():
+    """Одобренные планы текущей СУБД.
+
+    Returns:
+        dict: имя запроса -> строки плана.
+    """
+    try:
+        with open(golden_path(), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_golden(plans):
+    """Сохранение одобренных планов текущей СУБД.
+
+    Args:
+        plans (dict): имя запроса -> строки плана.
+    """
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(golden_path(), 'w', encoding='utf-8') as file:
+        json.dump(plans, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def seed(recipes):
+    """Заполнение тестовой базы данными для проверки планов.
+    На SQLite статистика ANALYZE не собирается: на маленьком наборе с
+    данными одного пользователя она делает полный просмотр небольших
+    таблиц выгоднее индекса и планы перестают отражать боевую базу.
+
+    Args:
+        recipes (int): количество рецептов.
+
+    Returns:
+        User: пользователь с избранным, списком покупок и подписками.
+    """
+    rng = random.Random(0)
+    User.objects.bulk_create(
+        User(email=f'user{i}@example.com', username=f'user{i}',
+             first_name='Имя', last_name='Фамилия', password='!')
+        for i in range(20)
+    )
+    users = list(User.objects.order_by('id'))
+    Tag.objects.bulk_create(
+        Tag(name=slug, slug=slug, color='#ffffff') for slug in TAGS
+    )
+    tags = list(Tag.objects.all())
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'{name} {number}', measurement_unit='г')
+        for name in INGREDIENT_NAMES for number in range(50)
+    )
+    ingredients = list(Ingredient.objects.values_list('id', flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(name=f'Рецепт {number}', author=rng.choice(users),
+               image='recipes/images/plan.png', text='Текст',
+               cooking_time=rng.randint(1, 120))
+        for number in range(recipes)
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+        for recipe_id in recipe_ids for tag in rng.sample(tags, 2)
+    )
+    IngredientForRecipe.objects.bulk_create(
+        IngredientForRecipe(recipe_id=recipe_id, ingredient_id=ingredient,
+                            amount=rng.randint(1, 500))
+        for recipe_id in recipe_ids
+        for ingredient in rng.sample(ingredients, 5)
+    )
+    user = users[0]
+    Favourite.objects.bulk_create(
+        Favourite(user=user, recipe_id=recipe_id)
+        for recipe_id in rng.sample(recipe_ids, min(20, len(recipe_ids)))
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe_id=recipe_id)
+        for recipe_id in rng.sample(recipe_ids, min(10, len(recipe_ids)))
+    )
+    Follow.objects.bulk_create(
+        Follow(user=user, following=author) for author in users[1:6]
+    )
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return user
+
+
+def collect(user):
+    """Планы горячих запросов и нарушения правил.
+
+    Args:
+        user (User): пользователь из seed.
+
+    Returns:
+        tuple: имя запроса -> строки плана и список пар (имя, нарушение).
+    """
+    plans = {}
+    problems = []
+    for query in hot_queries(user):
+        plan = explain(query.queryset)
+        plans[query.name] = plan
+        problems += [(query.name, problem)
+                     for problem in violations(query, plan)]
+    return plans, problems
@@ -0,0 +1,30 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON рендерер на orjson.
+    Наследуется от JSONRenderer.
+    Вывод совпадает с компактным выводом JSONRenderer: даты и время
+    форматирует кодировщик DRF, а не orjson. Если orjson не установлен
+    или запрошен отступ, работает родительский класс.
+    """
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.default,
+                           option=orjson.OPT_PASSTHROUGH_DATETIME)
+        if b'\xe2\x80\xa8' not in ret and b'\xe2\x80\xa9' not in ret:
+            return ret
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -0,0 +1,422 @@
+"""Быстрое представление рецептов для чтения.
+
+Словари ответа собираются напрямую из строк .values() и словарей
+связанных данных, без обхода полей ModelSerializer. Формат полностью
+совпадает с RecipeSerializer, в том числе с выборочными полями
+(FieldSet), проверка - команда bench_recipe_list.
+
+Список и просмотр рецепта читают готовые документы RecipeDocument
+(document_representations): публичная часть ответа берется из одной
+строки, флаги пользователя и ссылка на изображение накладываются при
+чтении. Рецепты без документа собираются recipe_representations.
+"""
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.files.storage import default_storage
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from recipes.fieldsets import FieldSet
+from recipes.models import (Favourite, Follow, IngredientForRecipe, Recipe,
+                            ShoppingCart)
+
+RECIPE_FIELDS = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
+                 'is_in_shopping_cart', 'name', 'image', 'text',
+                 'cooking_time')
+AUTHOR_COLUMNS = ('author__email', 'author__username', 'author__first_name',
+                  'author__last_name')
+PLAIN_COLUMNS = ('name', 'image', 'text', 'cooking_time')
+
+
+def _image_url(name, request):
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _tags_by_recipe(recipe_ids):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+    )
+    for recipe_id, tag_id, name, color, slug in rows:
+        tags[recipe_id].append(
+            {'id': tag_id, 'name': name, 'color': color, 'slug': slug}
+        )
+    return tags
+
+
+def _tag_ids_by_recipe(recipe_ids):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list('recipe_id', 'tag_id')
+    for recipe_id, tag_id in rows:
+        tags[recipe_id].append(tag_id)
+    return tags
+
+
+def _ingredient_amounts_by_recipe(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = IngredientForRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list('recipe_id', 'ingredient_id', 'amount')
+    for recipe_id, ingredient_id, amount in rows:
+        ingredients[recipe_id].append({'id': ingredient_id, 'amount': amount})
+    return ingredients
+
+
+def _ingredients_by_recipe(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = IngredientForRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    )
+    for recipe_id, ingredient_id, name, unit, amount in rows:
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def viewer_flags(user, favorite_ids=(), cart_ids=(), author_ids=()):
+    """Флаги текущего пользователя для набора рецептов.
+    Для пустого набора id запрос к БД не выполняется.
+
+    Args:
+        user (User): пользователь запроса.
+        favorite_ids (list): id рецептов для проверки избранного.
+        cart_ids (list): id рецептов для проверки списка покупок.
+        author_ids (list): id авторов для проверки подписки.
+
+    Returns:
+        tuple: множества id рецептов в избранном, в списке покупок и
+        id авторов, на которых подписан пользователь.
+    """
+    if not user.is_authenticated:
+        return set(), set(), set()
+    favorited = set(Favourite.objects.filter(
+        user=user, recipe_id__in=favorite_ids
+    ).values_list('recipe_id', flat=True))
+    in_cart = set(ShoppingCart.objects.filter(
+        user=user, recipe_id__in=cart_ids
+    ).values_list('recipe_id', flat=True))
+    subscribed = set(Follow.objects.filter(
+        user=user, following_id__in=author_ids
+    ).values_list('following_id', flat=True))
+    return favorited, in_cart, subscribed
+
+
+def recipe_columns(fieldset):
+    """Столбцы рецепта, нужные для набора полей.
+
+    Args:
+        fieldset (FieldSet): набор полей ответа.
+
+    Returns:
+        list: имена столбцов для .values() или .only().
+    """
+    columns = ['id', 'author_id']
+    columns += [name for name in PLAIN_COLUMNS if name in fieldset]
+    if 'author' in fieldset and fieldset.is_expanded('author'):
+        columns += AUTHOR_COLUMNS
+    return columns
+
+
+def recipe_queryset(queryset, fieldset):
+    """Запрос рецептов с подгрузкой только нужных столбцов и связей.
+
+    Args:
+        queryset (QuerySet): рецепты.
+        fieldset (FieldSet): набор полей ответа.
+
+    Returns:
+        QuerySet: рецепты с .only(), select_related и prefetch_related
+        по набору полей.
+    """
+    queryset = queryset.only(*[
+        'author' if column == 'author_id' else column
+        for column in recipe_columns(fieldset)
+    ])
+    if 'author' in fieldset and fieldset.is_expanded('author'):
+        queryset = queryset.select_related('author')
+    if 'tags' in fieldset:
+        queryset = queryset.prefetch_related('tags')
+    if 'ingredients' not in fieldset:
+        return queryset
+    return queryset.prefetch_related(
+        'recipe_for_ingridient__ingredient'
+        if fieldset.is_expanded('ingredients')
+        else 'recipe_for_ingridient'
+    )
+
+
+def _author(row, subscribed, user_id, fieldset):
+    author_id = row['author_id']
+    if not fieldset.is_expanded('author'):
+        return author_id
+    return {
+        'email': row['author__email'],
+        'id': author_id,
+        'username': row['author__username'],
+        'first_name': row['author__first_name'],
+        'last_name': row['author__last_name'],
+        'is_subscribed': author_id != user_id and author_id in subscribed,
+    }
+
+
+def recipe_representations(recipe_ids, request, fieldset=None):
+    """Представление рецептов в формате RecipeSerializer.
+
+    Args:
+        recipe_ids (list): id рецептов в нужном порядке.
+        request (Request): данные запроса для флагов пользователя и
+        абсолютных ссылок на изображения.
+        fieldset (FieldSet, optional): набор полей ответа. Defaults to
+        None - все поля.
+
+    Returns:
+        list: словари рецептов в порядке recipe_ids.
+    """
+    fieldset = fieldset or FieldSet()
+    names = [name for name in RECIPE_FIELDS if name in fieldset]
+    recipe_ids = list(recipe_ids)
+    rows = {
+        row['id']: row for row in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values(*recipe_columns(fieldset))
+    }
+    related = {}
+    if 'tags' in fieldset:
+        related['tags'] = (_tags_by_recipe if fieldset.is_expanded('tags')
+                           else _tag_ids_by_recipe)(recipe_ids)
+    if 'ingredients' in fieldset:
+        related['ingredients'] = (
+            _ingredients_by_recipe if fieldset.is_expanded('ingredients')
+            else _ingredient_amounts_by_recipe
+        )(recipe_ids)
+    favorited, in_cart, subscribed = viewer_flags(
+        request.user,
+        favorite_ids=recipe_ids if 'is_favorited' in fieldset else (),
+        cart_ids=recipe_ids if 'is_in_shopping_cart' in fieldset else (),
+        author_ids=(
+            {row['author_id'] for row in rows.values()}
+            if 'author' in fieldset and fieldset.is_expanded('author')
+            else ()
+        ),
+    )
+    user_id = request.user.id
+    result = []
+    for recipe_id in recipe_ids:
+        row = rows.get(recipe_id)
+        if row is None:
+            continue
+        values = {
+            'id': recipe_id,
+            'is_favorited': recipe_id in favorited,
+            'is_in_shopping_cart': recipe_id in in_cart,
+        }
+        for name, items in related.items():
+            values[name] = items[recipe_id]
+        if 'author' in fieldset:
+            values['author'] = _author(row, subscribed, user_id, fieldset)
+        if 'image' in fieldset:
+            values['image'] = _image_url(row['image'], request)
+        result.append({
+            name: values[name] if name in values else row[name]
+            for name in names
+        })
+    return result
+
+
+def build_documents(recipe_ids):
+    """Документы рецептов для RecipeDocument: полный ответ
+    RecipeSerializer без флагов пользователя, изображение - имя файла.
+
+    Args:
+        recipe_ids (list): id рецептов.
+
+    Returns:
+        dict: id рецепта -> документ для существующих рецептов.
+    """
+    recipe_ids = list(recipe_ids)
+    rows = Recipe.objects.filter(id__in=recipe_ids).values(
+        'id', 'author_id', *PLAIN_COLUMNS, *AUTHOR_COLUMNS
+    )
+    tags = _tags_by_recipe(recipe_ids)
+    ingredients = _ingredients_by_recipe(recipe_ids)
+    return {
+        row['id']: {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+            },
+            'ingredients': ingredients[row['id']],
+            'name': row['name'],
+            'image': row['image'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    }
+
+
+@lru_cache(maxsize=None)
+def nested_keys():
+    """Порядок ключей вложенных объектов как в сериализаторах: jsonb в
+    PostgreSQL хранит ключи документа в своем порядке. Сериализаторы
+    импортируются при первом вызове, они зависят от этого модуля через
+    recipes.signals.
+
+    Returns:
+        dict: связь (tags, author, ingredients) -> ключи объекта.
+    """
+    from recipes.serializers import (IngredientForRecipeSerializer,
+                                     TagSerializer)
+    from users.serializers import CustomUserSerializer
+
+    return {
+        'tags': tuple(TagSerializer().fields),
+        'author': tuple(name for name in CustomUserSerializer.Meta.fields
+                        if name != 'is_subscribed'),
+        'ingredients': tuple(IngredientForRecipeSerializer.Meta.fields),
+    }
+
+
+def _ordered(item, keys):
+    return {key: item[key] for key in keys}
+
+
+def _document_values(document, flags, user_id, fieldset):
+    favorited, in_cart, subscribed = flags
+    keys = nested_keys()
+    values = {
+        'is_favorited': document['id'] in favorited,
+        'is_in_shopping_cart': document['id'] in in_cart,
+    }
+    author = document['author']
+    if not fieldset.is_expanded('author'):
+        values['author'] = author['id']
+    else:
+        values['author'] = dict(
+            _ordered(author, keys['author']),
+            is_subscribed=author['id'] != user_id
+            and author['id'] in subscribed,
+        )
+    if not fieldset.is_expanded('tags'):
+        values['tags'] = [tag['id'] for tag in document['tags']]
+    else:
+        values['tags'] = [_ordered(tag, keys['tags'])
+                          for tag in document['tags']]
+    if fieldset.is_expanded('ingredients'):
+        values['ingredients'] = [_ordered(item, keys['ingredients'])
+                                 for item in document['ingredients']]
+    else:
+        values['ingredients'] = [
+            {'id': item['id'], 'amount': item['amount']}
+            for item in document['ingredients']
+        ]
+    return values
+
+
+def document_representations(documents, request, fieldset=None):
+    """Представление рецептов в формате RecipeSerializer из готовых
+    документов с флагами пользователя.
+
+    Args:
+        documents (list): пары (id рецепта, документ или None) в нужном
+        порядке, например .values_list('id', 'document__document').
+        request (Request): данные запроса для флагов пользователя и
+        абсолютных ссылок на изображения.
+        fieldset (FieldSet, optional): набор полей ответа. Defaults to
+        None - все поля.
+
+    Returns:
+        list: словари рецептов в порядке documents.
+    """
+    fieldset = fieldset or FieldSet()
+    names = [name for name in RECIPE_FIELDS if name in fieldset]
+    documents = list(documents)
+    missing = [recipe_id for recipe_id, document in documents
+               if document is None]
+    fallback = {
+        item['id']: item
+        for item in recipe_representations(missing, request, fieldset)
+    } if missing else {}
+    recipe_ids = [recipe_id for recipe_id, document in documents
+                  if document is not None]
+    flags = viewer_flags(
+        request.user,
+        favorite_ids=recipe_ids if 'is_favorited' in fieldset else (),
+        cart_ids=recipe_ids if 'is_in_shopping_cart' in fieldset else (),
+        author_ids=(
+            {document['author']['id'] for _, document in documents
+             if document is not None}
+            if 'author' in fieldset and fieldset.is_expanded('author')
+            else ()
+        ),
+    )
+    result = []
+    for recipe_id, document in documents:
+        if document is None:
+            if recipe_id in fallback:
+                result.append(fallback[recipe_id])
+            continue
+        values = _document_values(document, flags, request.user.id,
+                                  fieldset)
+        if 'image' in fieldset:
+            values['image'] = _image_url(document['image'], request)
+        result.append({
+            name: values[name] if name in values else document[name]
+            for name in names
+        })
+    return result
+
+
+def viewer_state(user, recipe_ids):
+    """Флаги пользователя для рецептов одним запросом с подзапросами
+    EXISTS.
+
+    Args:
+        user (User): пользователь запроса.
+        recipe_ids (list): id рецептов в нужном порядке.
+
+    Returns:
+        list: словари id, is_favorited, is_in_shopping_cart и
+        is_subscribed для существующих рецептов в порядке recipe_ids.
+    """
+    recipes = Recipe.objects.filter(id__in=recipe_ids).order_by()
+    if user.is_authenticated:
+        recipes = recipes.annotate(
+            is_favorited=Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, following=OuterRef('author'))),
+        )
+    else:
+        recipes = recipes.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            is_subscribed=Value(False, output_field=BooleanField()),
+        )
+    rows = {row['id']: row for row in recipes.values(
+        'id', 'is_favorited', 'is_in_shopping_cart', 'is_subscribed'
+    )}
+    return [rows[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in rows]
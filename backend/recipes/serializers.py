@@ -1,6 +1,16 @@
+import json
+
+from django.db import transaction
+from foodgram.limits import limit, reject
+from jobs.queue import enqueue
+from recipes.cache import bump_version
 from recipes.fields import Base64ImageField
+from recipes.fieldsets import SparseFieldsMixin
 from recipes.models import (Favourite, Ingredient, IngredientForRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.pantry import PANTRY_NAMESPACE
+from recipes.signals import recipes_changed, recipes_changing
+from recipes.tasks import delete_unused_image
 from rest_framework import serializers
 from users.models import User
 from users.serializers import CustomUserSerializer
@@ -112,6 +122,45 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
             'id': {'read_only': True},
         }
 
+    def to_internal_value(self, data):
+        """Приведение данных multipart формы к формату JSON и проверка
+        числа ингридиентов до проверки каждого из них, каждая проверка -
+        запрос к БД.
+        В multipart форме изображение передается файлом, тэги -
+        повторяющимся полем tags, ингридиенты - строкой JSON в поле
+        ingredients.
+
+        Raises:
+            serializers.ValidationError: ингридиенты формы не JSON.
+            serializers.ValidationError: ингридиентов больше
+            MAX_INGREDIENTS.
+        """
+        if hasattr(data, 'getlist'):
+            data = self.form_to_dict(data)
+        ingredients = (data.get('ingredients') if hasattr(data, 'get')
+                       else None)
+        max_ingredients = limit('MAX_INGREDIENTS')
+        if isinstance(ingredients, list) and (
+                len(ingredients) > max_ingredients):
+            reject('ingredients')
+            raise serializers.ValidationError({
+                'errors': f'Не больше {max_ingredients} ингредиентов.'
+            })
+        return super().to_internal_value(data)
+
+    def form_to_dict(self, form):
+        data = form.dict()
+        if 'tags' in form:
+            data['tags'] = form.getlist('tags')
+        if 'ingredients' in form:
+            try:
+                data['ingredients'] = json.loads(form['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError({
+                    'ingredients': 'Ожидается список ингредиентов в JSON.'
+                })
+        return data
+
     def validate(self, data):
         """Валидация ингридиентов и тэгов при создании/редактировании рецепта.
 
@@ -175,6 +224,7 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
     def create_ingredients(self, ingredients, recipe):
         """Создание в базе данных в связанной таблице ингридиента в привязке к
         рецепту с указанием количества и создание связи рецепта и тэгов.
+        После записи сбрасывается индекс поиска по ингридиентам.
 
         Args:
             ingredients (dict): список ингридиентов.
@@ -190,9 +240,13 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
                 for ingredient in ingredients
             ]
         )
+        bump_version(PANTRY_NAMESPACE)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта.
+        Рецепт, его состав и счетчик рецептов автора записываются в одной
+        транзакции.
 
         Args:
             validated_data (dict): полученные данные для создания рецепта от
@@ -206,10 +260,13 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        recipes_changed.send(sender=Recipe, recipe_ids=[recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Редактируем созданный ранее рецепт.
+        Замененный файл изображения удаляется фоновой задачей.
 
         Args:
             instance (obj): изменяемый объект.
@@ -218,12 +275,17 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
         Returns:
             obj (Recipe): изменный рецепт.
         """
+        recipes_changing.send(sender=Recipe, recipe_ids=[instance.id])
         tags = validated_data.pop('tags')
         instance.tags.set(tags)
         ingredients = validated_data.pop('recipe_for_ingridient')
         IngredientForRecipe.objects.filter(recipe_id=instance.id).delete()
         self.create_ingredients(ingredients, instance)
+        old_image = instance.image.name
         super().update(instance, validated_data)
+        if old_image and instance.image.name != old_image:
+            enqueue(delete_unused_image, name=old_image)
+        recipes_changed.send(sender=Recipe, recipe_ids=[instance.id])
         return instance
 
     def validate_cooking_time(self, value):
@@ -248,9 +310,22 @@ class RecipePOSTSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class IngredientAmountSerializer(serializers.ModelSerializer):
+    """Компактное представление ингридиента рецепта: id и количество, как
+    при записи рецепта.
+    """
+    id = serializers.ReadOnlyField(source='ingredient_id')
+
+    class Meta:
+        model = IngredientForRecipe
+        fields = ('id', 'amount')
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для рецепта при чтении.
     Наследуется от ModelSerializer.
+    Поддерживает выборочные поля ответа (SparseFieldsMixin): нераскрытые
+    автор и тэги отдаются id, ингридиенты - id и количеством.
     Настраиваемые поля:
     ingredients (serializer): вложенный сериализатор
     IngredientForRecipeSerializer, вызов нескольких элементов разрешен, ресурс
@@ -270,6 +345,14 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    compact_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(read_only=True,
+                                                           many=True),
+        'ingredients': lambda: IngredientAmountSerializer(
+            read_only=True, many=True, source='recipe_for_ingridient'
+        ),
+    }
 
     class Meta:
         model = Recipe
@@ -291,12 +374,14 @@ class RecipeSerializer(serializers.ModelSerializer):
             obj (Recipe): объект сериализации, рецепт.
 
         Returns:
-            bool: возвращает значение есть ли рецепт в избранном.
+            bool: возвращает значение есть ли рецепт в избранном, для
+            анонимного пользователя False без запроса к БД.
         """
-        user = self.context['request'].user.id
-        recipe = obj.id
-        return Favourite.objects.filter(user_id=user,
-                                        recipe_id=recipe).exists()
+        user = self.context['request'].user
+        if not user.is_authenticated:
+            return False
+        return Favourite.objects.filter(user_id=user.id,
+                                        recipe_id=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
         """Проверка на добавленность в список покупок пользователя.
@@ -305,12 +390,28 @@ class RecipeSerializer(serializers.ModelSerializer):
             obj (Recipe): объект сериализации, рецепт.
 
         Returns:
-            bool: возвращает значение есть ли рецепт в списке.
+            bool: возвращает значение есть ли рецепт в списке, для
+            анонимного пользователя False без запроса к БД.
         """
-        user = self.context['request'].user.id
-        recipe = obj.id
-        return ShoppingCart.objects.filter(user_id=user,
-                                           recipe_id=recipe).exists()
+        user = self.context['request'].user
+        if not user.is_authenticated:
+            return False
+        return ShoppingCart.objects.filter(user_id=user.id,
+                                           recipe_id=obj.id).exists()
+
+
+class RecipePantrySerializer(RecipeSerializer):
+    """Сериализатор рецепта в выдаче поиска по имеющимся ингридиентам.
+    Наследуется от RecipeSerializer.
+    Настраиваемые поля:
+    coverage (float): доля ингридиентов рецепта, которые есть у пользователя.
+    matched (int): количество совпавших ингридиентов.
+    """
+    coverage = serializers.FloatField(read_only=True)
+    matched = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('coverage', 'matched')
 
 
 class RecipeGETShortSerializer(serializers.ModelSerializer):
@@ -326,19 +427,29 @@ class RecipeGETShortSerializer(serializers.ModelSerializer):
                   'cooking_time',)
 
 
-class UserFollowSerializer(CustomUserSerializer):
+class UserFollowSerializer(SparseFieldsMixin, CustomUserSerializer):
     """Сериализатор для представления списка избранных авторов.
     Наследуется от ModelSerializer.
+    Поддерживает выборочные поля ответа (SparseFieldsMixin): нераскрытые
+    рецепты автора отдаются списком id.
     Настраиваемые поля:
     recipes (serializer): только чтение, ресурс связанная таблица, допускается
     несколько объектов.
-    recipes_count (int): только чтение, по умолчанию ноль.
+    recipes_count, followers_count, following_count (int): только чтение,
+    счетчики из модели пользователя.
     """
 
     recipes = RecipeGETShortSerializer(many=True,
                                        read_only=True,
                                        source='recipe_set')
-    recipes_count = serializers.IntegerField(read_only=True, default=0)
+    recipes_count = serializers.IntegerField(read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+    compact_fields = {
+        'recipes': lambda: serializers.PrimaryKeyRelatedField(
+            read_only=True, many=True, source='recipe_set'
+        ),
+    }
 
     class Meta:
         model = User
@@ -351,4 +462,6 @@ class UserFollowSerializer(CustomUserSerializer):
             'is_subscribed',
             'recipes',
             'recipes_count',
+            'followers_count',
+            'following_count',
         )
@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from jobs.queue import enqueue
+from recipes.cache import bump_version
+from recipes.documents import refresh_documents, refresh_related
+from recipes.facets import (FACETS_NAMESPACE, FAVOURITES_NAMESPACE,
+                            user_namespace)
+from recipes.models import (Favourite, Follow, Ingredient, IngredientForRecipe,
+                            Recipe, ShoppingCart, Tag)
+from recipes.pagecache import PAGES_NAMESPACE
+from recipes.pantry import PANTRY_NAMESPACE
+from recipes.tasks import delete_unused_image, schedule_publish
+from users.counters import change_counter
+from users.models import User
+
+# Записи рецептов, которые не видны через post_save: состав и тэги
+# пишутся массово после сохранения самого рецепта. Оба сигнала
+# отправляются внутри транзакции записи с аргументом recipe_ids.
+recipes_changing = Signal()
+recipes_changed = Signal()
+
+AUTHOR_DOCUMENT_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=IngredientForRecipe)
+@receiver(post_delete, sender=IngredientForRecipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_pantry_index(sender, **kwargs):
+    """Сброс индекса поиска по ингридиентам при изменении состава рецептов.
+    """
+    bump_version(PANTRY_NAMESPACE)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_facets(sender, **kwargs):
+    """Сброс счетчиков по тэгам при записи рецептов, тэгов и их связей.
+    """
+    bump_version(FACETS_NAMESPACE)
+
+
+@receiver(recipes_changed, sender=Recipe)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientForRecipe)
+@receiver(post_delete, sender=IngredientForRecipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_pages(sender, **kwargs):
+    """Сброс кэша ответов для анонимных пользователей после фиксации
+    транзакции: раньше другой запрос успел бы закэшировать старые данные
+    под новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(PAGES_NAMESPACE))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def publish_catalogue_snapshot(sender, **kwargs):
+    """Перепубликация статического снимка справочника после записи."""
+    schedule_publish('ingredients' if sender is Ingredient else 'tags')
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_delete, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_facets(sender, instance, **kwargs):
+    """Сброс счетчиков по тэгам с личными фильтрами пользователя."""
+    bump_version(user_namespace(instance.user_id))
+    if sender is Favourite:
+        bump_version(FAVOURITES_NAMESPACE)
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    """Счетчик рецептов автора. Сигнал выполняется в транзакции записи
+    рецепта, поэтому счетчик меняется вместе с ней.
+    """
+    if created:
+        change_counter(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    change_counter(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_delete, sender=Recipe)
+def schedule_image_cleanup(sender, instance, **kwargs):
+    """Файл изображения удаляется фоновой задачей, а не в запросе."""
+    if instance.image:
+        enqueue(delete_unused_image, name=instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    """Счетчики подписчиков автора и подписок пользователя."""
+    if created:
+        change_counter(instance.following_id, 'followers_count', 1)
+        change_counter(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_counter(instance.following_id, 'followers_count', -1)
+    change_counter(instance.user_id, 'following_count', -1)
+
+
+@receiver(recipes_changed, sender=Recipe)
+def refresh_recipe_documents(sender, recipe_ids, **kwargs):
+    """Пересборка документов после записи рецептов, состава и тэгов."""
+    refresh_documents(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_catalogue_documents(sender, instance, created, **kwargs):
+    """Пересборка документов рецептов с измененным тэгом или
+    ингридиентом.
+    """
+    if not created:
+        field = 'tags' if sender is Tag else 'ingredients'
+        refresh_related(**{field: instance})
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_document_recipes(sender, instance, **kwargs):
+    """Рецепты удаляемого тэга или ингридиента: после удаления связей
+    их уже не найти.
+    """
+    field = 'tags' if sender is Tag else 'ingredients'
+    instance.document_recipe_ids = list(Recipe.objects.filter(
+        **{field: instance}
+    ).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted_catalogue_documents(sender, instance, **kwargs):
+    refresh_documents(getattr(instance, 'document_recipe_ids', ()))
+
+
+@receiver(post_save, sender=User)
+def refresh_author_documents(sender, instance, created, update_fields=None,
+                             **kwargs):
+    """Пересборка документов рецептов автора и сброс кэша ответов после
+    изменения его имени или почты. Запись других полей (last_login,
+    пароль) пропускается.
+    """
+    if created or (update_fields is not None
+                   and not AUTHOR_DOCUMENT_FIELDS & set(update_fields)):
+        return
+    refresh_related(author=instance)
+    invalidate_pages(sender)
@@ -0,0 +1,106 @@
+"""Фоновые задачи рецептов.
+
+В очередь вынесена работа, результат которой не нужен в ответе: удаление
+файлов изображений, массовое удаление из админки, публикация снимков
+справочников. Декодирование изображения и запись состава остаются в
+запросе: ответ на запись возвращает адрес сохраненного изображения и
+состав рецепта. Сборка списка покупок тоже остается в запросе: это один
+запрос с GROUP BY по корзине пользователя, и его результат - тело
+ответа, который фронтенд ждет от того же GET. Отложенная сборка
+потребовала бы хранения результата и опроса его готовности. Под ASGI
+отдача файла медленному клиенту не занимает поток
+(recipes.async_views).
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from jobs.models import Job
+from jobs.queue import enqueue, task
+from recipes.models import Recipe
+
+
+@task()
+def delete_unused_image(name):
+    """Удаление файла изображения, на который больше не ссылается ни один
+    рецепт. Загрузка NDJSON может привязать один файл к нескольким
+    рецептам, поэтому ссылки проверяются перед удалением.
+
+    Args:
+        name (str): имя файла в хранилище.
+    """
+    if name and not Recipe.objects.filter(image=name).exists():
+        default_storage.delete(name)
+
+
+@task()
+def delete_unused_images(names):
+    """Удаление файлов изображений удаленных массово рецептов. Ссылки на
+    все файлы порции проверяются одним запросом.
+
+    Args:
+        names (list): имена файлов в хранилище.
+    """
+    referenced = set(Recipe.objects.filter(image__in=names).values_list(
+        'image', flat=True
+    ))
+    for name in names:
+        if name and name not in referenced:
+            default_storage.delete(name)
+
+
+@task()
+def bulk_delete_recipes(ids):
+    """Удаление рецептов из админки порциями recipes.deletion вне
+    транзакции страницы удаления.
+
+    Args:
+        ids (list): id рецептов.
+    """
+    from recipes.deletion import delete_recipes
+
+    delete_recipes(ids)
+
+
+@task()
+def bulk_delete_users(ids):
+    """Удаление пользователей из админки порциями recipes.deletion вне
+    транзакции страницы удаления.
+
+    Args:
+        ids (list): id пользователей.
+    """
+    from recipes.deletion import delete_users
+
+    delete_users(ids)
+
+
+@task()
+def publish_catalogue(name):
+    """Публикация статического снимка справочника.
+
+    Args:
+        name (str): имя справочника из recipes.catalogue.CATALOGUES.
+    """
+    from recipes.catalogue import publish
+
+    publish(name)
+
+
+def schedule_publish(name):
+    """Постановка публикации снимка в очередь после фиксации транзакции.
+    Если такая задача уже ждет запуска, новая не создается: серия правок
+    в админке дает одну публикацию.
+
+    Args:
+        name (str): имя справочника из recipes.catalogue.CATALOGUES.
+    """
+    def schedule():
+        queued = Job.objects.filter(
+            name=publish_catalogue.job_name, status=Job.QUEUED,
+            payload={'name': name},
+        )
+        if not queued.exists():
+            enqueue(publish_catalogue,
+                    delay=settings.CATALOGUE_PUBLISH_DELAY, name=name)
+
+    transaction.on_commit(schedule)
@@ -0,0 +1,47 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from recipes.async_views import async_download_shopping_cart
+from recipes.models import (Ingredient, IngredientForRecipe, Recipe,
+                            ShoppingCart)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class AsyncShoppingCartTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+        recipe = Recipe.objects.create(
+            name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+            author=cls.user, image='omelette.gif',
+        )
+        eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+        IngredientForRecipe.objects.create(recipe=recipe, ingredient=eggs,
+                                           amount=2)
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    def download(self, **extra):
+        request = RequestFactory().get('/api/recipes/download_shopping_cart/',
+                                       **extra)
+        return async_to_sync(async_download_shopping_cart)(request)
+
+    def test_anonymous_is_rejected(self):
+        self.assertEqual(self.download().status_code, 401)
+        response = self.download(HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(response.status_code, 401)
+
+    def test_download(self):
+        token = Token.objects.create(user=self.user)
+        response = self.download(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('my_shopping_list.txt',
+                      response['Content-Disposition'])
+        self.assertIn('яйца', response.content.decode())
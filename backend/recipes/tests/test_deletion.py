@@ -0,0 +1,135 @@
+from django.core.cache import cache
+from django.test import TestCase
+from jobs.models import Job
+from jobs.queue import registry
+from recipes.cache import get_version
+from recipes.deletion import delete_recipes, delete_users
+from recipes.documents import refresh_documents
+from recipes.facets import FACETS_NAMESPACE, user_namespace
+from recipes.models import (Favourite, Follow, Ingredient, IngredientForRecipe,
+                            Recipe, RecipeDocument, ShoppingCart, Tag)
+from recipes.tasks import (bulk_delete_recipes, bulk_delete_users,
+                           delete_unused_images)
+from users.counters import recount
+from users.models import User
+
+
+def make_user(name, **extra):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name=name, password='secret', **extra
+    )
+
+
+class DeletionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user('author')
+        cls.reader = make_user('reader')
+        tag = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                 slug='breakfast')
+        eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                name=f'Омлет {number}', text='Взбить и пожарить.',
+                cooking_time=10, author=cls.author,
+                image=f'omelette-{number}.gif',
+            )
+            recipe.tags.set([tag])
+            IngredientForRecipe.objects.create(recipe=recipe,
+                                               ingredient=eggs, amount=2)
+            Favourite.objects.create(user=cls.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+            cls.recipes.append(recipe)
+        refresh_documents(recipe.id for recipe in cls.recipes)
+        Follow.objects.create(user=cls.reader, following=cls.author)
+        recount([cls.author.id, cls.reader.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_delete_recipes_removes_related_rows(self):
+        ids = [recipe.id for recipe in self.recipes[:2]]
+        self.assertEqual(delete_recipes(ids, chunk_size=1), 2)
+        left = self.recipes[2].id
+        self.assertEqual(list(Recipe.objects.values_list('id', flat=True)),
+                         [left])
+        for model in (Favourite, ShoppingCart, IngredientForRecipe,
+                      RecipeDocument, Recipe.tags.through):
+            self.assertEqual(
+                set(model.objects.values_list('recipe_id', flat=True)),
+                {left}, model.__name__,
+            )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        jobs = Job.objects.filter(name=delete_unused_images.job_name)
+        self.assertEqual(
+            sorted(name for job in jobs for name in job.payload['names']),
+            ['omelette-0.gif', 'omelette-1.gif'],
+        )
+
+    def test_versions_bumped_after_commit(self):
+        namespaces = (FACETS_NAMESPACE, user_namespace(self.reader.id))
+        before = [get_version(namespace) for namespace in namespaces]
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_recipes([self.recipes[0].id])
+        self.assertEqual(
+            [get_version(namespace) for namespace in namespaces], before
+        )
+        for callback in callbacks:
+            callback()
+        after = [get_version(namespace) for namespace in namespaces]
+        self.assertTrue(all(new > old for new, old in zip(after, before)))
+
+    def test_delete_users(self):
+        self.assertEqual(delete_users([self.author.id], chunk_size=2), 3)
+        self.assertFalse(User.objects.filter(pk=self.author.id).exists())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 0)
+        self.assertFalse(Favourite.objects.exists())
+
+
+class BulkDeleteAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_staff=True, is_superuser=True)
+        cls.author = make_user('author')
+        cls.recipe = Recipe.objects.create(
+            name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+            author=cls.author, image='omelette.gif',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def run_job(self, task):
+        job = Job.objects.get(name=task.job_name)
+        registry[job.name](**job.payload)
+
+    def test_recipe_delete_is_queued(self):
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Recipe.objects.filter(pk=self.recipe.id).exists())
+        self.run_job(bulk_delete_recipes)
+        self.assertFalse(Recipe.objects.filter(pk=self.recipe.id).exists())
+
+    def test_user_delete_action_deactivates_and_queues(self):
+        response = self.client.post('/admin/users/user/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.author.id],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.run_job(bulk_delete_users)
+        self.assertFalse(User.objects.filter(pk=self.author.id).exists())
+        self.assertFalse(Recipe.objects.exists())
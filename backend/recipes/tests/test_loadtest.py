@@ -0,0 +1,59 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from recipes.management.commands.loadtest import Command
+from recipes.models import Favourite, Follow, Recipe, ShoppingCart
+from users.models import User
+
+
+def make_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name=name, password='secret',
+    )
+
+
+class LoadtestCleanupTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = make_user('author')
+        self.recipe = Recipe.objects.create(
+            name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+            author=self.author, image='omelette.gif',
+        )
+
+    def test_refuses_without_write_data(self):
+        with self.assertRaisesMessage(CommandError, '--write-data'):
+            call_command('loadtest', stdout=StringIO())
+
+    def test_cleanup_removes_test_data(self):
+        command = Command(stdout=StringIO())
+        (user, _), = command.prepare_users(1)
+        image = default_storage.save('recipes/images/loadtest.gif',
+                                     ContentFile(b'GIF89a'))
+        Recipe.objects.create(
+            name='Нагрузочный рецепт', text='Текст', cooking_time=5,
+            author=user, image=image,
+        )
+        Favourite.objects.create(user=user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=user, recipe=self.recipe)
+        Follow.objects.create(user=user, following=self.author)
+        command.cleanup()
+        self.assertEqual(list(User.objects.values_list('pk', flat=True)),
+                         [self.author.pk])
+        self.assertEqual(list(Recipe.objects.all()), [self.recipe])
+        for model in (Favourite, ShoppingCart, Follow):
+            self.assertFalse(model.objects.exists())
+        self.assertFalse(os.path.exists(default_storage.path(image)))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from recipes.models import Recipe
+from users.models import User
+
+OLD = time.time() - 2 * 60 * 60
+
+
+class GarbageCollectMediaTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        self.root = media.name
+        settings = override_settings(MEDIA_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        author = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+        for name in ('recipes/images/kept.gif',
+                     'recipes/images/nested/kept.gif'):
+            Recipe.objects.create(
+                name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+                author=author, image=name,
+            )
+        for name in ('recipes/images/kept.gif',
+                     'recipes/images/nested/kept.gif',
+                     'recipes/images/orphan.gif',
+                     'recipes/images/nested/orphan.gif'):
+            self.write(name)
+        self.write('recipes/images/young.gif', mtime=None)
+        self.target = os.path.join(outside.name, 'target.gif')
+        with open(self.target, 'wb') as file:
+            file.write(b'GIF89a')
+        os.utime(self.target, (OLD, OLD))
+        for target, name in ((self.target, 'recipes/images/link.gif'),
+                             (outside.name, 'recipes/linked')):
+            os.symlink(target, self.path(name))
+            os.utime(self.path(name), (OLD, OLD), follow_symlinks=False)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def write(self, name, mtime=OLD):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'GIF89a')
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.root)
+            for directory, _, names in os.walk(self.root)
+            for name in names
+        )
+
+    def gc_media(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--min-age', '3600', '--chunk-size', '2',
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_deletes_nothing(self):
+        before = self.files()
+        output = self.gc_media('--dry-run')
+        self.assertIn('Файлов: 5, моложе порога: 1, без ссылок: 2', output)
+        self.assertIn('ничего не удалено', output)
+        self.assertEqual(self.files(), before)
+
+    def test_deletes_only_old_unreferenced_files(self):
+        output = self.gc_media()
+        self.assertIn('удалено: 2.', output)
+        self.assertEqual(self.files(), [
+            'recipes/images/kept.gif',
+            'recipes/images/link.gif',
+            'recipes/images/nested/kept.gif',
+            'recipes/images/young.gif',
+        ])
+        self.assertTrue(os.path.exists(self.target))
+        self.assertTrue(os.path.islink(self.path('recipes/linked')))
@@ -0,0 +1,135 @@
+import json
+import tempfile
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from foodgram.asgi import application
+from recipes.models import Recipe
+from recipes.ndjson import import_batch
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+def record(email, username, name='Омлет'):
+    return {
+        'id': 1,
+        'name': name,
+        'text': 'Взбить и пожарить.',
+        'cooking_time': 10,
+        'pub_date': '2022-08-01T10:00:00+00:00',
+        'image': 'omelette.gif',
+        'author': {'email': email, 'username': username,
+                   'first_name': 'Имя', 'last_name': 'Фамилия'},
+        'tags': ['breakfast'],
+        'ingredients': [
+            {'name': 'яйца', 'measurement_unit': 'шт', 'amount': 2},
+        ],
+    }
+
+
+class ImportBatchTest(TestCase):
+
+    def setUp(self):
+        User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+
+    def test_loads_new_and_existing_authors(self):
+        loaded, rejected = import_batch([
+            record('cook@example.com', 'cook'),
+            record('new@example.com', 'new'),
+        ])
+        self.assertEqual((loaded, rejected), (2, []))
+        self.assertEqual(
+            User.objects.get(email='new@example.com').recipes_count, 1
+        )
+        recipe = Recipe.objects.get(author__email='new@example.com')
+        self.assertEqual(list(recipe.tags.values_list('slug', flat=True)),
+                         ['breakfast'])
+        self.assertEqual(recipe.recipe_for_ingridient.get().amount, 2)
+
+    def test_taken_username_is_rejected(self):
+        loaded, rejected = import_batch([
+            record('other@example.com', 'cook'),
+            record('new@example.com', 'new'),
+        ])
+        self.assertEqual(loaded, 1)
+        self.assertEqual(rejected, [
+            (0, 'Логин cook занят другим пользователем.'),
+        ])
+        self.assertFalse(User.objects.filter(
+            email='other@example.com'
+        ).exists())
+
+    def test_duplicate_username_in_batch(self):
+        loaded, rejected = import_batch([
+            record('first@example.com', 'twin'),
+            record('second@example.com', 'twin'),
+        ])
+        self.assertEqual(loaded, 1)
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+
+class ImportRecipesCommandTest(TestCase):
+
+    def test_reports_rejected_lines(self):
+        lines = [
+            json.dumps(record('a@example.com', 'a')),
+            '{broken',
+            json.dumps(record('b@example.com', 'a')),
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source:
+            source.write('\n'.join(lines) + '\n')
+            source.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_recipes', source.name, stdout=stdout,
+                         stderr=stderr)
+        self.assertIn('рецептов: 1, отклонено записей: 2',
+                      stdout.getvalue())
+        self.assertIn('Строка 2: Неверный JSON', stderr.getvalue())
+        self.assertIn('Строка 3: Логин a занят', stderr.getvalue())
+
+
+async def asgi_get(path, token):
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'),
+                    (b'authorization', f'Token {token}'.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    })
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    start = await communicator.receive_output(10)
+    body = b''
+    while True:
+        message = await communicator.receive_output(10)
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return start, body
+
+
+class ExportASGITest(TransactionTestCase):
+    """Выгрузка через точку входа ASGI: запросы к БД в потоке
+    представления, а не при отправке ответа.
+    """
+
+    def test_export_under_asgi(self):
+        import_batch([record('cook@example.com', 'cook')])
+        staff = User.objects.create_user(
+            email='admin@example.com', username='admin',
+            first_name='Admin', last_name='Admin', password='secret',
+            is_staff=True,
+        )
+        token = Token.objects.create(user=staff)
+        start, body = async_to_sync(asgi_get)('/api/recipes/export/',
+                                              token.key)
+        self.assertEqual(start['status'], 200)
+        lines = body.decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['name'], 'Омлет')
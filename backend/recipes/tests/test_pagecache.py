@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from foodgram.db import routers
+from recipes.models import Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class AnonymousPageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                     slug='breakfast')
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path='/api/recipes/', **extra):
+        return self.client.get(path, HTTP_ACCEPT='application/json',
+                               **extra)
+
+    def test_second_request_is_a_hit(self):
+        first = self.get()
+        second = self.get()
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_query_string_is_part_of_key(self):
+        self.get()
+        self.assertEqual(self.get(data={'limit': 1})['X-Page-Cache'],
+                         'MISS')
+
+    def test_credentials_and_browser_bypass_cache(self):
+        token = Token.objects.create(user=self.user)
+        self.get()
+        for extra in (
+            {'HTTP_AUTHORIZATION': f'Token {token.key}'},
+            {'HTTP_AUTHORIZATION': 'Token invalid'},
+        ):
+            with self.subTest(extra=extra):
+                self.assertFalse(self.get(**extra).has_header(
+                    'X-Page-Cache'
+                ))
+        self.client.force_login(self.user)
+        self.assertFalse(self.get().has_header('X-Page-Cache'))
+        self.client.logout()
+        response = self.client.get('/api/recipes/', HTTP_ACCEPT='text/html')
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_write_invalidates_after_commit(self):
+        self.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Recipe.objects.create(
+                name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+                author=self.user, image='omelette.gif',
+            )
+        self.assertEqual(self.get()['X-Page-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 1)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_miss_reads_from_primary(self):
+        seen = []
+        db_for_read = routers.ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            seen.append(routers._state.get().use_replica)
+            return db_for_read(router, model, **hints)
+
+        token = Token.objects.create(user=self.user)
+        with mock.patch.object(routers.ReplicaRouter, 'db_for_read', spy):
+            self.assertEqual(self.get()['X-Page-Cache'], 'MISS')
+            self.assertTrue(seen)
+            self.assertFalse(any(seen))
+            seen.clear()
+            self.get(HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.assertTrue(all(seen))
+
+
+class PrimaryReadsTest(SimpleTestCase):
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_primary_reads_restores_route(self):
+        router = routers.ReplicaRouter()
+        state = routers.RoutingState(use_replica=True)
+        token = routers._state.set(state)
+        try:
+            with mock.patch.object(routers, 'replica_available',
+                                   return_value=True):
+                self.assertEqual(router.db_for_read(Tag), 'replica')
+                with routers.primary_reads():
+                    self.assertEqual(router.db_for_read(Tag), 'default')
+                self.assertEqual(router.db_for_read(Tag), 'replica')
+                with routers.primary_reads():
+                    router.db_for_write(Tag)
+                self.assertEqual(router.db_for_read(Tag), 'default')
+        finally:
+            routers._state.reset(token)
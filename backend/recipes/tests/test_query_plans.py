@@ -0,0 +1,26 @@
+import os
+
+from django.test import TestCase
+from recipes.plans import collect, golden_path, load_golden, seed
+
+
+class QueryPlansTest(TestCase):
+    """Планы горячих запросов на тестовой базе совпадают с одобренными
+    планами СУБД, на которой идут тесты (check_query_plans).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plans, cls.problems = collect(seed(500))
+
+    def test_golden_file_exists(self):
+        self.assertTrue(
+            os.path.exists(golden_path()),
+            f'Нет {golden_path()}: check_query_plans --approve.',
+        )
+
+    def test_no_violations(self):
+        self.assertEqual(self.problems, [])
+
+    def test_plans_match_golden(self):
+        self.assertEqual(self.plans, load_golden())
@@ -0,0 +1,40 @@
+import datetime
+import decimal
+
+from django.test import SimpleTestCase
+from recipes.renderers import ORJSONRenderer
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """Вывод ORJSONRenderer совпадает с JSONRenderer побайтно."""
+
+    def assert_same(self, data, media_type=None, context=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type, context),
+            JSONRenderer().render(data, media_type, context),
+        )
+
+    def test_matches_json_renderer(self):
+        self.assert_same({
+            'name': 'Омлет с молоком',
+            'text': 'строка\u2028и абзац\u2029',
+            'numbers': [1, 2.5, -3, True, False, None],
+            'nested': {'list': [{'a': 1}], 'empty': {}},
+        })
+
+    def test_encoder_fallbacks(self):
+        self.assert_same({
+            'amount': decimal.Decimal('1.50'),
+            'date': datetime.date(2022, 8, 1),
+            'created': datetime.datetime(
+                2022, 8, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc
+            ),
+            'naive': datetime.datetime(2022, 8, 1, 10, 0),
+            'time': datetime.time(10, 30, 15, 500000),
+            'tuple': (1, 2),
+        })
+
+    def test_indent_and_none(self):
+        self.assert_same({'a': [1, 2]}, 'application/json; indent=4')
+        self.assert_same(None)
@@ -0,0 +1,153 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from recipes.documents import refresh_documents
+from recipes.fieldsets import FieldSet
+from recipes.models import (Favourite, Follow, Ingredient, IngredientForRecipe,
+                            Recipe, ShoppingCart, Tag)
+from recipes.representations import (document_representations, recipe_queryset,
+                                     recipe_representations)
+from recipes.serializers import RecipeSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import User
+
+
+def make_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name=name, password='secret',
+    )
+
+
+class RepresentationParityTest(TestCase):
+    """Быстрые представления совпадают с RecipeSerializer побайтно."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user('author')
+        cls.viewer = make_user('viewer')
+        breakfast = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                       slug='breakfast')
+        lunch = Tag.objects.create(name='Обед', color='#49B64E',
+                                   slug='lunch')
+        eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='молоко',
+                                         measurement_unit='мл')
+        cls.recipes = []
+        for number, author in enumerate(
+            [cls.author, cls.author, cls.viewer]
+        ):
+            recipe = Recipe.objects.create(
+                name=f'Омлет {number}', text='Взбить и пожарить.',
+                cooking_time=10 + number, author=author,
+                image=f'omelette-{number}.gif',
+            )
+            recipe.tags.set([breakfast, lunch][:number + 1])
+            IngredientForRecipe.objects.create(recipe=recipe,
+                                               ingredient=eggs, amount=2)
+            if number:
+                IngredientForRecipe.objects.create(
+                    recipe=recipe, ingredient=milk, amount=100 * number
+                )
+            cls.recipes.append(recipe)
+        Favourite.objects.create(user=cls.viewer, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.viewer, recipe=cls.recipes[1])
+        Follow.objects.create(user=cls.viewer, following=cls.author)
+        cls.ids = [recipe.id for recipe in cls.recipes]
+        refresh_documents(cls.ids)
+
+    def make_request(self, user=None, **params):
+        request = APIRequestFactory().get('/api/recipes/', params)
+        if user is not None:
+            force_authenticate(request, user)
+        request = Request(request)
+        fieldset = FieldSet.from_request(request, RecipeSerializer)
+        return request, fieldset
+
+    def serializer_page(self, request, fieldset):
+        recipes = recipe_queryset(Recipe.objects.all(),
+                                  fieldset).in_bulk(self.ids)
+        return RecipeSerializer(
+            [recipes[pk] for pk in self.ids], many=True,
+            context={'request': request, 'fieldset': fieldset},
+        ).data
+
+    def document_page(self, request, fieldset):
+        documents = dict(Recipe.objects.filter(id__in=self.ids).values_list(
+            'id', 'document__document'
+        ))
+        return document_representations(
+            [(pk, documents[pk]) for pk in self.ids], request, fieldset
+        )
+
+    def assert_parity(self, user=None, **params):
+        request, fieldset = self.make_request(user, **params)
+        render = JSONRenderer().render
+        expected = render(self.serializer_page(request, fieldset))
+        self.assertEqual(
+            render(recipe_representations(self.ids, request, fieldset)),
+            expected,
+        )
+        self.assertEqual(render(self.document_page(request, fieldset)),
+                         expected)
+        return recipe_representations(self.ids, request, fieldset)
+
+    def test_anonymous(self):
+        page = self.assert_parity()
+        for recipe in page:
+            self.assertFalse(recipe['is_favorited'])
+            self.assertFalse(recipe['is_in_shopping_cart'])
+            self.assertFalse(recipe['author']['is_subscribed'])
+
+    def test_authenticated(self):
+        page = self.assert_parity(self.viewer)
+        self.assertEqual(
+            [(recipe['is_favorited'], recipe['is_in_shopping_cart'],
+              recipe['author']['is_subscribed']) for recipe in page],
+            [(True, False, True), (False, True, True),
+             (False, False, False)],
+        )
+
+    def test_image_urls_are_absolute(self):
+        page = self.assert_parity(self.viewer)
+        self.assertEqual(page[0]['image'],
+                         'http://testserver/media/omelette-0.gif')
+
+    def test_sparse_fieldsets(self):
+        self.assert_parity(self.viewer, fields='id,name,author,tags',
+                           expand='tags')
+        self.assert_parity(self.viewer, fields='id,is_favorited,image')
+        self.assert_parity(None, expand='author,ingredients')
+
+    def test_missing_document_falls_back(self):
+        request, fieldset = self.make_request(self.viewer)
+        expected = recipe_representations(self.ids, request, fieldset)
+        pairs = [(pk, None) for pk in self.ids]
+        self.assertEqual(
+            document_representations(pairs, request, fieldset), expected
+        )
+
+    def test_keys_follow_serializers(self):
+        request, fieldset = self.make_request(self.viewer)
+        recipe = self.document_page(request, fieldset)[0]
+        self.assertEqual(list(recipe['tags'][0]),
+                         ['id', 'name', 'color', 'slug'])
+        self.assertEqual(list(recipe['author']), [
+            'email', 'id', 'username', 'first_name', 'last_name',
+            'is_subscribed',
+        ])
+        self.assertEqual(list(recipe['ingredients'][0]),
+                         ['id', 'name', 'measurement_unit', 'amount'])
+
+    @skipUnless(connection.features.has_select_for_update,
+                'блокировки строк нет')
+    def test_refresh_locks_recipes(self):
+        with CaptureQueriesContext(connection) as queries:
+            refresh_documents(self.ids)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertIn('FOR UPDATE', selects[0])
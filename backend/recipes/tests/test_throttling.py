@@ -0,0 +1,86 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from recipes.throttling import CacheBucketStore, LocalBucketStore
+
+CAPACITY = 10
+RATE = 1.0
+PERIOD = CAPACITY / RATE
+
+
+class CacheBucketStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.store = CacheBucketStore()
+        self.now = 1000 * PERIOD
+        patcher = mock.patch('recipes.throttling.time.time',
+                             lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def consume(self):
+        return self.store.consume('throttle:test', CAPACITY, RATE)
+
+    def test_rejects_over_capacity(self):
+        results = [self.consume()[0] for _ in range(CAPACITY)]
+        self.assertTrue(all(results))
+        allowed, wait = self.consume()
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, PERIOD)
+
+    def test_rejected_requests_are_not_counted(self):
+        for _ in range(CAPACITY * 3):
+            self.consume()
+        self.now += PERIOD
+        allowed, _ = self.consume()
+        self.assertFalse(allowed)
+        self.now += PERIOD / 2
+        allowed, _ = self.consume()
+        self.assertTrue(allowed)
+
+    def test_previous_window_decays(self):
+        for _ in range(CAPACITY):
+            self.consume()
+        self.now += PERIOD * 1.5
+        allowed = [self.consume()[0] for _ in range(CAPACITY)]
+        self.assertEqual(allowed.count(True), CAPACITY // 2)
+
+    def test_store_error_fails_closed(self):
+        with mock.patch('recipes.throttling.cache.incr',
+                        side_effect=ValueError):
+            allowed, wait = self.consume()
+        self.assertFalse(allowed)
+        self.assertEqual(wait, CacheBucketStore.retry_wait)
+
+    def test_concurrent_burst_is_limited(self):
+        results = []
+        barrier = threading.Barrier(CAPACITY * 3)
+
+        def request():
+            barrier.wait()
+            results.append(self.consume()[0])
+
+        threads = [threading.Thread(target=request)
+                   for _ in range(CAPACITY * 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), CAPACITY)
+
+
+class LocalBucketStoreTest(SimpleTestCase):
+
+    def test_refills_over_time(self):
+        store = LocalBucketStore()
+        now = 1000.0
+        with mock.patch('recipes.throttling.time.time', lambda: now):
+            results = [store.consume('key', CAPACITY, RATE)[0]
+                       for _ in range(CAPACITY + 1)]
+            self.assertEqual(results.count(True), CAPACITY)
+            now += 1 / RATE
+            self.assertTrue(store.consume('key', CAPACITY, RATE)[0])
@@ -0,0 +1,169 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from recipes.documents import refresh_documents
+from recipes.models import (Favourite, Follow, Ingredient, IngredientForRecipe,
+                            Recipe, ShoppingCart)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+def make_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name=name, password='secret',
+    )
+
+
+class RecipeStateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('viewer')
+        cls.recipe = Recipe.objects.create(
+            name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+            author=make_user('author'), image='omelette.gif',
+        )
+        Favourite.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_flags(self):
+        response = self.client.get('/api/recipes/state/',
+                                   {'ids': str(self.recipe.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{
+            'id': self.recipe.id, 'is_favorited': True,
+            'is_in_shopping_cart': False, 'is_subscribed': False,
+        }])
+
+    def test_invalid_ids_rejected(self):
+        for value in ('abc', '0', '-1', str(2 ** 63),
+                      '99999999999999999999'):
+            with self.subTest(value=value):
+                response = self.client.get('/api/recipes/state/',
+                                           {'ids': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_largest_id_accepted(self):
+        response = self.client.get('/api/recipes/state/',
+                                   {'ids': str(2 ** 63 - 1)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class PantryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('viewer')
+        cls.author = make_user('author')
+        cls.eggs = Ingredient.objects.create(name='яйца',
+                                             measurement_unit='шт')
+        cls.milk = Ingredient.objects.create(name='молоко',
+                                             measurement_unit='мл')
+        cls.recipes = []
+        for number in range(4):
+            recipe = Recipe.objects.create(
+                name=f'Омлет {number}', text='Взбить и пожарить.',
+                cooking_time=10, author=cls.author,
+                image=f'omelette-{number}.gif',
+            )
+            IngredientForRecipe.objects.create(recipe=recipe,
+                                               ingredient=cls.eggs, amount=2)
+            if number % 2:
+                IngredientForRecipe.objects.create(
+                    recipe=recipe, ingredient=cls.milk, amount=100
+                )
+            cls.recipes.append(recipe)
+        refresh_documents(recipe.id for recipe in cls.recipes)
+        Favourite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        Follow.objects.create(user=cls.user, following=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def pantry(self, **params):
+        return self.client.get('/api/recipes/pantry/', params)
+
+    def test_ranking_and_flags(self):
+        response = self.pantry(ingredients=self.eggs.id)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        first, second = self.recipes[0], self.recipes[1]
+        self.assertEqual(
+            [(recipe['id'], recipe['coverage'], recipe['matched'])
+             for recipe in results],
+            [(self.recipes[2].id, 1.0, 1), (first.id, 1.0, 1),
+             (self.recipes[3].id, 0.5, 1), (second.id, 0.5, 1)],
+        )
+        flags = {recipe['id']: (recipe['is_favorited'],
+                                recipe['is_in_shopping_cart'],
+                                recipe['author']['is_subscribed'])
+                 for recipe in results}
+        self.assertEqual(flags[first.id], (True, False, True))
+        self.assertEqual(flags[second.id], (False, True, True))
+        self.assertEqual(list(results[0])[-2:], ['coverage', 'matched'])
+
+    def test_sparse_fields(self):
+        response = self.pantry(ingredients=self.milk.id,
+                               fields='id,coverage')
+        self.assertEqual(response.json()['results'], [
+            {'id': self.recipes[3].id, 'coverage': 0.5},
+            {'id': self.recipes[1].id, 'coverage': 0.5},
+        ])
+
+    def test_queries_do_not_grow_with_page(self):
+        self.pantry(ingredients=self.eggs.id, limit=1)
+        with CaptureQueriesContext(connection) as queries:
+            self.pantry(ingredients=self.eggs.id, limit=1)
+        with self.assertNumQueries(len(queries)):
+            self.pantry(ingredients=self.eggs.id, limit=4)
+
+    def test_invalid_ingredients_rejected(self):
+        for value in ('', 'abc', '0', '99999999999999999999'):
+            with self.subTest(value=value):
+                self.assertEqual(self.pantry(ingredients=value).status_code,
+                                 400)
+
+
+class RecipeRetrieveTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            name='Омлет', text='Взбить и пожарить.', cooking_time=10,
+            author=make_user('author'), image='omelette.gif',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_retrieve(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Омлет')
+
+    def test_bad_pk_is_not_found(self):
+        for pk in ('abc', '0', '99999999999999999999'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/')
+                self.assertEqual(response.status_code, 404)
+
+    def test_representation_errors_are_not_hidden(self):
+        failing = mock.patch('recipes.views.document_representations',
+                             side_effect=ValueError('ошибка'))
+        with failing, self.assertRaises(ValueError):
+            self.client.get(f'/api/recipes/{self.recipe.id}/')
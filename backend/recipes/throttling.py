@@ -0,0 +1,157 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from foodgram import metrics
+from rest_framework import permissions
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Разбор строки скорости вида '30/min'.
+
+    Returns:
+        tuple: емкость корзины и скорость пополнения в токенах в секунду.
+    """
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill(state, capacity, rate, now):
+    """Шаг алгоритма token bucket.
+
+    Args:
+        state (tuple): (токены, время обновления) или None для новой
+        корзины.
+        capacity (int): емкость корзины.
+        rate (float): токенов в секунду.
+        now (float): текущее время.
+
+    Returns:
+        tuple: разрешен ли запрос, сколько ждать, новое состояние.
+    """
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, 0.0, (tokens - 1, now)
+    return False, (1 - tokens) / rate, (tokens, now)
+
+
+class LocalBucketStore:
+    """Хранилище корзин в памяти процесса, для тестов и одного воркера."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        with self._lock:
+            allowed, wait, self._buckets[key] = refill(
+                self._buckets.get(key), capacity, rate, time.time()
+            )
+        return allowed, wait
+
+
+class CacheBucketStore:
+    """Хранилище лимитов в общем кэше Django без блокировок.
+    Корзина приближается скользящим окном длиной capacity / rate секунд:
+    запросы текущего окна считает атомарный cache.incr, число запросов
+    предыдущего окна учитывается с весом непрошедшей его доли. Отказ
+    возвращает свой инкремент. Если счетчик записать не удалось, запрос
+    отклоняется с коротким ожиданием.
+    С кэшем в памяти процесса лимиты действуют на каждый процесс
+    отдельно.
+    """
+    retry_wait = 1.0
+
+    def consume(self, key, capacity, rate):
+        period = capacity / rate
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+        current = f'{key}:{window}'
+        timeout = int(2 * period) + 1
+        try:
+            cache.add(current, 0, timeout)
+            count = cache.incr(current)
+        except ValueError:
+            metrics.incr('throttle.store_error')
+            return False, self.retry_wait
+        previous = cache.get(f'{key}:{window - 1}', 0)
+        weight = 1 - elapsed / period
+        excess = previous * weight + count - capacity
+        if excess <= 0:
+            return True, 0.0
+        try:
+            cache.decr(current)
+        except ValueError:
+            pass
+        wait = period - elapsed
+        if previous:
+            wait = min(wait, excess * period / previous)
+        return False, wait
+
+
+_stores = {}
+
+
+def get_store():
+    path = settings.WRITE_THROTTLE['STORE']
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+class WriteTokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов на запись по алгоритму token bucket.
+    Безопасные методы не ограничиваются. Проверка выполняется DRF до
+    разбора тела запроса, поэтому отказ не тратит время на сериализатор и
+    декодирование изображений.
+    """
+    kind = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        rates = settings.WRITE_THROTTLE['RATES']
+        capacity, rate = parse_rate(rates[self.kind])
+        allowed, wait = get_store().consume(
+            f'throttle:{self.kind}:{ident}', capacity, rate
+        )
+        if not allowed:
+            self.wait_time = wait
+            metrics.incr(f'throttle.rejected.{self.kind}')
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class UserWriteThrottle(WriteTokenBucketThrottle):
+    """Корзина на авторизированного пользователя."""
+    kind = 'user'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPWriteThrottle(WriteTokenBucketThrottle):
+    """Корзина на IP адрес клиента."""
+    kind = 'ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
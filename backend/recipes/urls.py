@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from recipes.views import (FavoritesOrShopingViewSet, IngredientViewSet,
                            RecipeViewSet, TagViewSet, download_shopping_cart)
@@ -18,3 +19,24 @@ urlpatterns = [
          name='download_shopping_cart'),
     path('', include(router_v1.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from recipes import async_views
+
+    urlpatterns = [
+        path('recipes/download_shopping_cart/',
+             async_views.async_download_shopping_cart,
+             name='download_shopping_cart'),
+        path('recipes/', async_views.recipe_list, name='recipe-list'),
+        path('recipes/<int:pk>/',
+             async_views.recipe_detail,
+             name='recipe-detail'),
+        path('tags/', async_views.tag_list, name='tag-list'),
+        path('tags/<int:pk>/', async_views.tag_detail, name='tag-detail'),
+        path('ingredients/',
+             async_views.ingredient_list,
+             name='ingredient-list'),
+        path('ingredients/<int:pk>/',
+             async_views.ingredient_detail,
+             name='ingredient-detail'),
+    ] + urlpatterns
@@ -1,26 +1,86 @@
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch, Sum
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
+from recipes.deletion import delete_recipes
+from recipes.facets import FACET_NAMES, recipe_facets
+from recipes.fieldsets import FieldSetViewMixin
 from recipes.filters import IngredientSearchFilter, RecipeFilter
 from recipes.models import (Favourite, Follow, Ingredient, Recipe,
                             ShoppingCart, Tag)
+from recipes.ndjson import export_file, export_lines
+from recipes.pagecache import AnonymousPageCacheMixin
 from recipes.paginator import LimitPageNumberPagination
+from recipes.pantry import pantry_index
 from recipes.permissions import AuthorOrReadPermission, IsAdminOrReadOnly
+from recipes.representations import document_representations, viewer_state
 from recipes.serializers import (IngredientSerializer,
                                  RecipeGETShortSerializer,
-                                 RecipePOSTSerializer, RecipeSerializer,
-                                 TagSerializer, UserFollowSerializer)
+                                 RecipePantrySerializer, RecipePOSTSerializer,
+                                 RecipeSerializer, TagSerializer,
+                                 UserFollowSerializer)
+from recipes.throttling import IPWriteThrottle, UserWriteThrottle
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView, get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from users.models import User
 
+# Наибольший id, который помещается в bigint PostgreSQL и INTEGER SQLite.
+MAX_ID = 2 ** 63 - 1
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+def parse_id(value):
+    """id из строки параметра запроса.
+
+    Args:
+        value (str): значение.
+
+    Raises:
+        ValueError: значение не число или вне диапазона 1..MAX_ID.
+
+    Returns:
+        int: id.
+    """
+    number = int(value)
+    if not 1 <= number <= MAX_ID:
+        raise ValueError(f'id вне диапазона: {value}')
+    return number
+
+
+def query_ids(request, name):
+    """Список id из параметра запроса: через запятую или повторяющимся
+    параметром.
+
+    Args:
+        request (Request): данные запроса.
+        name (str): имя параметра.
+
+    Raises:
+        ValueError: значение не число или вне диапазона 1..MAX_ID.
+
+    Returns:
+        list: id в порядке передачи.
+    """
+    return [
+        parse_id(value)
+        for param in request.query_params.getlist(name)
+        for value in param.split(',') if value
+    ]
+
+
+class RecipeViewSet(AnonymousPageCacheMixin, FieldSetViewMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для оторажения рецепта.
     Наследуется от ModelViewSet.
+    При чтении поддерживает выборочные поля ответа ?fields= и ?expand=
+    (FieldSetViewMixin). Список и просмотр для анонимных пользователей
+    отдаются из кэша ответов (AnonymousPageCacheMixin).
     """
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
@@ -28,6 +88,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     pagination_class = LimitPageNumberPagination
+    throttle_classes = [UserWriteThrottle, IPWriteThrottle]
+    state_max_ids = 100
+
+    def list(self, request, *args, **kwargs):
+        """Список рецептов.
+        Страница id рецептов читается одним запросом вместе с готовыми
+        документами RecipeDocument, флаги пользователя накладываются
+        document_representations. Формат совпадает с RecipeSerializer.
+        С параметром ?facets=tags в ответ добавляется раздел facets со
+        счетчиками рецептов по тэгам для текущего фильтра.
+
+        Args:
+            request (Request): данные запроса.
+
+        Returns:
+            Response: постраничный список рецептов.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.values_list('id', 'document__document')
+        )
+        response = self.get_paginated_response(
+            document_representations(page, request, self.get_fieldset())
+        )
+        names = self.get_facet_names()
+        if names:
+            response.data['facets'] = self.get_facets(names)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт из готового документа одним запросом.
+        Если в запросе есть параметры фильтра, рецепт, не проходящий
+        фильтр, не найден, как и при чтении через get_object.
+
+        Args:
+            request (Request): данные запроса.
+
+        Raises:
+            Http404: рецепта нет.
+
+        Returns:
+            Response: рецепт.
+        """
+        try:
+            pk = parse_id(self.kwargs['pk'])
+        except ValueError:
+            raise Http404
+        queryset = self.get_queryset()
+        if set(request.query_params) & set(self.filterset_class.base_filters):
+            queryset = self.filter_queryset(queryset)
+        data = document_representations(
+            queryset.filter(pk=pk).values_list('id', 'document__document'),
+            request, self.get_fieldset(),
+        )
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+    def get_facet_names(self):
+        """Запрошенные фасеты из параметра facets.
+
+        Raises:
+            ParseError: неизвестное имя фасета.
+
+        Returns:
+            list: имена фасетов.
+        """
+        names = [
+            name
+            for param in self.request.query_params.getlist('facets')
+            for name in param.split(',') if name
+        ]
+        unknown = sorted(set(names) - set(FACET_NAMES))
+        if unknown:
+            raise ParseError(f'Неизвестные фасеты: {", ".join(unknown)}.')
+        return names
+
+    def get_facets(self, names):
+        """Фасеты для фильтра запроса без параметра tags.
+
+        Args:
+            names (list): имена фасетов.
+
+        Returns:
+            dict: имя фасета -> счетчики.
+        """
+        data = self.request.query_params.copy()
+        data.pop('tags', None)
+        filterset = self.filterset_class(
+            data, queryset=self.get_queryset(), request=self.request
+        )
+        filterset.is_valid()
+        return recipe_facets(filterset, self.request.user, names)
 
     def perform_create(self, serializer):
         """Добавление автора рецепта при записи рецепта.
@@ -37,6 +190,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Удаление рецепта запросами по множествам (recipes.deletion) без
+        загрузки связанных строк.
+
+        Args:
+            instance (Recipe): удаляемый рецепт.
+        """
+        delete_recipes([instance.pk])
+
     def get_serializer_class(self):
         """Выбор сериализатора для рецепта.
 
@@ -46,13 +208,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
+        if self.action == 'pantry':
+            return RecipePantrySerializer
         return RecipePOSTSerializer
 
+    @action(detail=False, methods=('get',))
+    def pantry(self, request):
+        """Что приготовить: рецепты по имеющимся ингридиентам.
+        Рецепты ранжируются по доле своих ингридиентов, которые есть у
+        пользователя. Поиск идет по инвертированному индексу в памяти,
+        фильтры RecipeFilter (тэги, автор, избранное, покупки) применяются
+        к выдаче, пагинация стандартная. Рецепты страницы собираются из
+        документов с флагами пользователя (document_representations), как
+        в списке, формат - RecipePantrySerializer.
+
+        Args:
+            request (Request): данные запроса, параметр ingredients - список
+            id ингридиентов через запятую или повторяющимся параметром.
+
+        Returns:
+            Response: постраничный список рецептов с полями coverage и
+            matched либо сообщение об ошибке.
+        """
+        try:
+            ingredients = query_ids(request, 'ingredients')
+        except ValueError:
+            text = ('errors: id ингредиентов должны быть целыми числами '
+                    'больше 0.')
+            return Response(text, status=status.HTTP_400_BAD_REQUEST)
+        if not ingredients:
+            text = 'errors: Выберите хотя бы один ингредиент!'
+            return Response(text, status=status.HTTP_400_BAD_REQUEST)
+        allowed = None
+        if set(request.query_params) & set(self.filterset_class.base_filters):
+            allowed = list(
+                self.filter_queryset(self.get_queryset())
+                .order_by().values_list('id', flat=True).distinct()
+            )
+        page = self.paginate_queryset(pantry_index.rank(ingredients, allowed))
+        documents = dict(Recipe.objects.filter(
+            id__in=[item[0] for item in page]
+        ).values_list('id', 'document__document'))
+        page = [item for item in page if item[0] in documents]
+        fieldset = self.get_fieldset()
+        data = document_representations(
+            [(item[0], documents[item[0]]) for item in page],
+            request, fieldset,
+        )
+        for recipe, (_, coverage, matched) in zip(data, page):
+            if 'coverage' in fieldset:
+                recipe['coverage'] = round(float(coverage), 4)
+            if 'matched' in fieldset:
+                recipe['matched'] = int(matched)
+        return self.get_paginated_response(data)
+
+    @action(detail=False, methods=('get',))
+    def state(self, request):
+        """Флаги текущего пользователя для набора рецептов: в избранном,
+        в списке покупок, подписан ли на автора. Позволяет клиенту
+        дополнить кэшированные публичные данные рецептов одним коротким
+        запросом.
+
+        Args:
+            request (Request): данные запроса, параметр ids - id рецептов
+            через запятую или повторяющимся параметром, не больше
+            state_max_ids.
+
+        Returns:
+            Response: список флагов в порядке ids либо сообщение об ошибке.
+        """
+        try:
+            ids = list(dict.fromkeys(query_ids(request, 'ids')))
+        except ValueError:
+            text = 'errors: id рецептов должны быть целыми числами больше 0.'
+            return Response(text, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            text = 'errors: Укажите id рецептов.'
+            return Response(text, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.state_max_ids:
+            text = f'errors: Не больше {self.state_max_ids} рецептов.'
+            return Response(text, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(viewer_state(request.user, ids))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=('get',), permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Потоковая выгрузка всех рецептов в NDJSON для администратора.
+        Формат строки совпадает с форматом команды import_recipes.
+        Под ASGI файл собирается заранее (export_file) и отдается
+        FileResponse.
+
+        Args:
+            request (Request): данные запроса.
+
+        Returns:
+            StreamingHttpResponse: файл recipes.ndjson.
+        """
+        if isinstance(request._request, ASGIRequest):
+            return FileResponse(
+                export_file(Recipe.objects.all()), as_attachment=True,
+                filename='recipes.ndjson',
+                content_type='application/x-ndjson',
+            )
+        response = StreamingHttpResponse(
+            export_lines(Recipe.objects.all()),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename=recipes.ndjson'
+        )
+        return response
+
 
 class FavoritesOrShopingViewSet(viewsets.ModelViewSet):
     """Вьюсет для добавления рецептов в избранное или в список покупок.
     Наследуется от ModelViewSet.
     """
+    throttle_classes = [UserWriteThrottle, IPWriteThrottle]
 
     def create_or_del_recipe_in_db(self, request, pk, database):
         """Создание или удаление объекта в связанной базе данных.
@@ -167,6 +440,7 @@ class FollowViewSet(viewsets.ModelViewSet):
     """Вьюсет для избранных авторов - создание/удаление подписки.
     Наследуется от ModelViewSet.
     """
+    throttle_classes = [UserWriteThrottle, IPWriteThrottle]
 
     @action(
         detail=True,
@@ -193,11 +467,11 @@ class FollowViewSet(viewsets.ModelViewSet):
             if not Follow.objects.filter(
                     user=self.request.user,
                     following_id=pk).exists():
-                Follow.objects.create(
-                    user=self.request.user,
-                    following_id=pk)
-                follow = User.objects.filter(id=pk).annotate(
-                    recipes_count=Count('recipe'))
+                with transaction.atomic():
+                    Follow.objects.create(
+                        user=self.request.user,
+                        following_id=pk)
+                follow = User.objects.filter(id=pk)
                 serializer = UserFollowSerializer(follow,
                                                   context={'request': request},
                                                   many=True)
@@ -221,12 +495,16 @@ class FollowViewSet(viewsets.ModelViewSet):
             return Response(text, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FollowGETAPIView(ListAPIView):
+class FollowGETAPIView(FieldSetViewMixin, ListAPIView):
     """Вью для отображения списка избранных авторов.
     Наследуется от ListAPIView.
+    Поддерживает выборочные поля ответа ?fields= и ?expand=.
     """
+    serializer_class = UserFollowSerializer
     pagination_class = LimitPageNumberPagination
     permission_classes = [IsAuthenticated]
+    user_columns = ('email', 'username', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count', 'following_count')
 
     def get(self, request):
         """При запросе GET передает список авторов из избранного.
@@ -238,40 +516,73 @@ class FollowGETAPIView(ListAPIView):
             get_paginated_response (metod): возвращает отобранные объекты базы
             данных с пагинацией.
         """
+        fieldset = self.get_fieldset()
         follow = User.objects.filter(
-            following__user=request.user).annotate(
-                recipes_count=Count('recipe'))
+            following__user=request.user).order_by('id').only(
+                'id', *[name for name in self.user_columns
+                        if name in fieldset])
+        if 'recipes' in fieldset:
+            columns = ['id', 'author']
+            if fieldset.is_expanded('recipes'):
+                columns += ['name', 'image', 'cooking_time']
+            follow = follow.prefetch_related(Prefetch(
+                'recipe_set', queryset=Recipe.objects.only(*columns)
+            ))
         paginate = self.paginate_queryset(follow)
-        serializer = UserFollowSerializer(paginate,
-                                          context={'request': request},
-                                          many=True)
+        serializer = self.get_serializer(paginate, many=True)
         return self.get_paginated_response(serializer.data)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def download_shopping_cart(request):
-    """Скачать список покупок.
-    Суммирует повторяющиеся ингридиенты и выводит список покупок для всех
-    рецептов в списке покупок.
+def shopping_list_ingredients(user):
+    """Суммы ингридиентов для всех рецептов в списке покупок.
 
     Args:
-        request (Request): данные запроса.
+        user (User): пользователь, чей список покупок собирается.
 
     Returns:
-        Response: текстовый файл со списком покупок.
+        QuerySet: кортежи название, сумма, единица измерения.
     """
-    ingredients = (
+    return (
         Ingredient.objects.filter(
-            ingridient_for_recipe__recipe__shopping_cart__user=request.user
+            ingridient_for_recipe__recipe__shopping_cart__user=user
         )
         .annotate(sum_amount=Sum("ingridient_for_recipe__amount"))
         .values_list("name", "sum_amount", "measurement_unit")
     )
+
+
+def shopping_list_lines(user):
+    """Строки списка покупок пользователя.
+    Суммирует повторяющиеся ингридиенты для всех рецептов в списке покупок.
+
+    Args:
+        user (User): пользователь, чей список покупок собирается.
+
+    Returns:
+        list: строки вида "название - количество единица.".
+    """
+    ingredients = shopping_list_ingredients(user)
     shoping_list = []
     for ingredient in ingredients:
         shoping_list.append(
             f'{ingredient[0]} - {ingredient[1]} {ingredient[2]}.\n')
+    return shoping_list
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_shopping_cart(request):
+    """Скачать список покупок.
+    Суммирует повторяющиеся ингридиенты и выводит список покупок для всех
+    рецептов в списке покупок.
+
+    Args:
+        request (Request): данные запроса.
+
+    Returns:
+        Response: текстовый файл со списком покупок.
+    """
+    shoping_list = shopping_list_lines(request.user)
     filename = 'my_shopping_list.txt'
     response = HttpResponse(shoping_list, content_type='text/plain')
     response['Content-Disposition'] = 'attachment; filename={0}'.format(
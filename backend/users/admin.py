@@ -1,15 +1,28 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from recipes.admin import BulkDeleteAdminMixin, EstimatedCountPaginator
+from recipes.tasks import bulk_delete_users
 
 from .models import User
 
 
-class UserAdmin(UserAdmin):
+class UserAdmin(BulkDeleteAdminMixin, UserAdmin):
     """Пользователи.
     Наследуется от UserAdmin.
-    Настроены поля фильтрации.
+    Настроены поля фильтрации. Поиск по имени и email наследуется, он
+    же используется автодополнением автора в рецептах. Удаление
+    выполняется порциями фоновой задачей bulk_delete_users, до нее
+    пользователь сразу деактивируется.
     """
-    list_filter = ('username', 'email',)
+    list_filter = ('is_staff', 'is_active',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    bulk_delete_task = staticmethod(bulk_delete_users)
+
+    def before_bulk_delete(self, ids):
+        for user in User.objects.filter(pk__in=ids, is_active=True):
+            user.is_active = False
+            user.save(update_fields=['is_active'])
 
 
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,155 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from recipes.cache import bump_version, get_version
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from users.counters import COUNTER_FIELDS
+
+TOKEN_NAMESPACE = 'auth_tokens'
+SHARED_KEY = 'foodgram:auth:{}'
+
+
+def token_digest(key):
+    """Хэш токена: сам токен не хранится в ключах кэша."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def user_namespace(user_id):
+    """Пространство версий записей кэша авторизации пользователя."""
+    return f'{TOKEN_NAMESPACE}:{user_id}'
+
+
+def user_version(user_id):
+    """Текущая версия записей кэша авторизации пользователя."""
+    return get_version(user_namespace(user_id))
+
+
+class TokenCache:
+    """Кэш результатов авторизации по токену.
+
+    Первый уровень - ограниченный LRU в памяти процесса с TTL, второй -
+    необязательный общий кэш Django. Записи обоих уровней помечены
+    версией пространства 'auth_tokens:<id пользователя>' из общего кэша:
+    смена пароля, деактивация или выход увеличивают версию только этого
+    пользователя, и его записи перестают действовать во всех воркерах,
+    не затрагивая записи остальных пользователей.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, shared_cache=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        if self.shared_cache is None:
+            return None
+        return caches[self.shared_cache]
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[digest]
+                entry = None
+        if entry is not None:
+            _, version, value = entry
+            if version == user_version(value[0].pk):
+                with self._lock:
+                    if digest in self._entries:
+                        self._entries.move_to_end(digest)
+                return value
+            with self._lock:
+                self._entries.pop(digest, None)
+        if self.shared is None:
+            return None
+        entry = self.shared.get(SHARED_KEY.format(digest))
+        if entry is None:
+            return None
+        version, value = entry
+        if version != user_version(value[0].pk):
+            return None
+        self._store(digest, version, value)
+        return value
+
+    def set(self, digest, value):
+        version = user_version(value[0].pk)
+        self._store(digest, version, value)
+        if self.shared is not None:
+            self.shared.set(SHARED_KEY.format(digest), (version, value),
+                            self.ttl)
+
+    def _store(self, digest, version, value):
+        with self._lock:
+            self._entries[digest] = (
+                time.monotonic() + self.ttl, version, value
+            )
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id, keys=()):
+        """Сброс записей пользователя во всех воркерах.
+
+        Args:
+            user_id (int): id пользователя.
+            keys (iterable, optional): токены, записи которых удаляются
+            сразу, а не при следующем чтении. Defaults to ().
+        """
+        bump_version(user_namespace(user_id))
+        digests = [token_digest(key) for key in keys]
+        with self._lock:
+            for digest in digests:
+                self._entries.pop(digest, None)
+        if self.shared is not None and digests:
+            self.shared.delete_many(
+                [SHARED_KEY.format(digest) for digest in digests]
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(**getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Авторизация по токену с кэшированием пары токен - пользователь.
+    Наследуется от TokenAuthentication.
+    Запрос Token + User выполняется только при промахе кэша. Каждый запрос
+    получает свою копию пользователя.
+    Счетчики пользователя меняются UPDATE без сигналов и в кэш не
+    попадают: они отложены и читаются из БД при обращении, а save()
+    профиля их не перезаписывает.
+    """
+
+    def load_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').defer(
+                *[f'user__{field}' for field in COUNTER_FIELDS]
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        cached = token_cache.get(digest)
+        if cached is None:
+            cached = self.load_credentials(key)
+            token_cache.set(digest, cached)
+        user, token = cached
+        return copy.copy(user), token
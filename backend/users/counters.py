@@ -0,0 +1,82 @@
+"""Денормализованные счетчики пользователя: рецепты, подписчики и
+подписки. Изменения выполняются одним UPDATE через F(), поэтому
+конкурентные запросы не теряют инкременты.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Follow, Recipe
+from users.models import User
+
+COUNTER_FIELDS = ('recipes_count', 'followers_count', 'following_count')
+
+
+def change_counter(user_id, field, delta):
+    """Изменение счетчика пользователя на delta.
+    Уменьшение не опускает счетчик ниже нуля.
+
+    Args:
+        user_id (int): id пользователя.
+        field (str): имя счетчика из COUNTER_FIELDS.
+        delta (int): приращение.
+    """
+    users = User.objects.filter(pk=user_id)
+    if delta < 0:
+        users = users.filter(**{f'{field}__gte': -delta})
+    users.update(**{field: F(field) + delta})
+
+
+def _count(queryset, column):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{column: OuterRef('pk')}).order_by()
+            .values(column).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def actual_counters():
+    """Выражения с фактическими значениями счетчиков.
+
+    Returns:
+        dict: имя счетчика -> подзапрос подсчета.
+    """
+    return {
+        'recipes_count': _count(Recipe.objects.all(), 'author'),
+        'followers_count': _count(Follow.objects.all(), 'following'),
+        'following_count': _count(Follow.objects.all(), 'user'),
+    }
+
+
+def drifted(queryset):
+    """Пользователи, у которых счетчики расходятся с данными.
+
+    Args:
+        queryset (QuerySet): проверяемые пользователи.
+
+    Returns:
+        QuerySet: id пользователей с расхождением.
+    """
+    actual = {f'actual_{field}': expression
+              for field, expression in actual_counters().items()}
+    condition = Q()
+    for field in COUNTER_FIELDS:
+        condition |= ~Q(**{field: F(f'actual_{field}')})
+    return queryset.annotate(**actual).filter(condition).values_list(
+        'pk', flat=True
+    )
+
+
+def recount(user_ids):
+    """Пересчет счетчиков пользователей одним UPDATE.
+
+    Args:
+        user_ids (iterable): id пользователей.
+
+    Returns:
+        int: количество обновленных строк.
+    """
+    return User.objects.filter(pk__in=list(user_ids)).update(
+        **actual_counters()
+    )
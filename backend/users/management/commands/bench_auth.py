@@ -0,0 +1,44 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+from users.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = ('Сравнение TokenAuthentication и CachedTokenAuthentication: '
+            'запросов к БД и время на одну авторизацию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def measure(self, authentication, request, count):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(count):
+                authentication.authenticate(request)
+            elapsed = time.perf_counter() - started
+        return len(queries) / count, elapsed / count * 1e6
+
+    def handle(self, *args, **options):
+        token = Token.objects.first()
+        if token is None:
+            raise CommandError('Нет ни одного токена для проверки.')
+        request = APIRequestFactory().get(
+            '/api/recipes/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        token_cache.clear()
+        for authentication in (TokenAuthentication(),
+                               CachedTokenAuthentication()):
+            per_request, micros = self.measure(
+                authentication, request, options['requests']
+            )
+            self.stdout.write(
+                f'{type(authentication).__name__}: '
+                f'{per_request:.3f} запросов к БД, {micros:.1f} мкс '
+                f'на авторизацию'
+            )
@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from users.counters import drifted, recount
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сверка счетчиков рецептов, подписчиков и подписок '
+            'пользователей с данными и исправление расхождений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать расхождения.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            ids = list(User.objects.filter(id__gt=last_id).order_by('id')
+                       .values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+            with transaction.atomic():
+                broken = list(drifted(User.objects.filter(id__in=ids)))
+                if broken and not options['dry_run']:
+                    recount(broken)
+            fixed += len(broken)
+        action = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено пользователей: {checked}. {action} расхождений: '
+            f'{fixed}.'
+        ))
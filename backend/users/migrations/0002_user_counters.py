@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-19 10:52
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Follow = apps.get_model('recipes', 'Follow')
+
+    def count(queryset, column):
+        return Coalesce(Subquery(
+            queryset.filter(**{column: OuterRef('pk')}).order_by()
+            .values(column).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ), 0)
+
+    User.objects.update(
+        recipes_count=count(Recipe.objects.all(), 'author'),
+        followers_count=count(Follow.objects.all(), 'following'),
+        following_count=count(Follow.objects.all(), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Подписок'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,9 @@ class User(AbstractUser):
     """Пользовательский пользователь.
     Наследуется от AbstractUser.
     Переопределены поля авторизации.
+    Счетчики рецептов, подписчиков и подписок поддерживаются сигналами
+    recipes.signals, расхождения исправляет команда
+    reconcile_user_counters.
 
     Returns:
         str: имя пользователя.
@@ -24,6 +27,9 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    recipes_count = models.PositiveIntegerField('Рецептов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
 
     REQUIRED_FIELDS = ['username',
                        'first_name',
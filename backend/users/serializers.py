@@ -33,11 +33,28 @@ class CustomUserSerializer(UserSerializer):
 
         Returns:
             bool: есть ли у пользователя отправившего запрос пользователь в
-            списке избранного.
+            списке избранного, для анонимного пользователя False без
+            запроса к БД.
         """
-        user = self.context['request'].user.id
-        request_profile = obj.id
-        if user == request_profile:
+        user = self.context['request'].user
+        if not user.is_authenticated or user.id == obj.id:
             return False
-        return Follow.objects.filter(user_id=user,
-                                     following_id=request_profile).exists()
+        return Follow.objects.filter(user_id=user.id,
+                                     following_id=obj.id).exists()
+
+
+class UserProfileSerializer(CustomUserSerializer):
+    """Сериализатор профиля пользователя со счетчиками.
+    Наследуется от CustomUserSerializer.
+    Счетчики хранятся в модели пользователя и не требуют подсчета.
+    """
+    recipes_count = serializers.IntegerField(read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = CustomUserSerializer.Meta.fields + (
+            'recipes_count',
+            'followers_count',
+            'following_count',
+        )
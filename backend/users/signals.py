@@ -0,0 +1,36 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.authentication import token_cache
+from users.counters import COUNTER_FIELDS
+from users.models import User
+
+# Поля, запись которых не меняет результат авторизации: время входа
+# пишет каждый вход через djoser, счетчики - каждая запись рецептов и
+# подписок.
+UNTRACKED_FIELDS = frozenset(('last_login', *COUNTER_FIELDS))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser удаляет токен - удаляем его и из кэша."""
+    token_cache.invalidate(instance.user_id, [instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(user_logged_out)
+def invalidate_user_tokens(sender, user=None, instance=None,
+                           update_fields=None, **kwargs):
+    """Сохранение пользователя (смена пароля, деактивация, профиль) или
+    выход сбрасывает кэш его токена. Сохранение только времени входа или
+    счетчиков кэш не трогает.
+    """
+    if kwargs.get('created'):
+        return
+    if update_fields and UNTRACKED_FIELDS.issuperset(update_fields):
+        return
+    user = user or instance
+    if user is None or user.pk is None:
+        return
+    token_cache.invalidate(user.pk)
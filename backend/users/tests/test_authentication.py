@@ -0,0 +1,102 @@
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from users.authentication import (CachedTokenAuthentication, TokenCache,
+                                  token_cache, token_digest)
+from users.counters import change_counter
+from users.models import User
+
+
+class CachedTokenAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Cook',
+            last_name='Cook', password='secret-password',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com', username='other',
+            first_name='Other', last_name='Other', password='secret',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.other_token = Token.objects.create(user=self.other)
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self, token):
+        key = token if isinstance(token, str) else token.key
+        return self.authentication.authenticate_credentials(key)
+
+    def assert_cached(self, token):
+        with self.assertNumQueries(0):
+            self.authenticate(token)
+
+    def assert_not_cached(self, token):
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+
+    def test_second_request_is_cached(self):
+        self.assert_not_cached(self.token)
+        self.assert_cached(self.token)
+
+    def test_login_and_counters_keep_cache(self):
+        self.authenticate(self.token)
+        update_last_login(None, self.user)
+        self.user.recipes_count = 5
+        self.user.save(update_fields=['recipes_count'])
+        self.assert_cached(self.token)
+
+    def test_password_change_invalidates_only_owner(self):
+        self.authenticate(self.token)
+        self.authenticate(self.other_token)
+        self.user.set_password('new-secret-password')
+        self.user.save()
+        self.assert_not_cached(self.token)
+        self.assert_cached(self.other_token)
+
+    def test_deactivation_rejected_immediately(self):
+        self.authenticate(self.token)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.token)
+
+    def test_deleted_token_rejected(self):
+        key = self.token.key
+        self.authenticate(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+
+    def test_invalidation_reaches_other_worker(self):
+        worker = TokenCache(shared_cache='default')
+        digest = token_digest(self.token.key)
+        worker.set(digest, (self.user, self.token))
+        self.assertIsNotNone(worker.get(digest))
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertIsNone(worker.get(digest))
+        worker.clear()
+        self.assertIsNone(worker.get(digest))
+
+    def test_counters_are_read_from_database(self):
+        self.authenticate(self.token)
+        change_counter(self.user.id, 'recipes_count', 1)
+        user, _ = self.authenticate(self.token)
+        self.assertEqual(user.recipes_count, 1)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.get('/api/users/me/')
+        self.assertEqual(response.json()['recipes_count'], 1)
+
+    def test_profile_save_keeps_counters(self):
+        user, _ = self.authenticate(self.token)
+        change_counter(self.user.id, 'recipes_count', 2)
+        user.first_name = 'Renamed'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 2)